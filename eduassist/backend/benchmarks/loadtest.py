@@ -0,0 +1,299 @@
+"""End-to-end load test for the EduAssist API against local fake providers.
+
+Starts the fake Supabase, Hugging Face and InstaSend servers and the API
+itself as subprocesses, seeds users, then drives a weighted scenario mix
+with a closed-loop pool of virtual users and reports p50/p95/p99 latency
+and requests/sec per scenario.
+
+Run from eduassist/backend:
+
+    python -m benchmarks.loadtest --duration 30 --concurrency 20
+    python -m benchmarks.loadtest --save-baseline      # record a new baseline
+    python -m benchmarks.loadtest --compare             # fail on regression
+
+Provider behaviour is tuned with --supabase-latency-ms, --hf-latency-ms,
+--instasend-latency-ms and the matching --*-error-rate flags.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+import uuid
+import httpx
+from pathlib import Path
+from typing import Dict, List
+from jose import jwt
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+JWT_SECRET = "loadtest-secret"
+ANON_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.loadtest"
+TOPICS = ["Algebra", "Photosynthesis", "World War II", "Python programming", "Cell biology",
+          "Kenyan history", "Chemistry basics", "Geometry", "Economics", "Literature"]
+
+# Scenario name -> relative weight in the traffic mix
+SCENARIOS = {
+    "quiz_generate": 3,
+    "flashcard_generate": 3,
+    "progress_dashboard": 4,
+    "payment_plans": 2,
+    "payment_initiate": 1,
+    "payment_status": 1
+}
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.base_url = f"http://127.0.0.1:{args.port}"
+        self.processes: List[subprocess.Popen] = []
+        self.users: List[Dict] = []
+        self.transactions: List[str] = []
+        self.latencies: Dict[str, List[float]] = {name: [] for name in SCENARIOS}
+        self.errors: Dict[str, int] = {name: 0 for name in SCENARIOS}
+
+    def start_servers(self):
+        args = self.args
+        fakes = [
+            ("fakes.supabase", args.port + 3, "FAKE_SUPABASE", args.supabase_latency_ms, args.supabase_error_rate),
+            ("fakes.huggingface", args.port + 2, "FAKE_HF", args.hf_latency_ms, args.hf_error_rate),
+            ("fakes.instasend", args.port + 1, "FAKE_INSTASEND", args.instasend_latency_ms, args.instasend_error_rate)
+        ]
+        for module, port, prefix, latency_ms, error_rate in fakes:
+            env = {**os.environ, f"{prefix}_LATENCY_MS": str(latency_ms), f"{prefix}_ERROR_RATE": str(error_rate)}
+            self._spawn([sys.executable, "-m", module, "--port", str(port)], env)
+
+        env = {
+            **os.environ,
+            "SUPABASE_URL": f"http://127.0.0.1:{args.port + 3}",
+            "SUPABASE_ANON_KEY": ANON_KEY,
+            "SUPABASE_JWT_SECRET": JWT_SECRET,
+            "HF_MODEL_URL": f"http://127.0.0.1:{args.port + 2}/models/google/flan-t5-base",
+            "INSTASEND_BASE_URL": f"http://127.0.0.1:{args.port + 1}",
+            "PAYMENT_RECONCILE_ENABLED": "false"
+        }
+        self._spawn([sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"], env)
+
+    def _spawn(self, command: List[str], env: Dict):
+        self.processes.append(subprocess.Popen(command, cwd=BACKEND_DIR, env=env))
+
+    def stop_servers(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    async def wait_ready(self, client: httpx.AsyncClient):
+        urls = [f"{self.base_url}/health"] + [
+            f"http://127.0.0.1:{self.args.port + offset}/_control/state" for offset in (1, 2, 3)
+        ]
+        deadline = time.monotonic() + 30
+        for url in urls:
+            while True:
+                try:
+                    if (await client.get(url)).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Server at {url} did not start")
+                await asyncio.sleep(0.2)
+
+    async def seed(self, client: httpx.AsyncClient):
+        supabase_url = f"http://127.0.0.1:{self.args.port + 3}"
+        now = int(time.time())
+        rows = []
+        for i in range(self.args.users):
+            user_id = str(uuid.uuid4())
+            # Premium users exercise the larger generation sizes
+            is_premium = i % 4 == 0
+            token = jwt.encode(
+                {"sub": user_id, "email": f"user{i}@example.com", "aud": "authenticated", "role": "authenticated",
+                 "iat": now, "exp": now + 24 * 3600},
+                JWT_SECRET, algorithm="HS256"
+            )
+            self.users.append({"id": user_id, "token": token, "is_premium": is_premium})
+            rows.append({"id": user_id, "email": f"user{i}@example.com", "is_premium": is_premium})
+        await client.post(f"{supabase_url}/_control/seed/users", json=rows)
+
+    async def run_scenario(self, client: httpx.AsyncClient, name: str, user: Dict) -> httpx.Response:
+        headers = {"Authorization": f"Bearer {user['token']}"}
+        topic = random.choice(TOPICS)
+
+        if name == "quiz_generate":
+            size = random.choice([5, 10, 20]) if user["is_premium"] else 5
+            return await client.post(f"{self.base_url}/quiz/generate", headers=headers,
+                                     json={"topic": topic, "num_questions": size})
+        if name == "flashcard_generate":
+            size = random.choice([10, 20, 30]) if user["is_premium"] else 10
+            return await client.post(f"{self.base_url}/flashcard/generate", headers=headers,
+                                     json={"topic": topic, "num_cards": size})
+        if name == "progress_dashboard":
+            return await client.get(f"{self.base_url}/progress/dashboard", headers=headers)
+        if name == "payment_plans":
+            return await client.get(f"{self.base_url}/payment/plans")
+        if name == "payment_initiate":
+            response = await client.post(f"{self.base_url}/payment/initiate", headers=headers,
+                                         json={"amount": 500, "phone_number": "254700000000", "email": "user@example.com"})
+            if response.status_code == 200:
+                transaction_id = response.json().get("payment_data", {}).get("id")
+                if transaction_id:
+                    self.transactions.append(transaction_id)
+            return response
+        if name == "payment_status":
+            transaction_id = random.choice(self.transactions) if self.transactions else "UNKNOWN"
+            return await client.get(f"{self.base_url}/payment/status/{transaction_id}", headers=headers)
+        raise ValueError(f"Unknown scenario {name}")
+
+    async def virtual_user(self, client: httpx.AsyncClient, deadline: float, record: bool):
+        names = list(SCENARIOS)
+        weights = [SCENARIOS[name] for name in names]
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            user = random.choice(self.users)
+            start = time.perf_counter()
+            try:
+                response = await self.run_scenario(client, name, user)
+                ok = response.status_code < 500
+            except httpx.HTTPError:
+                ok = False
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if record:
+                self.latencies[name].append(elapsed_ms)
+                if not ok:
+                    self.errors[name] += 1
+
+    async def run(self) -> Dict:
+        limits = httpx.Limits(max_connections=self.args.concurrency * 2)
+        async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+            await self.wait_ready(client)
+            await self.seed(client)
+
+            if self.args.warmup > 0:
+                deadline = time.monotonic() + self.args.warmup
+                await asyncio.gather(*(self.virtual_user(client, deadline, False) for _ in range(self.args.concurrency)))
+
+            started = time.monotonic()
+            deadline = started + self.args.duration
+            await asyncio.gather(*(self.virtual_user(client, deadline, True) for _ in range(self.args.concurrency)))
+            elapsed = time.monotonic() - started
+
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> Dict:
+        scenarios = {}
+        for name, samples in self.latencies.items():
+            scenarios[name] = {
+                "requests": len(samples),
+                "errors": self.errors[name],
+                "rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(percentile(samples, 0.50), 2),
+                "p95_ms": round(percentile(samples, 0.95), 2),
+                "p99_ms": round(percentile(samples, 0.99), 2)
+            }
+        all_samples = [sample for samples in self.latencies.values() for sample in samples]
+        return {
+            "config": {
+                "duration": self.args.duration,
+                "concurrency": self.args.concurrency,
+                "users": self.args.users,
+                "supabase_latency_ms": self.args.supabase_latency_ms,
+                "hf_latency_ms": self.args.hf_latency_ms,
+                "instasend_latency_ms": self.args.instasend_latency_ms
+            },
+            "overall": {
+                "requests": len(all_samples),
+                "errors": sum(self.errors.values()),
+                "rps": round(len(all_samples) / elapsed, 2),
+                "p50_ms": round(percentile(all_samples, 0.50), 2),
+                "p95_ms": round(percentile(all_samples, 0.95), 2),
+                "p99_ms": round(percentile(all_samples, 0.99), 2)
+            },
+            "scenarios": scenarios
+        }
+
+def print_report(report: Dict):
+    print(f"{'scenario':<22}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = list(report["scenarios"].items()) + [("overall", report["overall"])]
+    for name, stats in rows:
+        print(f"{name:<22}{stats['requests']:>10}{stats['errors']:>8}{stats['rps']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return a description of every metric that regressed beyond the tolerance"""
+    regressions = []
+    rows = list(report["scenarios"].items()) + [("overall", report["overall"])]
+    for name, stats in rows:
+        reference = baseline["overall"] if name == "overall" else baseline["scenarios"].get(name)
+        if not reference or not reference["requests"]:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if stats[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{name} {metric}: {reference[metric]} -> {stats[metric]}")
+        if stats["rps"] < reference["rps"] * (1 - tolerance):
+            regressions.append(f"{name} rps: {reference['rps']} -> {stats['rps']}")
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8100, help="API port; fakes use the next three ports")
+    parser.add_argument("--supabase-latency-ms", type=float, default=5)
+    parser.add_argument("--supabase-error-rate", type=float, default=0)
+    parser.add_argument("--hf-latency-ms", type=float, default=50)
+    parser.add_argument("--hf-error-rate", type=float, default=0)
+    parser.add_argument("--instasend-latency-ms", type=float, default=30)
+    parser.add_argument("--instasend-error-rate", type=float, default=0)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Exit non-zero if results regress against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression, e.g. 0.25 = 25%%")
+    parser.add_argument("--output", type=Path, help="Also write the JSON report here")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    load_test = LoadTest(args)
+    load_test.start_servers()
+    try:
+        report = asyncio.run(load_test.run())
+    finally:
+        load_test.stop_servers()
+
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare:
+        if not args.baseline.exists():
+            print(f"No baseline at {args.baseline}; run with --save-baseline first")
+            sys.exit(2)
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
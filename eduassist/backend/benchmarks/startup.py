@@ -0,0 +1,95 @@
+"""Cold-start benchmark for the EduAssist API.
+
+Measures, over several fresh interpreter processes:
+
+- import: time to `import main` (module imports and singleton construction)
+- ready: time from spawning uvicorn to the first successful /health response
+
+No providers are contacted, so the numbers isolate startup overhead. Run
+from eduassist/backend:
+
+    python -m benchmarks.startup --runs 10
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+ANON_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.startup"
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+
+def benchmark_env() -> Dict:
+    # Unroutable provider URLs: startup must not depend on reaching them
+    return {
+        **os.environ,
+        "SUPABASE_URL": os.getenv("SUPABASE_URL", "http://127.0.0.1:9"),
+        "SUPABASE_ANON_KEY": os.getenv("SUPABASE_ANON_KEY", ANON_KEY),
+        "PAYMENT_RECONCILE_ENABLED": "false",
+        "POOL_ENABLED": "false"
+    }
+
+def measure_import(env: Dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+def measure_ready(env: Dict, port: int, timeout: float = 30) -> float:
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError("API did not become ready")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+def summarize(samples: List[float]) -> Dict:
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "min_ms": round(min(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1)
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8190)
+    parser.add_argument("--output", type=Path, help="Also write the JSON report here")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    env = benchmark_env()
+    imports = [measure_import(env) for _ in range(args.runs)]
+    ready = [measure_ready(env, args.port) for _ in range(args.runs)]
+    report = {"runs": args.runs, "import": summarize(imports), "ready": summarize(ready)}
+
+    print(f"{'phase':<10}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for phase in ("import", "ready"):
+        stats = report[phase]
+        print(f"{phase:<10}{stats['median_ms']:>12}{stats['min_ms']:>10}{stats['max_ms']:>10}")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
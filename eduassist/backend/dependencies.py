@@ -0,0 +1,22 @@
+from fastapi import HTTPException, Depends
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from services.auth_service import token_verifier
+from services.admission_service import admission_controller, AdmissionRejected, AdmissionTooLarge, AdmissionTicket
+
+security = HTTPBearer()
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    # Verify token locally against the Supabase signing key, falling back to Supabase if enabled
+    user = await token_verifier.verify(credentials.credentials)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return user
+
+async def admit_generation(user_id: str, cost: int, user_profile: dict) -> AdmissionTicket:
+    # Reserve generation capacity, shedding the request with 429 when the user or the service is over budget
+    try:
+        return await admission_controller.admit(user_id, cost, (user_profile or {}).get("is_premium", False))
+    except AdmissionTooLarge as e:
+        raise HTTPException(status_code=413, detail=e.reason)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=e.reason, headers={"Retry-After": str(e.retry_after)})
\ No newline at end of file
@@ -0,0 +1,6 @@
+"""Local stand-ins for external providers, for tests and benchmarks.
+
+Each fake is a small FastAPI app that can be run with uvicorn, e.g.
+`python -m fakes.instasend --port 8101`, and pointed at by setting the
+matching base URL environment variable on the backend.
+"""
\ No newline at end of file
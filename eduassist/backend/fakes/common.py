@@ -0,0 +1,48 @@
+import os
+import random
+import asyncio
+import argparse
+from fastapi import HTTPException
+
+class FaultInjector:
+    """Adds configurable latency and random failures to fake endpoints"""
+
+    def __init__(self, prefix: str):
+        self.latency_ms = float(os.getenv(f"{prefix}_LATENCY_MS", 0))
+        self.jitter_ms = float(os.getenv(f"{prefix}_JITTER_MS", 0))
+        self.error_rate = float(os.getenv(f"{prefix}_ERROR_RATE", 0))
+        self.error_status = int(os.getenv(f"{prefix}_ERROR_STATUS", 503))
+
+    def configure(self, latency_ms=None, jitter_ms=None, error_rate=None, error_status=None):
+        if latency_ms is not None:
+            self.latency_ms = latency_ms
+        if jitter_ms is not None:
+            self.jitter_ms = jitter_ms
+        if error_rate is not None:
+            self.error_rate = error_rate
+        if error_status is not None:
+            self.error_status = error_status
+
+    def settings(self):
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "error_rate": self.error_rate,
+            "error_status": self.error_status
+        }
+
+    async def __call__(self):
+        """Use as a FastAPI dependency on every fake provider endpoint"""
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if self.error_rate and random.random() < self.error_rate:
+            raise HTTPException(status_code=self.error_status, detail="Injected failure")
+
+def run(app, default_port: int):
+    import uvicorn
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=default_port)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""Fake Hugging Face Inference API.
+
+Point the backend at it with HF_MODEL_URL=http://127.0.0.1:8102/models/google/flan-t5-base.
+Accepts a single prompt or a list of prompts, like the hosted text2text endpoint.
+"""
+import itertools
+from typing import Optional
+from fastapi import FastAPI, Depends
+from pydantic import BaseModel
+from fakes.common import FaultInjector, run
+
+faults = FaultInjector("FAKE_HF")
+app = FastAPI(title="Fake Hugging Face Inference")
+
+counter = itertools.count(1)
+stats = {"requests": 0, "prompts": 0}
+
+class FaultSettings(BaseModel):
+    latency_ms: Optional[float] = None
+    jitter_ms: Optional[float] = None
+    error_rate: Optional[float] = None
+    error_status: Optional[int] = None
+
+@app.post("/models/{model:path}", dependencies=[Depends(faults)])
+async def infer(model: str, payload: dict):
+    inputs = payload.get("inputs", "")
+    prompts = inputs if isinstance(inputs, list) else [inputs]
+    stats["requests"] += 1
+    stats["prompts"] += len(prompts)
+    return [{"generated_text": _generate(prompt)} for prompt in prompts]
+
+@app.put("/_control/faults")
+async def set_faults(settings: FaultSettings):
+    faults.configure(**settings.model_dump())
+    return faults.settings()
+
+@app.get("/_control/state")
+async def state():
+    return {"stats": stats, "faults": faults.settings()}
+
+def _generate(prompt: str) -> str:
+    n = next(counter)
+    if "multiple choice" in prompt:
+        return f"Question: Sample question {n}? A) one B) two C) three D) four Correct: A"
+    return f"Front: Sample concept {n} Back: Sample explanation {n}"
+
+if __name__ == "__main__":
+    run(app, 8102)
\ No newline at end of file
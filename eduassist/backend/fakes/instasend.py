@@ -0,0 +1,107 @@
+"""Fake InstaSend API.
+
+Point the backend at it with INSTASEND_BASE_URL=http://127.0.0.1:8101. Invoices
+start PENDING; settle them with POST /_control/invoices/{id}/settle, or set
+FAKE_INSTASEND_AUTO_SETTLE_SECONDS to settle automatically. When
+FAKE_INSTASEND_WEBHOOK_URL is set, settling also delivers a webhook.
+"""
+import os
+import uuid
+import asyncio
+import httpx
+from typing import Dict, Optional
+from fastapi import FastAPI, Depends, HTTPException
+from pydantic import BaseModel
+from fakes.common import FaultInjector, run
+
+faults = FaultInjector("FAKE_INSTASEND")
+app = FastAPI(title="Fake InstaSend")
+
+invoices: Dict[str, Dict] = {}
+webhooks_sent = []
+config = {
+    "webhook_url": os.getenv("FAKE_INSTASEND_WEBHOOK_URL"),
+    "webhook_challenge": os.getenv("FAKE_INSTASEND_WEBHOOK_CHALLENGE", ""),
+    "auto_settle_seconds": float(os.getenv("FAKE_INSTASEND_AUTO_SETTLE_SECONDS", 0)),
+    "auto_settle_state": os.getenv("FAKE_INSTASEND_AUTO_SETTLE_STATE", "COMPLETE")
+}
+
+class FaultSettings(BaseModel):
+    latency_ms: Optional[float] = None
+    jitter_ms: Optional[float] = None
+    error_rate: Optional[float] = None
+    error_status: Optional[int] = None
+
+@app.post("/payment/mpesa-stk-push/", dependencies=[Depends(faults)])
+async def stk_push(payload: dict):
+    invoice_id = uuid.uuid4().hex[:10].upper()
+    invoice = {
+        "invoice_id": invoice_id,
+        "state": "PENDING",
+        "value": payload.get("amount"),
+        "currency": payload.get("currency", "KES"),
+        "account": payload.get("phone_number"),
+        "api_ref": payload.get("api_ref"),
+        "provider": "M-PESA"
+    }
+    invoices[invoice_id] = invoice
+
+    if config["auto_settle_seconds"] > 0:
+        asyncio.create_task(_settle_later(invoice_id, config["auto_settle_seconds"], config["auto_settle_state"]))
+
+    return {"id": invoice_id, "invoice": invoice, "customer": {"email": payload.get("email")}}
+
+@app.get("/payment/status/{invoice_id}/", dependencies=[Depends(faults)])
+async def payment_status(invoice_id: str):
+    invoice = invoices.get(invoice_id)
+    if invoice is None:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    return {"invoice": invoice}
+
+@app.post("/_control/invoices/{invoice_id}/settle")
+async def settle(invoice_id: str, state: str = "COMPLETE"):
+    invoice = invoices.get(invoice_id)
+    if invoice is None:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    await _settle(invoice_id, state)
+    return {"invoice": invoice}
+
+@app.put("/_control/faults")
+async def set_faults(settings: FaultSettings):
+    faults.configure(**settings.model_dump())
+    return faults.settings()
+
+@app.put("/_control/config")
+async def set_config(settings: dict):
+    config.update({key: value for key, value in settings.items() if key in config})
+    return config
+
+@app.get("/_control/state")
+async def state():
+    return {"invoices": invoices, "webhooks_sent": webhooks_sent, "config": config, "faults": faults.settings()}
+
+@app.post("/_control/reset")
+async def reset():
+    invoices.clear()
+    webhooks_sent.clear()
+    return {"success": True}
+
+async def _settle_later(invoice_id: str, delay: float, state: str):
+    await asyncio.sleep(delay)
+    await _settle(invoice_id, state)
+
+async def _settle(invoice_id: str, state: str):
+    invoice = invoices[invoice_id]
+    invoice["state"] = state.upper()
+
+    if config["webhook_url"]:
+        payload = {**invoice, "challenge": config["webhook_challenge"]}
+        try:
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.post(config["webhook_url"], json=payload)
+            webhooks_sent.append({"invoice_id": invoice_id, "status_code": response.status_code})
+        except Exception as e:
+            webhooks_sent.append({"invoice_id": invoice_id, "error": str(e)})
+
+if __name__ == "__main__":
+    run(app, 8101)
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""Fake Supabase REST (PostgREST) API.
+
+Implements the subset of PostgREST used by SupabaseService against in-memory
+tables: select with column projection, eq/neq/gt/gte/lt/lte/in filters, `or`
+groups, order, limit, insert, upsert and update. Point the backend at it with
+SUPABASE_URL=http://127.0.0.1:8103 and any JWT-shaped SUPABASE_ANON_KEY.
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from fastapi import FastAPI, Depends, Request, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from fakes.common import FaultInjector, run
+
+faults = FaultInjector("FAKE_SUPABASE")
+app = FastAPI(title="Fake Supabase")
+
+tables: Dict[str, List[Dict]] = {}
+
+# Conflict targets used when an upsert does not name one
+PRIMARY_KEYS = {"generation_cache": "cache_key", "user_stats": "user_id", "flashcard_reviews": "card_id"}
+
+class FaultSettings(BaseModel):
+    latency_ms: Optional[float] = None
+    jitter_ms: Optional[float] = None
+    error_rate: Optional[float] = None
+    error_status: Optional[int] = None
+
+@app.get("/rest/v1/{table}", dependencies=[Depends(faults)])
+async def select_rows(table: str, request: Request):
+    rows = _filter_rows(tables.get(table, []), request)
+    rows = _order_rows(rows, request.query_params.get("order"))
+    if "offset" in request.query_params:
+        rows = rows[int(request.query_params["offset"]):]
+    if "limit" in request.query_params:
+        rows = rows[:int(request.query_params["limit"])]
+    return _project(rows, request.query_params.get("select", "*"))
+
+@app.post("/rest/v1/{table}", dependencies=[Depends(faults)])
+async def insert_rows(table: str, request: Request):
+    body = await request.json()
+    new_rows = body if isinstance(body, list) else [body]
+    rows = tables.setdefault(table, [])
+    prefer = request.headers.get("prefer", "")
+    conflict_keys = (request.query_params.get("on_conflict") or PRIMARY_KEYS.get(table, "id")).split(",")
+
+    saved = []
+    for new_row in new_rows:
+        existing = None
+        if "-duplicates" in prefer and all(new_row.get(key) is not None for key in conflict_keys):
+            existing = next(
+                (row for row in rows if all(row.get(key) == new_row[key] for key in conflict_keys)), None
+            )
+
+        if existing is not None:
+            # Ignored duplicates are left out of the response, as in PostgREST
+            if "resolution=merge-duplicates" in prefer:
+                existing.update(new_row)
+                saved.append(existing)
+            continue
+
+        row = {"id": str(uuid.uuid4()), "created_at": _now(), **new_row}
+        if any(other.get("id") == row["id"] for other in rows):
+            raise HTTPException(status_code=409, detail="duplicate key value violates unique constraint")
+        rows.append(row)
+        saved.append(row)
+
+    return JSONResponse(status_code=201, content=_project(saved, request.query_params.get("select", "*")))
+
+@app.patch("/rest/v1/{table}", dependencies=[Depends(faults)])
+async def update_rows(table: str, request: Request):
+    changes = await request.json()
+    rows = _filter_rows(tables.get(table, []), request)
+    for row in rows:
+        row.update(changes)
+    return rows
+
+@app.delete("/rest/v1/{table}", dependencies=[Depends(faults)])
+async def delete_rows(table: str, request: Request):
+    doomed = _filter_rows(tables.get(table, []), request)
+    tables[table] = [row for row in tables.get(table, []) if row not in doomed]
+    return doomed
+
+@app.put("/_control/faults")
+async def set_faults(settings: FaultSettings):
+    faults.configure(**settings.model_dump())
+    return faults.settings()
+
+@app.post("/_control/seed/{table}")
+async def seed(table: str, rows: List[Dict]):
+    tables.setdefault(table, []).extend(rows)
+    return {"table": table, "rows": len(tables[table])}
+
+@app.get("/_control/state")
+async def state():
+    return {"tables": {name: len(rows) for name, rows in tables.items()}, "faults": faults.settings()}
+
+@app.post("/_control/reset")
+async def reset():
+    tables.clear()
+    return {"success": True}
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _filter_rows(rows: List[Dict], request: Request) -> List[Dict]:
+    conditions = []
+    for column, expression in request.query_params.multi_items():
+        if column in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+            continue
+        if column in ("or", "and"):
+            conditions.append(_parse_group(column, expression.strip()[1:-1]))
+        else:
+            conditions.append(_parse_condition(f"{column}.{expression}"))
+    return [row for row in rows if all(condition(row) for condition in conditions)]
+
+def _split_top_level(expression: str) -> List[str]:
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in expression:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+def _parse_group(kind: str, expression: str):
+    conditions = []
+    for part in _split_top_level(expression):
+        if part.startswith(("and(", "or(")):
+            inner_kind = part[:part.index("(")]
+            conditions.append(_parse_group(inner_kind, part[len(inner_kind) + 1:-1]))
+        else:
+            conditions.append(_parse_condition(part))
+    combine = all if kind == "and" else any
+    return lambda row: combine(condition(row) for condition in conditions)
+
+def _parse_condition(expression: str):
+    column, operator, value = expression.split(".", 2)
+    negate = False
+    if operator == "not":
+        negate = True
+        operator, value = value.split(".", 1)
+    if value.startswith('"') and value.endswith('"'):
+        value = value[1:-1]
+
+    def matches(row: Dict) -> bool:
+        actual = row.get(column)
+        if operator == "is":
+            result = actual is None if value == "null" else str(actual).lower() == value
+        elif operator == "in":
+            options = [option.strip('"') for option in value.strip("()").split(",")]
+            result = _as_text(actual) in options
+        elif actual is None:
+            result = False
+        else:
+            left, right = _comparable(actual, value)
+            result = {
+                "eq": left == right,
+                "neq": left != right,
+                "gt": left > right,
+                "gte": left >= right,
+                "lt": left < right,
+                "lte": left <= right
+            }[operator]
+        return not result if negate else result
+
+    return matches
+
+def _as_text(value) -> str:
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+def _comparable(actual, value: str):
+    if isinstance(actual, bool):
+        return _as_text(actual), value.lower()
+    if isinstance(actual, (int, float)):
+        try:
+            return float(actual), float(value)
+        except ValueError:
+            return str(actual), value
+    return str(actual), value
+
+def _order_rows(rows: List[Dict], order: Optional[str]) -> List[Dict]:
+    rows = list(rows)
+    if not order:
+        return rows
+    # Apply the least significant key first; Python's sort is stable
+    for term in reversed(order.split(",")):
+        column, _, direction = term.partition(".")
+        rows.sort(key=lambda row: _sort_key(row.get(column)), reverse=direction.startswith("desc"))
+    return rows
+
+def _sort_key(value):
+    if value is None:
+        return (1, 0, "")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value, "")
+    return (0, 0, str(value))
+
+def _project(rows: List[Dict], select: str) -> List[Dict]:
+    if select in ("*", ""):
+        return rows
+    columns = [column.strip() for column in select.split(",")]
+    return [{column: row.get(column) for column in columns} for row in rows]
+
+if __name__ == "__main__":
+    run(app, 8103)
\ No newline at end of file
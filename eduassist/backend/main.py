@@ -1,14 +1,47 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from contextlib import asynccontextmanager
 import os
-from dotenv import load_dotenv
+from services.config import load_env
 from routes import auth, quiz, flashcard, progress, payment
-from services.supabase_service import supabase_client
+from services.http_client import get_outbound_stats
+from services.container import container
+from services.generation_backend import list_backends
+from services.supabase_service import supabase_service
+from services.cache_service import generation_cache
+from services.singleflight import generation_singleflight
+from services.pregeneration_service import pregeneration_pool
+from services.progress_writer import progress_writer
+from services.payment_reconciler import payment_reconciler
+from services.admission_service import admission_controller
+from services.review_scheduler import review_scheduler
+from services.sync_service import progress_sync
+from services.http_response import CompressionMiddleware
+from services.metrics import metrics, MetricsMiddleware, loop_lag_monitor
 
-load_dotenv()
+load_env()
 
-app = FastAPI(title="EduAssist API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are created on first use unless listed here, e.g. PREWARM_SERVICES=supabase,huggingface
+    prewarm = [name.strip() for name in os.getenv("PREWARM_SERVICES", "").split(",") if name.strip()]
+    await container.warm(prewarm)
+    await loop_lag_monitor.start()
+    await pregeneration_pool.start()
+    await progress_writer.start()
+    await payment_reconciler.start()
+    yield
+    await payment_reconciler.stop()
+    await pregeneration_pool.stop()
+    # Flush buffered progress before the database pool goes away
+    await progress_writer.stop()
+    # Release pooled connections of every client that was created
+    await container.close()
+    supabase_service.close()
+    await loop_lag_monitor.stop()
+
+app = FastAPI(title="EduAssist API", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -19,17 +52,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-security = HTTPBearer()
+# Compress large JSON bodies; streamed generation frames are left alone
+app.add_middleware(CompressionMiddleware)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        # Verify token with Supabase
-        response = supabase_client.auth.get_user(credentials.credentials)
-        if response.user:
-            return response.user
-        raise HTTPException(status_code=401, detail="Invalid token")
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid token")
+# Route latency and status metrics, scraped from /metrics
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["authentication"])
@@ -46,6 +73,47 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        "success": True,
+        "cache": generation_cache.get_stats(),
+        "profiles": supabase_service.profile_cache.get_stats(),
+        "answer_keys": supabase_service.answer_keys.get_stats(),
+        "singleflight": generation_singleflight.get_stats()
+    }
+
+@app.get("/db/metrics")
+async def db_metrics():
+    return {
+        "success": True,
+        "database": supabase_service.get_metrics(),
+        "progress_writer": progress_writer.get_stats(),
+        "payment_reconciler": payment_reconciler.get_stats(),
+        "review_scheduler": review_scheduler.get_stats(),
+        "progress_sync": progress_sync.get_stats()
+    }
+
+@app.get("/outbound/metrics")
+async def outbound_metrics():
+    return {"success": True, "providers": get_outbound_stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def scrape_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admission/stats")
+async def admission_stats():
+    return {"success": True, "admission": admission_controller.get_stats()}
+
+@app.get("/services/status")
+async def services_status():
+    return {"success": True, "services": container.get_status(), "generation_backends": list_backends()}
+
+@app.get("/pool/status")
+async def pool_status():
+    return {"success": True, "pool": pregeneration_pool.get_status()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8000)))
\ No newline at end of file
@@ -0,0 +1,9 @@
+-- Tier 2 of the generation cache: generated quizzes and flashcard sets shared between workers.
+-- Rows are looked up and upserted by cache_key; expired rows are ignored on read.
+create table if not exists generation_cache (
+    cache_key text primary key,
+    kind text not null,
+    items jsonb not null,
+    expires_at timestamptz not null,
+    created_at timestamptz not null default now()
+);
\ No newline at end of file
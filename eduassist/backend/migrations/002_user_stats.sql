@@ -0,0 +1,10 @@
+-- Per-user dashboard counters, maintained incrementally as progress is saved.
+-- save_user_stats upserts on user_id, so it must be the primary key.
+create table if not exists user_stats (
+    user_id uuid primary key,
+    total_quizzes integer not null default 0,
+    total_flashcard_sessions integer not null default 0,
+    quiz_score_sum bigint not null default 0,
+    quiz_score_count integer not null default 0,
+    topics jsonb not null default '[]'::jsonb
+);
\ No newline at end of file
@@ -0,0 +1,6 @@
+-- Idempotency key for progress rows: set by the write-behind buffer and by offline sync.
+-- Bulk writes upsert on (user_id, client_id) and ignore rows that already landed.
+alter table progress add column if not exists client_id text;
+
+create unique index if not exists progress_user_client_id_key
+    on progress (user_id, client_id);
\ No newline at end of file
@@ -0,0 +1,17 @@
+-- Spaced-repetition schedule per flashcard, one row per card of each generated set.
+create table if not exists flashcard_reviews (
+    card_id text primary key,
+    user_id uuid not null,
+    set_id uuid not null,
+    card_index integer not null,
+    topic text,
+    front text,
+    back text,
+    ease double precision not null,
+    interval_days integer not null,
+    repetitions integer not null,
+    due_at timestamptz not null,
+    last_reviewed_at timestamptz
+);
+
+create index if not exists flashcard_reviews_user_due_idx on flashcard_reviews (user_id, due_at);
\ No newline at end of file
@@ -0,0 +1,15 @@
+-- Flashcard sets stored as one row per card, so sets can be served in slices.
+-- Sets saved before this keep their cards in flashcard_sets.flashcards and have no card_count.
+alter table flashcard_sets add column if not exists card_count integer;
+
+-- Cards are written before their set row, in a separate request, so set_id has no foreign key;
+-- the API deletes the cards again if the set row cannot be written.
+create table if not exists flashcard_cards (
+    set_id uuid not null,
+    card_index integer not null,
+    front text,
+    back text,
+    difficulty text,
+    degraded boolean not null default false,
+    primary key (set_id, card_index)
+);
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any
 from datetime import datetime
 
 class User(BaseModel):
@@ -8,6 +8,12 @@ class User(BaseModel):
     created_at: datetime
     is_premium: bool = False
 
+class AuthUser(BaseModel):
+    id: str
+    email: Optional[str] = None
+    role: Optional[str] = None
+    user_metadata: Dict[str, Any] = {}
+
 class Quiz(BaseModel):
     id: Optional[str] = None
     user_id: str
@@ -43,13 +49,43 @@ class Payment(BaseModel):
     instasend_transaction_id: str
     created_at: Optional[datetime] = None
 
+# Largest quiz or flashcard set a single request may ask for
+MAX_GENERATION_ITEMS = 50
+
 class QuizRequest(BaseModel):
     topic: str
-    num_questions: int = 5
+    num_questions: int = Field(5, ge=1, le=MAX_GENERATION_ITEMS)
+    fresh: bool = False  # Skip the generation cache
+    time_budget: Optional[float] = Field(None, gt=0)  # Seconds; can only tighten the tier's budget
 
 class FlashcardRequest(BaseModel):
     topic: str
-    num_cards: int = 10
+    num_cards: int = Field(10, ge=1, le=MAX_GENERATION_ITEMS)
+    fresh: bool = False  # Skip the generation cache
+    time_budget: Optional[float] = Field(None, gt=0)  # Seconds; can only tighten the tier's budget
+
+class CardReview(BaseModel):
+    card_id: str
+    quality: int = Field(ge=0, le=5)  # SM-2 grade: 0 = forgot, 5 = perfect recall
+
+class ReviewBatchRequest(BaseModel):
+    results: List[CardReview]
+
+class QuizSyncItem(BaseModel):
+    client_id: str = Field(min_length=1, max_length=64)  # Idempotency id generated on the device
+    quiz_id: str
+    answers: List[Any] = []
+    completed_at: datetime
+
+class FlashcardSyncItem(BaseModel):
+    client_id: str = Field(min_length=1, max_length=64)
+    topic: str = Field(min_length=1)
+    cards_reviewed: int = Field(0, ge=0)
+    completed_at: datetime
+
+class SyncBatchRequest(BaseModel):
+    # Items are validated one by one so a single bad result does not reject the batch
+    results: List[Any]
 
 class PaymentRequest(BaseModel):
     amount: float
@@ -0,0 +1,22 @@
+"""Recompute per-user dashboard stats from progress history.
+
+Usage: python rebuild_stats.py [user_id ...]
+With no arguments, stats are rebuilt for every user in the users table.
+"""
+import sys
+import asyncio
+from services.supabase_service import supabase_service
+
+async def rebuild(user_ids):
+    if not user_ids:
+        user_ids = await supabase_service.list_user_ids()
+    
+    for user_id in user_ids:
+        stats = await supabase_service.rebuild_user_stats(user_id)
+        saved = stats is not None and not supabase_service.has_stale_stats(user_id)
+        print(f"{user_id}: {'rebuilt' if saved else 'failed'}")
+    
+    supabase_service.close()
+
+if __name__ == "__main__":
+    asyncio.run(rebuild(sys.argv[1:]))
\ No newline at end of file
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from services.supabase_service import supabase_service, supabase_client
+from services.supabase_service import supabase_service, get_supabase_client
 
 router = APIRouter()
 
@@ -16,7 +16,7 @@ class SignInRequest(BaseModel):
 async def sign_up(request: SignUpRequest):
     try:
         # Create user with Supabase Auth
-        auth_response = supabase_client.auth.sign_up({
+        auth_response = get_supabase_client().auth.sign_up({
             "email": request.email,
             "password": request.password
         })
@@ -43,7 +43,7 @@ async def sign_up(request: SignUpRequest):
 @router.post("/signin")
 async def sign_in(request: SignInRequest):
     try:
-        auth_response = supabase_client.auth.sign_in_with_password({
+        auth_response = get_supabase_client().auth.sign_in_with_password({
             "email": request.email,
             "password": request.password
         })
@@ -64,7 +64,7 @@ async def sign_in(request: SignInRequest):
 @router.post("/signout")
 async def sign_out():
     try:
-        supabase_client.auth.sign_out()
+        get_supabase_client().auth.sign_out()
         return {"success": True, "message": "Signed out successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -1,22 +1,53 @@
-from fastapi import APIRouter, HTTPException, Depends
-from models.database import FlashcardRequest
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from models.database import FlashcardRequest, ReviewBatchRequest, SyncBatchRequest
 from services.ai_service import ai_service
-from services.supabase_service import supabase_service
-from main import get_current_user
+from services.supabase_service import supabase_service, SupabaseReadError
+from services.cache_service import generation_cache
+from services.pregeneration_service import pregeneration_pool
+from services.stream_service import STREAM_MEDIA_TYPES, encode_frame
+from services.http_response import conditional_json
+from services.pagination import encode_cursor, decode_cursor
+from services.progress_writer import progress_writer
+from services.sync_service import progress_sync
+from services.review_scheduler import review_scheduler
+from starlette.background import BackgroundTask
+from dependencies import get_current_user, admit_generation
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter()
 
+SET_DEFAULT_PAGE_SIZE = 20
+SET_MAX_PAGE_SIZE = 100
+
 @router.post("/generate")
 async def generate_flashcards(request: FlashcardRequest, current_user = Depends(get_current_user)):
     try:
         # Check if user is premium for more than 10 cards
         user_profile = await supabase_service.get_user_profile(current_user.id)
-        if request.num_cards > 10 and not user_profile.get("is_premium", False):
+        if request.num_cards > 10 and not (user_profile or {}).get("is_premium", False):
             raise HTTPException(status_code=403, detail="Premium subscription required for more than 10 flashcards")
         
-        # Generate flashcards using AI
-        flashcards = await ai_service.generate_flashcards(request.topic, request.num_cards)
+        # The time budget covers waiting for admission as well as generation
+        deadline = ai_service.deadline_for((user_profile or {}).get("is_premium", False), request.time_budget)
+        
+        # Hold generation capacity only while items are being produced
+        async with await admit_generation(current_user.id, request.num_cards, user_profile):
+            # Serve trending topics from the pre-generated pool when it has enough items
+            pregeneration_pool.record_request("flashcard", request.topic)
+            flashcards = None if request.fresh else pregeneration_pool.take("flashcard", request.topic, request.num_cards)
+            
+            # Otherwise generate flashcards using AI, reusing a cached set for popular topics
+            if flashcards is None:
+                flashcards = await generation_cache.get_or_generate(
+                    "flashcard", request.topic, request.num_cards,
+                    lambda topic, count: ai_service.generate_flashcards(topic, count, deadline),
+                    parameters=ai_service.flashcard_parameters, fresh=request.fresh,
+                    # Joining an identical in-flight request must still respect this request's own budget
+                    timeout=ai_service.time_left(deadline),
+                    fallback=lambda topic, count: ai_service.fallback_items("flashcard", topic, count)
+                )
         
         # Save flashcard set to database
         flashcard_data = {
@@ -27,6 +58,10 @@ async def generate_flashcards(request: FlashcardRequest, current_user = Depends(
         }
         
         saved_set = await supabase_service.save_flashcard_set(flashcard_data)
+        scheduled = False
+        if saved_set:
+            # A failed schedule write is logged and retried by the scheduler
+            scheduled = await review_scheduler.add_set(current_user.id, saved_set["id"], request.topic, flashcards)
         
         return {
             "success": True,
@@ -34,12 +69,76 @@ async def generate_flashcards(request: FlashcardRequest, current_user = Depends(
                 "id": saved_set["id"] if saved_set else None,
                 "topic": request.topic,
                 "flashcards": flashcards
-            }
+            },
+            "review_scheduled": scheduled
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/generate/stream")
+async def generate_flashcards_stream(request: FlashcardRequest, stream_format: str = Query("ndjson", alias="format"), current_user = Depends(get_current_user)):
+    # Validate before the response starts so errors still map to status codes
+    if stream_format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format: {stream_format}")
+    
+    user_profile = await supabase_service.get_user_profile(current_user.id)
+    if request.num_cards > 10 and not (user_profile or {}).get("is_premium", False):
+        raise HTTPException(status_code=403, detail="Premium subscription required for more than 10 flashcards")
+    
+    deadline = ai_service.deadline_for((user_profile or {}).get("is_premium", False), request.time_budget)
+    ticket = await admit_generation(current_user.id, request.num_cards, user_profile)
+    pregeneration_pool.record_request("flashcard", request.topic)
+    
+    async def frames():
+        try:
+            flashcards = None if request.fresh else pregeneration_pool.take("flashcard", request.topic, request.num_cards)
+            if flashcards is not None:
+                for i, flashcard in enumerate(flashcards):
+                    yield encode_frame({"type": "flashcard", "index": i, "flashcard": flashcard}, stream_format)
+            else:
+                # Emit each flashcard as soon as its model call finishes; identical in-flight requests share one generation
+                flashcards = [None] * request.num_cards
+                async for i, flashcard in generation_cache.stream_or_generate(
+                    "flashcard", request.topic, request.num_cards,
+                    lambda topic, count: ai_service.stream_flashcards(topic, count, deadline),
+                    parameters=ai_service.flashcard_parameters, fresh=request.fresh,
+                    timeout=ai_service.time_left(deadline),
+                    fallback=lambda topic, count: ai_service.fallback_items("flashcard", topic, count)
+                ):
+                    flashcards[i] = flashcard
+                    yield encode_frame({"type": "flashcard", "index": i, "flashcard": flashcard}, stream_format)
+            ticket.release()
+            
+            flashcard_data = {
+                "user_id": current_user.id,
+                "topic": request.topic,
+                "flashcards": flashcards,
+                "created_at": datetime.now().isoformat()
+            }
+            saved_set = await supabase_service.save_flashcard_set(flashcard_data)
+            scheduled = False
+            if saved_set:
+                scheduled = await review_scheduler.add_set(current_user.id, saved_set["id"], request.topic, flashcards)
+            
+            yield encode_frame({
+                "type": "done",
+                "id": saved_set["id"] if saved_set else None,
+                "topic": request.topic,
+                "count": len(flashcards),
+                "review_scheduled": scheduled
+            }, stream_format)
+            
+        except Exception as e:
+            yield encode_frame({"type": "error", "detail": str(e)}, stream_format)
+        finally:
+            ticket.release()
+    
+    # The background task covers a client that disconnects before the stream starts
+    return StreamingResponse(frames(), media_type=STREAM_MEDIA_TYPES[stream_format], background=BackgroundTask(ticket.release))
+
 @router.post("/complete/{topic}")
 async def complete_flashcard_session(topic: str, session_data: dict, current_user = Depends(get_current_user)):
     try:
@@ -52,7 +151,7 @@ async def complete_flashcard_session(topic: str, session_data: dict, current_use
             "completed_at": datetime.now().isoformat()
         }
         
-        await supabase_service.save_progress(progress_data)
+        await progress_writer.record(progress_data)
         
         return {
             "success": True,
@@ -61,4 +160,123 @@ async def complete_flashcard_session(topic: str, session_data: dict, current_use
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/due")
+async def get_due_flashcards(limit: int = Query(20, ge=1, le=100), current_user = Depends(get_current_user)):
+    due = await review_scheduler.get_due(current_user.id, limit)
+    if due is None:
+        raise HTTPException(status_code=503, detail="Review schedule is temporarily unavailable")
+    
+    return {
+        "success": True,
+        "cards": [
+            {
+                "card_id": card["card_id"],
+                "set_id": card["set_id"],
+                "topic": card["topic"],
+                "front": card["front"],
+                "back": card["back"],
+                "due_at": card["due_at"],
+                "repetitions": card["repetitions"],
+                "interval_days": card["interval_days"]
+            }
+            for card in due["cards"]
+        ],
+        "has_more": due["has_more"]
+    }
+
+@router.post("/review")
+async def review_flashcards(request: ReviewBatchRequest, current_user = Depends(get_current_user)):
+    if len(request.results) > review_scheduler.max_batch:
+        raise HTTPException(status_code=400, detail=f"At most {review_scheduler.max_batch} reviews per request")
+    
+    outcomes = await review_scheduler.record_reviews(
+        current_user.id, [result.model_dump() for result in request.results]
+    )
+    if outcomes is None:
+        raise HTTPException(status_code=503, detail="Could not save review results")
+    
+    return {
+        "success": True,
+        "reviewed": sum(1 for outcome in outcomes if outcome["status"] == "ok"),
+        "results": outcomes
+    }
+
+@router.post("/sync")
+async def sync_flashcard_sessions(request: SyncBatchRequest, current_user = Depends(get_current_user)):
+    if len(request.results) > progress_sync.max_batch:
+        raise HTTPException(status_code=400, detail=f"At most {progress_sync.max_batch} results per request")
+    
+    outcomes = await progress_sync.sync_flashcards(current_user.id, request.results)
+    if outcomes is None:
+        raise HTTPException(status_code=503, detail="Could not sync results, please retry")
+    
+    return {
+        "success": True,
+        "saved": sum(1 for outcome in outcomes if outcome["status"] == "saved"),
+        "results": outcomes
+    }
+
+@router.get("/sets")
+async def list_flashcard_sets(
+    request: Request,
+    limit: int = Query(SET_DEFAULT_PAGE_SIZE, ge=1, le=SET_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
+    after = decode_cursor(cursor) if cursor else None
+    
+    # Fetch one extra row to know whether another page exists
+    sets = await supabase_service.list_flashcard_sets(current_user.id, after=after, limit=limit + 1)
+    if sets is None:
+        raise HTTPException(status_code=500, detail="Could not list flashcard sets")
+    
+    has_more = len(sets) > limit
+    sets = sets[:limit]
+    return conditional_json(request, {
+        "success": True,
+        "flashcard_sets": [_set_metadata(flashcard_set) for flashcard_set in sets],
+        "next_cursor": encode_cursor(sets[-1], "created_at") if has_more else None,
+        "has_more": has_more
+    })
+
+@router.get("/sets/{set_id}")
+async def get_flashcard_set(
+    request: Request,
+    set_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(SET_DEFAULT_PAGE_SIZE, ge=1, le=SET_MAX_PAGE_SIZE),
+    current_user = Depends(get_current_user)
+):
+    try:
+        flashcard_set = await supabase_service.get_flashcard_set(set_id)
+    except SupabaseReadError:
+        raise HTTPException(status_code=500, detail="Could not load flashcard set")
+    if flashcard_set is None or flashcard_set["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Flashcard set not found")
+    
+    # Fetch one extra card to know whether another slice exists
+    flashcards = await supabase_service.get_flashcard_cards(flashcard_set, offset, limit + 1)
+    if flashcards is None:
+        raise HTTPException(status_code=500, detail="Could not load flashcards")
+    
+    has_more = len(flashcards) > limit
+    flashcards = flashcards[:limit]
+    # Saved sets never change, so clients can revalidate slices cheaply
+    return conditional_json(request, {
+        "success": True,
+        "flashcard_set": _set_metadata(flashcard_set),
+        "flashcards": flashcards,
+        "offset": offset,
+        "next_offset": offset + len(flashcards) if has_more else None,
+        "has_more": has_more
+    })
+
+def _set_metadata(flashcard_set: dict) -> dict:
+    return {
+        "id": flashcard_set["id"],
+        "topic": flashcard_set["topic"],
+        "card_count": flashcard_set.get("card_count"),
+        "created_at": flashcard_set.get("created_at")
+    }
\ No newline at end of file
@@ -1,12 +1,49 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from models.database import PaymentRequest
 from services.payment_service import payment_service
-from services.supabase_service import supabase_service
-from main import get_current_user
+from services.supabase_service import supabase_service, SupabaseReadError
+from services.payment_reconciler import payment_reconciler, OPEN_STATES
+from services.http_response import conditional_json, make_etag
+from dependencies import get_current_user
 from datetime import datetime
+import hmac
+import orjson
 
 router = APIRouter()
 
+PREMIUM_PLANS = [
+    {
+        "name": "Premium Monthly",
+        "price": 500,  # KES
+        "currency": "KES",
+        "features": [
+            "Unlimited quiz questions",
+            "Unlimited flashcards",
+            "Advanced AI models",
+            "Progress analytics",
+            "Priority support"
+        ],
+        "duration": "1 month"
+    },
+    {
+        "name": "Premium Yearly",
+        "price": 5000,  # KES
+        "currency": "KES",
+        "features": [
+            "Unlimited quiz questions",
+            "Unlimited flashcards",
+            "Advanced AI models",
+            "Progress analytics",
+            "Priority support"
+        ],
+        "duration": "1 year",
+        "discount": "17% off"
+    }
+]
+
+PLANS_BODY = orjson.dumps({"success": True, "plans": PREMIUM_PLANS})
+PLANS_ETAG = make_etag(PLANS_BODY)
+
 @router.post("/initiate")
 async def initiate_payment(request: PaymentRequest, current_user = Depends(get_current_user)):
     try:
@@ -44,57 +81,67 @@ async def initiate_payment(request: PaymentRequest, current_user = Depends(get_c
 @router.get("/status/{transaction_id}")
 async def check_payment_status(transaction_id: str, current_user = Depends(get_current_user)):
     try:
-        # Check payment status with InstaSend
-        status_result = await payment_service.check_payment_status(transaction_id)
+        # Webhooks and the reconciler usually settle payments first, so check our record before InstaSend
+        try:
+            payment = await supabase_service.get_payment(transaction_id)
+        except SupabaseReadError:
+            raise HTTPException(status_code=500, detail="Could not load payment")
+        if payment is None or payment["user_id"] != current_user.id:
+            raise HTTPException(status_code=404, detail="Payment not found")
+        if payment["status"] not in OPEN_STATES:
+            return {
+                "success": True,
+                "status": payment["status"],
+                "payment_status": {"status": payment["status"]}
+            }
         
-        if status_result["success"]:
-            payment_data = status_result["data"]
-            
-            # If payment is successful, update user to premium
-            if payment_data.get("status") == "completed":
-                await supabase_service.update_user_premium(current_user.id, True)
-            
+        # Check payment status with InstaSend; a completed payment upgrades its owner once
+        outcome = await payment_reconciler.check_and_apply(transaction_id)
+        
+        if outcome is not None:
             return {
                 "success": True,
-                "payment_status": payment_data
+                "status": outcome["status"],
+                "payment_status": outcome["data"]
             }
         else:
             raise HTTPException(status_code=400, detail="Failed to check payment status")
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/webhook")
+async def payment_webhook(payload: dict):
+    # InstaSend echoes the challenge configured for the webhook
+    if payment_service.webhook_challenge and not hmac.compare_digest(
+        str(payload.get("challenge", "")), payment_service.webhook_challenge
+    ):
+        raise HTTPException(status_code=401, detail="Invalid webhook challenge")
+    
+    transaction_id = payload.get("invoice_id") or (payload.get("invoice") or {}).get("invoice_id") or payload.get("id")
+    if not transaction_id:
+        raise HTTPException(status_code=400, detail="Missing invoice_id")
+    
+    try:
+        # Redelivered callbacks for settled payments are acknowledged without further work
+        payment = await supabase_service.get_payment(transaction_id)
+        if payment and payment["status"] not in OPEN_STATES:
+            return {"success": True, "status": payment["status"], "processed": False}
+        
+        # The callback body is not trusted for upgrades; confirm the state with InstaSend
+        outcome = await payment_reconciler.check_and_apply(transaction_id)
+    except SupabaseReadError:
+        # Acknowledging now would lose the callback; a 500 makes InstaSend redeliver it
+        raise HTTPException(status_code=500, detail="Could not load payment")
+    if outcome is None:
+        # A non-2xx response makes InstaSend retry the delivery
+        raise HTTPException(status_code=502, detail="Could not confirm payment status")
+    
+    return {"success": True, "status": outcome["status"], "processed": outcome["changed"]}
+
 @router.get("/plans")
-async def get_premium_plans():
-    return {
-        "success": True,
-        "plans": [
-            {
-                "name": "Premium Monthly",
-                "price": 500,  # KES
-                "currency": "KES",
-                "features": [
-                    "Unlimited quiz questions",
-                    "Unlimited flashcards",
-                    "Advanced AI models",
-                    "Progress analytics",
-                    "Priority support"
-                ],
-                "duration": "1 month"
-            },
-            {
-                "name": "Premium Yearly",
-                "price": 5000,  # KES
-                "currency": "KES",
-                "features": [
-                    "Unlimited quiz questions",
-                    "Unlimited flashcards",
-                    "Advanced AI models",
-                    "Progress analytics",
-                    "Priority support"
-                ],
-                "duration": "1 year",
-                "discount": "17% off"
-            }
-        ]
-    }
\ No newline at end of file
+async def get_premium_plans(request: Request):
+    # The plans never change at runtime, so the body and its ETag are built once
+    return conditional_json(request, None, body=PLANS_BODY, etag=PLANS_ETAG, cache_control="public, max-age=3600")
\ No newline at end of file
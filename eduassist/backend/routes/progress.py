@@ -1,52 +1,102 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from typing import Optional
+from datetime import datetime
 from services.supabase_service import supabase_service
-from main import get_current_user
+from services.stats_service import apply_progress, summarize_stats
+from services.progress_writer import progress_writer
+from services.http_response import conditional_json
+from services.pagination import encode_cursor, decode_cursor
+from dependencies import get_current_user
 
 router = APIRouter()
 
+HISTORY_DEFAULT_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+HISTORY_FIELDS = {"id", "user_id", "topic", "activity_type", "score", "completed_at"}
+
 @router.get("/dashboard")
-async def get_dashboard_data(current_user = Depends(get_current_user)):
+async def get_dashboard_data(request: Request, current_user = Depends(get_current_user)):
     try:
-        # Get user progress
-        progress_data = await supabase_service.get_user_progress(current_user.id)
+        # Stats are maintained incrementally by save_progress
+        stats = await supabase_service.get_user_stats(current_user.id)
+        if stats is None:
+            stats = await supabase_service.rebuild_user_stats(current_user.id)
+            if stats is None:
+                # Empty counters would look like a user with no activity
+                raise HTTPException(status_code=500, detail="Could not load progress stats")
         
-        # Calculate statistics
-        total_quizzes = len([p for p in progress_data if p["activity_type"] == "quiz"])
-        total_flashcard_sessions = len([p for p in progress_data if p["activity_type"] == "flashcard"])
+        # Recent activity (last 10)
+        recent_activity = await supabase_service.get_recent_progress(current_user.id, limit=10)
         
-        quiz_scores = [p["score"] for p in progress_data if p["activity_type"] == "quiz" and p["score"]]
-        average_quiz_score = sum(quiz_scores) / len(quiz_scores) if quiz_scores else 0
+        # Merge the user's own buffered writes so they see them immediately
+        pending = progress_writer.pending_for(current_user.id)
+        if pending:
+            stats = {**stats, "topics": list(stats["topics"])}
+            for progress in pending:
+                apply_progress(stats, progress)
+            recent_activity = (pending + recent_activity)[:10]
         
-        # Get unique topics studied
-        topics_studied = list(set([p["topic"] for p in progress_data]))
+        summary = summarize_stats(stats)
         
-        # Recent activity (last 10)
-        recent_activity = progress_data[:10]
-        
-        return {
+        # Clients polling the dashboard get a 304 while nothing has changed
+        return conditional_json(request, {
             "success": True,
             "dashboard": {
-                "total_quizzes": total_quizzes,
-                "total_flashcard_sessions": total_flashcard_sessions,
-                "average_quiz_score": round(average_quiz_score, 1),
-                "topics_studied": len(topics_studied),
+                "total_quizzes": summary["total_quizzes"],
+                "total_flashcard_sessions": summary["total_flashcard_sessions"],
+                "average_quiz_score": summary["average_quiz_score"],
+                "topics_studied": summary["topics_studied"],
                 "recent_activity": recent_activity,
-                "topics_list": topics_studied
+                "topics_list": summary["topics_list"]
             }
-        }
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/history")
-async def get_progress_history(current_user = Depends(get_current_user)):
+async def get_progress_history(
+    request: Request,
+    limit: int = Query(HISTORY_DEFAULT_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    topic: Optional[str] = None,
+    activity_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user = Depends(get_current_user)
+):
+    columns = None
+    if fields:
+        columns = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = set(columns) - HISTORY_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        # The keyset cursor needs both sort columns
+        columns = list(dict.fromkeys(columns + ["completed_at", "id"]))
+    
+    after = decode_cursor(cursor) if cursor else None
+    
     try:
-        progress_data = await supabase_service.get_user_progress(current_user.id)
+        # Fetch one extra row to know whether another page exists
+        progress_data = await supabase_service.get_user_progress(
+            current_user.id, columns=columns, topic=topic, activity_type=activity_type,
+            since=since.isoformat() if since else None, until=until.isoformat() if until else None,
+            after=after, limit=limit + 1
+        )
+        
+        has_more = len(progress_data) > limit
+        progress_data = progress_data[:limit]
+        next_cursor = encode_cursor(progress_data[-1], "completed_at") if has_more else None
         
-        return {
+        return conditional_json(request, {
             "success": True,
-            "history": progress_data
-        }
+            "history": progress_data,
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
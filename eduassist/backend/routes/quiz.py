@@ -1,8 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
-from models.database import QuizRequest, Quiz
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from models.database import QuizRequest, Quiz, SyncBatchRequest
 from services.ai_service import ai_service
-from services.supabase_service import supabase_service
-from main import get_current_user
+from services.supabase_service import supabase_service, SupabaseReadError
+from services.cache_service import generation_cache
+from services.pregeneration_service import pregeneration_pool
+from services.stream_service import STREAM_MEDIA_TYPES, encode_frame
+from services.progress_writer import progress_writer
+from services.sync_service import progress_sync
+from services.answer_key_cache import score_answers
+from starlette.background import BackgroundTask
+from dependencies import get_current_user, admit_generation
 from datetime import datetime
 
 router = APIRouter()
@@ -12,11 +20,28 @@ async def generate_quiz(request: QuizRequest, current_user = Depends(get_current
     try:
         # Check if user is premium for more than 5 questions
         user_profile = await supabase_service.get_user_profile(current_user.id)
-        if request.num_questions > 5 and not user_profile.get("is_premium", False):
+        if request.num_questions > 5 and not (user_profile or {}).get("is_premium", False):
             raise HTTPException(status_code=403, detail="Premium subscription required for more than 5 questions")
         
-        # Generate quiz using AI
-        questions = await ai_service.generate_quiz(request.topic, request.num_questions)
+        # The time budget covers waiting for admission as well as generation
+        deadline = ai_service.deadline_for((user_profile or {}).get("is_premium", False), request.time_budget)
+        
+        # Hold generation capacity only while items are being produced
+        async with await admit_generation(current_user.id, request.num_questions, user_profile):
+            # Serve trending topics from the pre-generated pool when it has enough items
+            pregeneration_pool.record_request("quiz", request.topic)
+            questions = None if request.fresh else pregeneration_pool.take("quiz", request.topic, request.num_questions)
+            
+            # Otherwise generate quiz using AI, reusing a cached set for popular topics
+            if questions is None:
+                questions = await generation_cache.get_or_generate(
+                    "quiz", request.topic, request.num_questions,
+                    lambda topic, count: ai_service.generate_quiz(topic, count, deadline),
+                    parameters=ai_service.quiz_parameters, fresh=request.fresh,
+                    # Joining an identical in-flight request must still respect this request's own budget
+                    timeout=ai_service.time_left(deadline),
+                    fallback=lambda topic, count: ai_service.fallback_items("quiz", topic, count)
+                )
         
         # Save quiz to database
         quiz_data = {
@@ -37,31 +62,95 @@ async def generate_quiz(request: QuizRequest, current_user = Depends(get_current
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/generate/stream")
+async def generate_quiz_stream(request: QuizRequest, stream_format: str = Query("ndjson", alias="format"), current_user = Depends(get_current_user)):
+    # Validate before the response starts so errors still map to status codes
+    if stream_format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format: {stream_format}")
+    
+    user_profile = await supabase_service.get_user_profile(current_user.id)
+    if request.num_questions > 5 and not (user_profile or {}).get("is_premium", False):
+        raise HTTPException(status_code=403, detail="Premium subscription required for more than 5 questions")
+    
+    deadline = ai_service.deadline_for((user_profile or {}).get("is_premium", False), request.time_budget)
+    ticket = await admit_generation(current_user.id, request.num_questions, user_profile)
+    pregeneration_pool.record_request("quiz", request.topic)
+    
+    async def frames():
+        try:
+            questions = None if request.fresh else pregeneration_pool.take("quiz", request.topic, request.num_questions)
+            if questions is not None:
+                for i, question in enumerate(questions):
+                    yield encode_frame({"type": "question", "index": i, "question": question}, stream_format)
+            else:
+                # Emit each question as soon as its model call finishes; identical in-flight requests share one generation
+                questions = [None] * request.num_questions
+                async for i, question in generation_cache.stream_or_generate(
+                    "quiz", request.topic, request.num_questions,
+                    lambda topic, count: ai_service.stream_quiz(topic, count, deadline),
+                    parameters=ai_service.quiz_parameters, fresh=request.fresh,
+                    timeout=ai_service.time_left(deadline),
+                    fallback=lambda topic, count: ai_service.fallback_items("quiz", topic, count)
+                ):
+                    questions[i] = question
+                    yield encode_frame({"type": "question", "index": i, "question": question}, stream_format)
+            ticket.release()
+            
+            quiz_data = {
+                "user_id": current_user.id,
+                "topic": request.topic,
+                "questions": questions,
+                "created_at": datetime.now().isoformat()
+            }
+            saved_quiz = await supabase_service.save_quiz(quiz_data)
+            
+            yield encode_frame({
+                "type": "done",
+                "id": saved_quiz["id"] if saved_quiz else None,
+                "topic": request.topic,
+                "count": len(questions)
+            }, stream_format)
+            
+        except Exception as e:
+            yield encode_frame({"type": "error", "detail": str(e)}, stream_format)
+        finally:
+            ticket.release()
+    
+    # The background task covers a client that disconnects before the stream starts
+    return StreamingResponse(frames(), media_type=STREAM_MEDIA_TYPES[stream_format], background=BackgroundTask(ticket.release))
+
 @router.post("/submit/{quiz_id}")
 async def submit_quiz(quiz_id: str, answers: dict, current_user = Depends(get_current_user)):
     try:
-        # Calculate score
         user_answers = answers.get("answers", [])
         
-        # Get quiz from database to check correct answers
-        # For now, we'll simulate scoring
-        total_questions = len(user_answers)
-        correct_answers = sum(1 for i, answer in enumerate(user_answers) if answer == 0)  # Assuming first option is always correct for demo
+        # Score against the stored quiz's answer key
+        try:
+            answer_key = await supabase_service.get_quiz_answer_key(quiz_id)
+        except SupabaseReadError:
+            raise HTTPException(status_code=500, detail="Could not load quiz")
+        if answer_key is None or answer_key["user_id"] != current_user.id:
+            raise HTTPException(status_code=404, detail="Quiz not found")
+        
+        total_questions = len(answer_key["answers"])
+        correct_answers = score_answers(answer_key, user_answers)
         score = int((correct_answers / total_questions) * 100) if total_questions > 0 else 0
         
         # Save progress
         progress_data = {
             "user_id": current_user.id,
-            "topic": answers.get("topic", "Unknown"),
+            "topic": answer_key["topic"] or answers.get("topic", "Unknown"),
             "activity_type": "quiz",
             "score": score,
             "completed_at": datetime.now().isoformat()
         }
         
-        await supabase_service.save_progress(progress_data)
+        await progress_writer.record(progress_data)
         
         return {
             "success": True,
@@ -71,5 +160,22 @@ async def submit_quiz(quiz_id: str, answers: dict, current_user = Depends(get_cu
             "percentage": score
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/sync")
+async def sync_quiz_results(request: SyncBatchRequest, current_user = Depends(get_current_user)):
+    if len(request.results) > progress_sync.max_batch:
+        raise HTTPException(status_code=400, detail=f"At most {progress_sync.max_batch} results per request")
+    
+    outcomes = await progress_sync.sync_quizzes(current_user.id, request.results)
+    if outcomes is None:
+        raise HTTPException(status_code=503, detail="Could not sync results, please retry")
+    
+    return {
+        "success": True,
+        "saved": sum(1 for outcome in outcomes if outcome["status"] == "saved"),
+        "results": outcomes
+    }
\ No newline at end of file
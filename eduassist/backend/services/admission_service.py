@@ -0,0 +1,193 @@
+import os
+import math
+import time
+import heapq
+import itertools
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List
+from services.config import load_env
+
+load_env()
+
+class AdmissionRejected(Exception):
+    """Raised when a generation request is shed; `retry_after` is in whole seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class AdmissionTooLarge(Exception):
+    """Raised for a request asking for more items than the whole in-flight budget, which could never be admitted"""
+
+    def __init__(self, max_items: int):
+        super().__init__(f"At most {max_items} items can be generated per request")
+        self.reason = str(self)
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float) -> float:
+        """Take `amount` tokens, returning 0 on success or the seconds until they would be available"""
+        # Requests bigger than the burst size still go through once the bucket is full
+        amount = min(amount, self.capacity)
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else 3600.0
+
+    def refund(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+class AdmissionTicket:
+    def __init__(self, controller: "AdmissionController", cost: int):
+        self.controller = controller
+        self.cost = cost
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release(self.cost)
+
+    async def __aenter__(self) -> "AdmissionTicket":
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+class AdmissionController:
+    """Admits generation work against a global in-flight item budget and per-user token buckets.
+
+    Each request costs one token per item it asks for. When the global budget
+    is full, requests wait in a queue ordered by tier (premium first, then
+    arrival) for up to `queue_timeout` seconds before being shed.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+        self.max_items = int(os.getenv("ADMISSION_MAX_ITEMS", 200))
+        self.max_queue = int(os.getenv("ADMISSION_MAX_QUEUE", 100))
+        self.queue_timeout = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 10))
+        self.tiers = {
+            "free": (float(os.getenv("ADMISSION_FREE_RATE", 1)), float(os.getenv("ADMISSION_FREE_BURST", 20))),
+            "premium": (float(os.getenv("ADMISSION_PREMIUM_RATE", 5)), float(os.getenv("ADMISSION_PREMIUM_BURST", 100)))
+        }
+        self.max_buckets = int(os.getenv("ADMISSION_MAX_BUCKETS", 10000))
+        self.in_flight = 0
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._waiters: List = []
+        self._sequence = itertools.count()
+        self.stats = {"admitted": 0, "queued": 0, "rate_limited": 0, "shed_queue_full": 0, "shed_timeout": 0, "too_large": 0}
+
+    async def admit(self, user_id: str, cost: int, is_premium: bool = False) -> AdmissionTicket:
+        """Reserve capacity for `cost` items, waiting in the queue if needed; raises AdmissionRejected"""
+        cost = max(1, cost)
+        if not self.enabled:
+            return AdmissionTicket(self, 0)
+
+        if cost > self.max_items:
+            # Clamping would let it hold less capacity than it actually uses
+            self.stats["too_large"] += 1
+            raise AdmissionTooLarge(self.max_items)
+
+        tier = "premium" if is_premium else "free"
+        bucket = self._bucket(user_id, tier)
+        wait = bucket.take(cost)
+        if wait > 0:
+            self.stats["rate_limited"] += 1
+            raise AdmissionRejected("Generation rate limit exceeded", wait)
+
+        if not self._waiters and self.in_flight + cost <= self.max_items:
+            return self._grant(cost)
+
+        if len(self._waiters) >= self.max_queue:
+            bucket.refund(cost)
+            self.stats["shed_queue_full"] += 1
+            raise AdmissionRejected("Generation capacity exhausted", self.queue_timeout)
+
+        future = asyncio.get_running_loop().create_future()
+        priority = 0 if is_premium else 1
+        heapq.heappush(self._waiters, (priority, next(self._sequence), cost, future))
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except BaseException:
+            # The caller went away; hand back capacity it may have just been granted
+            if future.done():
+                future.result().release()
+            else:
+                self._abandon(future)
+            raise
+
+        if not future.done():
+            self._abandon(future)
+            bucket.refund(cost)
+            self.stats["shed_timeout"] += 1
+            raise AdmissionRejected("Timed out waiting for generation capacity", self.queue_timeout)
+        return future.result()
+
+    def _grant(self, cost: int) -> AdmissionTicket:
+        self.in_flight += cost
+        self.stats["admitted"] += 1
+        return AdmissionTicket(self, cost)
+
+    def _release(self, cost: int):
+        self.in_flight -= cost
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        # Strict priority order: a large request at the head is not overtaken by smaller ones
+        while self._waiters:
+            priority, sequence, cost, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_flight + cost > self.max_items:
+                return
+            heapq.heappop(self._waiters)
+            future.set_result(self._grant(cost))
+
+    def _abandon(self, future: asyncio.Future):
+        future.cancel()
+        self._waiters = [waiter for waiter in self._waiters if not waiter[3].done()]
+        heapq.heapify(self._waiters)
+        # The departed waiter may have been the one blocking the head of the queue
+        self._wake_waiters()
+
+    def _bucket(self, user_id: str, tier: str) -> TokenBucket:
+        key = f"{tier}:{user_id}"
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate, burst = self.tiers[tier]
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "in_flight_items": self.in_flight,
+            "max_items": self.max_items,
+            "queue_depth": len(self._waiters),
+            "tracked_users": len(self._buckets)
+        }
+
+admission_controller = AdmissionController()
\ No newline at end of file
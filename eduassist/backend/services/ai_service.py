@@ -1,72 +1,328 @@
 import os
-import requests
+import time
+import asyncio
 import json
-from typing import List, Dict
-from dotenv import load_dotenv
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from services.config import load_env
+from services.http_client import get_client
+from services.metrics import record_generation_item, record_generation_deadline
+from services.generation_backend import GenerationBackend, get_backend, register_backend
+from services.question_bank import get_question_bank
 
-load_dotenv()
+load_env()
 
-class AIService:
+class AIService(GenerationBackend):
+    """Generates items with the Hugging Face model, or delegates to the configured backend"""
+    
+    name = "model"
+    
     def __init__(self):
         self.hf_api_key = os.getenv("HF_API_KEY")
-        self.model_url = "https://api-inference.huggingface.co/models/google/flan-t5-base"
+        self.model_url = os.getenv("HF_MODEL_URL", "https://api-inference.huggingface.co/models/google/flan-t5-base")
         self.headers = {"Authorization": f"Bearer {self.hf_api_key}"}
+        # Upper bound on concurrent model calls per generation request
+        self.max_concurrency = int(os.getenv("AI_MAX_CONCURRENCY", 5))
+        # Batched mode packs many prompts into one inference call
+        self.batch_mode = os.getenv("AI_BATCH_MODE", "false").lower() == "true"
+        self.batch_size = int(os.getenv("AI_BATCH_SIZE", 16))
+        self.batch_max_chars = int(os.getenv("AI_BATCH_MAX_CHARS", 4000))
+        self.http = get_client("huggingface", "AI", self.headers, warm_url=self.model_url)
+        self.quiz_parameters = {"max_new_tokens": 150, "temperature": 0.8}
+        self.flashcard_parameters = {"max_new_tokens": 100, "temperature": 0.7}
+        # Where items come from: "model" or "question_bank"
+        self.backend_name = os.getenv("GENERATION_BACKEND", "model")
+        # Fill slots the model failed to produce from the question bank before using canned fallbacks
+        self.bank_topup = os.getenv("QUESTION_BANK_TOPUP", "true").lower() == "true"
+        # Time budget in seconds for one generation request, by tier; 0 leaves it unbounded
+        self.time_budgets = {
+            "free": float(os.getenv("GENERATION_BUDGET_FREE", 8)),
+            "premium": float(os.getenv("GENERATION_BUDGET_PREMIUM", 15))
+        }
+        self.stats = {"deadline_exceeded": 0, "degraded_items": 0}
     
-    async def generate_quiz(self, topic: str, num_questions: int = 5) -> List[Dict]:
-        """Generate quiz questions using Hugging Face API"""
-        quiz_questions = []
-        
-        for i in range(num_questions):
+    def deadline_for(self, is_premium: bool, requested_budget: Optional[float] = None) -> Optional[float]:
+        """Monotonic deadline for a generation request starting now.
+
+        A request may tighten its tier's budget but never extend it.
+        """
+        budget = self.time_budgets["premium" if is_premium else "free"]
+        if requested_budget is not None:
+            budget = min(budget, requested_budget) if budget > 0 else requested_budget
+        return time.monotonic() + budget if budget > 0 else None
+    
+    async def generate_quiz(self, topic: str, num_questions: int = 5, deadline: Optional[float] = None) -> List[Dict]:
+        """Generate quiz questions using Hugging Face API, finishing by `deadline` if one is given"""
+        return await self._collect_items(self.stream_quiz(topic, num_questions, deadline), num_questions)
+    
+    async def generate_flashcards(self, topic: str, num_cards: int = 10, deadline: Optional[float] = None) -> List[Dict]:
+        """Generate flashcards using Hugging Face API, finishing by `deadline` if one is given"""
+        return await self._collect_items(self.stream_flashcards(topic, num_cards, deadline), num_cards)
+    
+    def stream_quiz(self, topic: str, num_questions: int = 5, deadline: Optional[float] = None) -> AsyncIterator[Tuple[int, Dict]]:
+        """Yield (position, question) pairs as soon as each question is ready"""
+        return self._stream_from_backend("quiz", topic, num_questions, self._get_fallback_question, "question", deadline)
+    
+    def stream_flashcards(self, topic: str, num_cards: int = 10, deadline: Optional[float] = None) -> AsyncIterator[Tuple[int, Dict]]:
+        """Yield (position, flashcard) pairs as soon as each flashcard is ready"""
+        return self._stream_from_backend("flashcard", topic, num_cards, self._get_fallback_flashcard, "flashcard", deadline)
+    
+    def stream(self, kind: str, topic: str, count: int) -> AsyncIterator[Tuple[int, Dict]]:
+        """Model backend: one inference call per item (or per batch)"""
+        return self._stream_model(kind, topic, count)
+    
+    def _stream_model(self, kind: str, topic: str, count: int, deadline: Optional[float] = None) -> AsyncIterator[Tuple[int, Dict]]:
+        if kind == "quiz":
             prompt = f"Generate a multiple choice question about {topic}. Format: Question: [question] A) [option] B) [option] C) [option] D) [option] Correct: [letter]"
-            
-            try:
-                payload = {"inputs": prompt, "parameters": {"max_new_tokens": 150, "temperature": 0.8}}
-                response = requests.post(self.model_url, headers=self.headers, json=payload)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    generated_text = result[0]["generated_text"] if isinstance(result, list) else result.get("generated_text", "")
-                    
-                    # Parse the generated question
-                    question = self._parse_quiz_question(generated_text, topic, i + 1)
-                    quiz_questions.append(question)
-                else:
-                    # Fallback question if API fails
-                    quiz_questions.append(self._get_fallback_question(topic, i + 1))
-                    
-            except Exception as e:
-                print(f"Error generating question {i+1}: {e}")
-                quiz_questions.append(self._get_fallback_question(topic, i + 1))
+            return self._stream_items(
+                kind, topic, count, prompt, self.quiz_parameters,
+                self._parse_quiz_question, self._get_fallback_question, "question", deadline
+            )
         
-        return quiz_questions
+        prompt = f"Create a flashcard about {topic}. Front: [concept or question] Back: [detailed explanation or answer]"
+        return self._stream_items(
+            kind, topic, count, prompt, self.flashcard_parameters,
+            self._parse_flashcard, self._get_fallback_flashcard, "flashcard", deadline
+        )
     
-    async def generate_flashcards(self, topic: str, num_cards: int = 10) -> List[Dict]:
-        """Generate flashcards using Hugging Face API"""
-        flashcards = []
+    def _stream_from_backend(self, kind: str, topic: str, count: int, fallback: Callable[[str, int], Dict],
+                             label: str, deadline: Optional[float] = None) -> AsyncIterator[Tuple[int, Dict]]:
+        if self.backend_name == self.name:
+            return self._stream_model(kind, topic, count, deadline)
+        return self._fill_missing(get_backend(self.backend_name), kind, topic, count, fallback, label, deadline)
+    
+    async def _fill_missing(self, backend: GenerationBackend, kind: str, topic: str, count: int,
+                            fallback: Callable[[str, int], Dict], label: str,
+                            deadline: Optional[float] = None) -> AsyncIterator[Tuple[int, Dict]]:
+        """Pass through another backend's items, then fall back for the slots it left empty"""
+        filled = set()
+        items = backend.stream(kind, topic, count)
+        try:
+            while True:
+                try:
+                    i, item = await asyncio.wait_for(items.__anext__(), timeout=self.time_left(deadline))
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    self._deadline_exceeded(label, count - len(filled))
+                    break
+                filled.add(i)
+                yield self._emit(label, i, item, backend.name, degraded=False)
+        finally:
+            await items.aclose()
         
-        for i in range(num_cards):
-            prompt = f"Create a flashcard about {topic}. Front: [concept or question] Back: [detailed explanation or answer]"
-            
+        for i in range(count):
+            if i not in filled:
+                yield self._emit(label, i, fallback(topic, i + 1), "fallback", degraded=True)
+    
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "active_backend": self.backend_name,
+            "bank_topup": self.bank_topup,
+            "time_budgets": self.time_budgets
+        }
+    
+    def _emit(self, label: str, i: int, item: Dict, source: str, degraded: bool) -> Tuple[int, Dict]:
+        """Count an item by source and flag it if it stands in for a generated one"""
+        record_generation_item(label, source)
+        if degraded:
+            self.stats["degraded_items"] += 1
+            item = {**item, "degraded": True}
+        return i, item
+    
+    def time_left(self, deadline: Optional[float]) -> Optional[float]:
+        """Seconds until `deadline`, never negative; None for an unbounded request"""
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+    
+    def fallback_items(self, kind: str, topic: str, count: int) -> List[Dict]:
+        """Degraded stand-ins for a whole request that ran out of time before getting any generated items"""
+        label, fallback = ("question", self._get_fallback_question) if kind == "quiz" else ("flashcard", self._get_fallback_flashcard)
+        self._deadline_exceeded(label, count)
+        bank_items = get_question_bank().search(kind, topic, count) if self.bank_topup else []
+        items = []
+        for i in range(count):
+            if bank_items:
+                item, source = bank_items.pop(0), "question_bank"
+            else:
+                item, source = fallback(topic, i + 1), "fallback"
+            items.append(self._emit(label, i, item, source, degraded=True)[1])
+        return items
+    
+    def _deadline_exceeded(self, label: str, unfilled: int):
+        self.stats["deadline_exceeded"] += 1
+        record_generation_deadline(label)
+        print(f"Generation deadline reached with {unfilled} {label} slots left to fill locally")
+    
+    async def _collect_items(self, stream: AsyncIterator[Tuple[int, Dict]], count: int) -> List[Dict]:
+        """Gather a stream of (position, item) pairs back into an ordered list"""
+        items: List[Optional[Dict]] = [None] * count
+        async for i, item in stream:
+            items[i] = item
+        return items
+    
+    async def _stream_items(self, kind: str, topic: str, count: int, prompt: str, parameters: Dict,
+                            parse: Callable[[str, str, int], Dict], fallback: Callable[[str, int], Dict],
+                            label: str, deadline: Optional[float] = None) -> AsyncIterator[Tuple[int, Dict]]:
+        """Fan out model calls bounded by max_concurrency and yield items in completion order.
+
+        Past the deadline, outstanding calls are cancelled and their slots are
+        filled from the question bank or canned fallbacks.
+        """
+        sources: Dict[int, str] = {}
+        bank_items: Optional[List[Dict]] = None if self.bank_topup else []
+        
+        def topped_up_fallback(fallback_topic: str, item_num: int) -> Dict:
+            nonlocal bank_items
+            if bank_items is None:
+                # One search covers every slot the model leaves empty in this request
+                bank_items = get_question_bank().search(kind, topic, count)
+            if bank_items:
+                sources[item_num - 1] = "question_bank"
+                return bank_items.pop(0)
+            sources[item_num - 1] = "fallback"
+            return fallback(fallback_topic, item_num)
+        
+        if self.http.is_open():
+            # The provider is known to be down: serve fallbacks without waiting on it
+            for i in range(count):
+                item = topped_up_fallback(topic, i + 1)
+                yield self._emit(label, i, item, sources[i], degraded=True)
+            return
+        
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        
+        if self.batch_mode:
+            tasks = [
+                asyncio.create_task(self._generate_batch(positions, topic, prompt, parameters, parse, topped_up_fallback, label, semaphore))
+                for positions in self._split_batches([prompt] * count)
+            ]
+        else:
+            tasks = [
+                asyncio.create_task(self._generate_one(i, topic, prompt, parameters, parse, topped_up_fallback, label, semaphore))
+                for i in range(count)
+            ]
+        
+        yielded = set()
+        try:
             try:
-                payload = {"inputs": prompt, "parameters": {"max_new_tokens": 100, "temperature": 0.7}}
-                response = requests.post(self.model_url, headers=self.headers, json=payload)
+                for next_done in asyncio.as_completed(tasks, timeout=self.time_left(deadline)):
+                    for i, item in await next_done:
+                        yielded.add(i)
+                        source = sources.get(i, "model")
+                        yield self._emit(label, i, item, source, degraded=source != "model")
+            except asyncio.TimeoutError:
+                self._deadline_exceeded(label, count - len(yielded))
+                # Keep whatever finished in the meantime and stop the rest
+                finished = {}
+                for task in tasks:
+                    if task.done() and not task.cancelled() and task.exception() is None:
+                        finished.update(task.result())
+                    else:
+                        task.cancel()
+                for i in range(count):
+                    if i in yielded:
+                        continue
+                    if i in finished:
+                        source = sources.get(i, "model")
+                        yield self._emit(label, i, finished[i], source, degraded=source != "model")
+                    else:
+                        item = topped_up_fallback(topic, i + 1)
+                        yield self._emit(label, i, item, sources[i], degraded=True)
+        finally:
+            # Stop outstanding model calls if the consumer goes away early
+            for task in tasks:
+                task.cancel()
+    
+    async def _generate_one(self, i: int, topic: str, prompt: str, parameters: Dict,
+                            parse: Callable[[str, str, int], Dict],
+                            fallback: Callable[[str, int], Dict], label: str,
+                            semaphore: asyncio.Semaphore) -> List[Tuple[int, Dict]]:
+        """Generate a single item with its own model call"""
+        async with semaphore:
+            try:
+                generated_text = await self._query_model(prompt, parameters)
+                
+                if generated_text is not None:
+                    return [(i, parse(generated_text, topic, i + 1))]
+                # Fallback item if API fails
+                return [(i, fallback(topic, i + 1))]
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    generated_text = result[0]["generated_text"] if isinstance(result, list) else result.get("generated_text", "")
-                    
-                    # Parse the generated flashcard
-                    flashcard = self._parse_flashcard(generated_text, topic, i + 1)
-                    flashcards.append(flashcard)
-                else:
-                    # Fallback flashcard if API fails
-                    flashcards.append(self._get_fallback_flashcard(topic, i + 1))
-                    
             except Exception as e:
-                print(f"Error generating flashcard {i+1}: {e}")
-                flashcards.append(self._get_fallback_flashcard(topic, i + 1))
+                print(f"Error generating {label} {i+1}: {e}")
+                return [(i, fallback(topic, i + 1))]
+    
+    async def _generate_batch(self, positions: List[int], topic: str, prompt: str, parameters: Dict,
+                              parse: Callable[[str, str, int], Dict],
+                              fallback: Callable[[str, int], Dict], label: str,
+                              semaphore: asyncio.Semaphore) -> List[Tuple[int, Dict]]:
+        """Generate a batch of items in one inference call, mapping outputs back to positions"""
+        outputs: List[Optional[str]] = [None] * len(positions)
+        async with semaphore:
+            try:
+                outputs = await self._query_model_batch([prompt] * len(positions), parameters)
+            except Exception as e:
+                print(f"Error generating {label} batch {positions[0]+1}-{positions[-1]+1}: {e}")
+        
+        items = []
+        for i, generated_text in zip(positions, outputs):
+            item = None
+            if generated_text is not None:
+                try:
+                    item = parse(generated_text, topic, i + 1)
+                except Exception as e:
+                    print(f"Error parsing {label} {i+1}: {e}")
+            # Only the items that failed get a fallback
+            items.append((i, item if item is not None else fallback(topic, i + 1)))
+        return items
+    
+    def _split_batches(self, prompts: List[str]) -> List[List[int]]:
+        """Split prompt positions into batches bounded by batch_size and batch_max_chars"""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_chars = 0
+        
+        for i, prompt in enumerate(prompts):
+            if current and (len(current) >= self.batch_size or current_chars + len(prompt) > self.batch_max_chars):
+                batches.append(current)
+                current, current_chars = [], 0
+            current.append(i)
+            current_chars += len(prompt)
+        
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def _query_model_batch(self, prompts: List[str], parameters: Dict) -> List[Optional[str]]:
+        """Send a list of prompts in one inference call, returning one generated text (or None) per prompt"""
+        payload = {"inputs": prompts, "parameters": parameters}
+        response = await self.http.post(self.model_url, json=payload, operation="query_model_batch")
+        
+        if response.status_code != 200:
+            return [None] * len(prompts)
+        
+        result = response.json()
+        if not isinstance(result, list):
+            return [None] * len(prompts)
+        
+        outputs: List[Optional[str]] = []
+        for i in range(len(prompts)):
+            output = result[i] if i < len(result) else None
+            # Some pipelines wrap each output in its own list
+            if isinstance(output, list):
+                output = output[0] if output else None
+            outputs.append(output.get("generated_text") if isinstance(output, dict) else None)
+        return outputs
+    
+    async def _query_model(self, prompt: str, parameters: Dict) -> Optional[str]:
+        """Send a single prompt to the model, returning the generated text or None on a non-200 response"""
+        payload = {"inputs": prompt, "parameters": parameters}
+        response = await self.http.post(self.model_url, json=payload, operation="query_model")
+        
+        if response.status_code != 200:
+            return None
         
-        return flashcards
+        result = response.json()
+        return result[0]["generated_text"] if isinstance(result, list) else result.get("generated_text", "")
     
     def _parse_quiz_question(self, generated_text: str, topic: str, question_num: int) -> Dict:
         """Parse AI-generated text into a structured quiz question"""
@@ -123,4 +379,5 @@ class AIService:
             "difficulty": "medium"
         }
 
-ai_service = AIService()
\ No newline at end of file
+ai_service = AIService()
+register_backend(ai_service)
\ No newline at end of file
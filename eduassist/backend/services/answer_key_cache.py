@@ -0,0 +1,56 @@
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from services.config import load_env
+
+load_env()
+
+def extract_answer_key(quiz: Dict) -> Dict:
+    """Reduce a saved quiz row to what scoring needs: owner, topic and the correct option per question"""
+    return {
+        "user_id": quiz.get("user_id"),
+        "topic": quiz.get("topic"),
+        "answers": tuple(question.get("correct_answer") for question in quiz.get("questions") or [])
+    }
+
+def score_answers(answer_key: Dict, user_answers: List) -> int:
+    """Count submitted answers that match the key; missing answers count as wrong"""
+    return sum(1 for given, expected in zip(user_answers, answer_key["answers"]) if given == expected)
+
+class AnswerKeyCache:
+    """LRU of compact quiz answer keys keyed by quiz id.
+
+    Saved quizzes never change, so entries have no TTL and are only evicted
+    for space; the quizzes table remains the source of truth on a miss.
+    """
+
+    def __init__(self):
+        self.max_entries = int(os.getenv("ANSWER_KEY_CACHE_SIZE", 50000))
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, quiz_id: str) -> Optional[Dict]:
+        entry = self._entries.get(quiz_id)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(quiz_id)
+        self.stats["hits"] += 1
+        return entry
+
+    def set(self, quiz_id: str, answer_key: Dict):
+        self._entries[quiz_id] = answer_key
+        self._entries.move_to_end(quiz_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0
+        }
\ No newline at end of file
@@ -0,0 +1,111 @@
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional
+from services.config import load_env
+from jose import jwt, JWTError
+from starlette.concurrency import run_in_threadpool
+from models.database import AuthUser
+from services.supabase_service import get_supabase_client
+
+load_env()
+
+class TokenVerifier:
+    def __init__(self):
+        # HS256 secret from the Supabase project settings, or a PEM public key for asymmetric tokens
+        self.jwt_secret = os.getenv("SUPABASE_JWT_SECRET")
+        self.jwt_public_key = os.getenv("SUPABASE_JWT_PUBLIC_KEY")
+        self.audience = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+        self.remote_fallback = os.getenv(
+            "AUTH_REMOTE_FALLBACK",
+            "false" if (self.jwt_secret or self.jwt_public_key) else "true"
+        ).lower() == "true"
+        self.cache_size = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 1024))
+        # Re-verify remotely checked tokens at least this often
+        self.remote_cache_ttl = int(os.getenv("AUTH_REMOTE_CACHE_TTL", 60))
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats = {"cache_hits": 0, "local_verifications": 0, "remote_verifications": 0, "failures": 0}
+
+    async def verify(self, token: str) -> Optional[AuthUser]:
+        """Return the user for a valid access token, or None if it cannot be verified"""
+        cache_key = hashlib.sha256(token.encode()).hexdigest()
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            user, expires_at = cached
+            if expires_at > time.time():
+                self._cache.move_to_end(cache_key)
+                self.stats["cache_hits"] += 1
+                return user
+            del self._cache[cache_key]
+
+        claims = self._verify_locally(token)
+        if claims is not None:
+            self.stats["local_verifications"] += 1
+            user = AuthUser(
+                id=claims["sub"],
+                email=claims.get("email"),
+                role=claims.get("role"),
+                user_metadata=claims.get("user_metadata") or {}
+            )
+            self._store(cache_key, user, float(claims["exp"]))
+            return user
+
+        if self.remote_fallback:
+            user = await self._verify_remotely(token)
+            if user is not None:
+                self.stats["remote_verifications"] += 1
+                # Supabase vouched for the token, so its own exp claim bounds how long that holds
+                exp = self._unverified_expiry(token)
+                if exp is not None and exp > time.time():
+                    self._store(cache_key, user, min(time.time() + self.remote_cache_ttl, exp))
+                return user
+
+        self.stats["failures"] += 1
+        return None
+
+    def _verify_locally(self, token: str) -> Optional[Dict]:
+        key = self.jwt_public_key or self.jwt_secret
+        if not key:
+            return None
+
+        algorithms = ["RS256", "ES256"] if self.jwt_public_key else ["HS256"]
+        try:
+            claims = jwt.decode(token, key, algorithms=algorithms, audience=self.audience)
+        except JWTError:
+            return None
+
+        if not claims.get("sub") or not claims.get("exp"):
+            return None
+        return claims
+
+    def _unverified_expiry(self, token: str) -> Optional[float]:
+        try:
+            exp = jwt.get_unverified_claims(token).get("exp")
+            return float(exp) if exp is not None else None
+        except (JWTError, AttributeError, TypeError, ValueError):
+            return None
+
+    async def _verify_remotely(self, token: str) -> Optional[AuthUser]:
+        try:
+            response = await run_in_threadpool(get_supabase_client().auth.get_user, token)
+        except Exception as e:
+            print(f"Error verifying token remotely: {e}")
+            return None
+
+        if not response or not response.user:
+            return None
+        return AuthUser(
+            id=response.user.id,
+            email=response.user.email,
+            role=response.user.role,
+            user_metadata=response.user.user_metadata or {}
+        )
+
+    def _store(self, cache_key: str, user: AuthUser, expires_at: float):
+        self._cache[cache_key] = (user, expires_at)
+        self._cache.move_to_end(cache_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+token_verifier = TokenVerifier()
\ No newline at end of file
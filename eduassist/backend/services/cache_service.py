@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from services.config import load_env
+from services.supabase_service import supabase_service
+from services.singleflight import generation_singleflight, SingleFlightTimeout
+
+load_env()
+
+def normalize_topic(topic: str) -> str:
+    return re.sub(r"\s+", " ", topic.strip().lower())
+
+def _has_degraded(items: List[Dict]) -> bool:
+    return any(isinstance(item, dict) and item.get("degraded") for item in items)
+
+class GenerationCache:
+    """Two-tier cache for generated quizzes and flashcard sets.
+
+    Tier 1 is an in-process LRU with a TTL; tier 2 is the `generation_cache`
+    table accessed through SupabaseService.
+    """
+
+    def __init__(self):
+        self.max_entries = int(os.getenv("CACHE_MAX_ENTRIES", 256))
+        self.ttl_seconds = int(os.getenv("CACHE_TTL_SECONDS", 3600))
+        self.persistent_enabled = os.getenv("CACHE_PERSISTENT", "true").lower() == "true"
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "bypasses": 0,
+            "degraded_skips": 0
+        }
+
+    def make_key(self, kind: str, topic: str, count: int, parameters: Optional[Dict] = None) -> str:
+        """Build a cache key from the normalized topic, item count and generation parameters"""
+        params = json.dumps(parameters or {}, sort_keys=True)
+        digest = hashlib.sha1(f"{normalize_topic(topic)}|{count}|{params}".encode()).hexdigest()
+        return f"{kind}:{digest}"
+
+    async def get_or_generate(self, kind: str, topic: str, count: int,
+                              generate: Callable[[str, int], Awaitable[List[Dict]]],
+                              parameters: Optional[Dict] = None, fresh: bool = False,
+                              timeout: Optional[float] = None,
+                              fallback: Optional[Callable[[str, int], List[Dict]]] = None) -> List[Dict]:
+        """Return cached items for the request, generating and storing them on a miss.
+
+        `fresh=True` skips the lookup but still refreshes both tiers with the new result.
+        A request that joins another's in-flight generation waits at most `timeout`
+        seconds, then is served `fallback(topic, count)` if given.
+        """
+        key, items = await self.lookup(kind, topic, count, parameters, fresh)
+        if items is not None:
+            return items
+
+        # Concurrent misses for the same key share a single generation
+        try:
+            items = await generation_singleflight.do(key, lambda: generate(topic, count), timeout=timeout)
+        except SingleFlightTimeout:
+            if fallback is None:
+                raise
+            return fallback(topic, count)
+        await self.set(key, kind, items)
+        return list(items)
+
+    async def stream_or_generate(self, kind: str, topic: str, count: int,
+                                 stream: Callable[[str, int], AsyncIterator[Tuple[int, Dict]]],
+                                 parameters: Optional[Dict] = None, fresh: bool = False,
+                                 timeout: Optional[float] = None,
+                                 fallback: Optional[Callable[[str, int], List[Dict]]] = None) -> AsyncIterator[Tuple[int, Dict]]:
+        """Yield (position, item) pairs for the request, like `get_or_generate` but incrementally.
+
+        Cached items are replayed at once. On a miss, concurrent requests for the
+        same key share one generation: the request that starts it yields each item
+        as `stream(topic, count)` produces it, and the others replay the finished
+        set when it completes, or `fallback(topic, count)` after `timeout` seconds.
+        """
+        key, items = await self.lookup(kind, topic, count, parameters, fresh)
+        if items is not None:
+            for i, item in enumerate(items):
+                yield i, item
+            return
+
+        # Only filled when this request's own generation is the shared one
+        produced: "asyncio.Queue[Optional[Tuple[int, Dict]]]" = asyncio.Queue()
+
+        async def generate() -> List[Dict]:
+            generated = [None] * count
+            async for i, item in stream(topic, count):
+                generated[i] = item
+                produced.put_nowait((i, item))
+            return generated
+
+        shared = asyncio.create_task(generation_singleflight.do(key, generate, timeout=timeout))
+        shared.add_done_callback(lambda _: produced.put_nowait(None))
+        sent = set()
+        try:
+            while (entry := await produced.get()) is not None:
+                sent.add(entry[0])
+                yield entry
+            try:
+                items = shared.result()
+            except SingleFlightTimeout:
+                if fallback is None:
+                    raise
+                items = fallback(topic, count)
+            else:
+                await self.set(key, kind, items)
+        finally:
+            # A client that went away stops waiting; the generation carries on for anyone else sharing it
+            shared.cancel()
+
+        for i, item in enumerate(items):
+            if i not in sent:
+                yield i, item
+
+    async def lookup(self, kind: str, topic: str, count: int,
+                     parameters: Optional[Dict] = None, fresh: bool = False) -> Tuple[str, Optional[List[Dict]]]:
+        """Return the cache key for the request and its cached items, if any"""
+        key = self.make_key(kind, topic, count, parameters)
+
+        if fresh:
+            self.stats["bypasses"] += 1
+            return key, None
+
+        items = await self.get(key)
+        if items is None:
+            self.stats["misses"] += 1
+        return key, items
+
+    async def get(self, key: str) -> Optional[List[Dict]]:
+        items = self._get_memory(key)
+        if items is not None:
+            self.stats["memory_hits"] += 1
+            return items
+
+        if not self.persistent_enabled:
+            return None
+
+        row = await supabase_service.get_cached_generation(key)
+        if not row:
+            return None
+
+        expires_at = self._parse_timestamp(row.get("expires_at"))
+        if expires_at is None or expires_at <= time.time():
+            return None
+        if _has_degraded(row["items"]):
+            # Written by another instance or an older release; never serve stand-ins as a hit
+            self.stats["degraded_skips"] += 1
+            return None
+
+        self.stats["persistent_hits"] += 1
+        self._set_memory(key, row["items"], expires_at)
+        return row["items"]
+
+    async def set(self, key: str, kind: str, items: List[Dict]):
+        # Sets with stand-in items are not kept, so the next request gets another try at the model
+        if _has_degraded(items):
+            self.stats["degraded_skips"] += 1
+            return
+
+        expires_at = time.time() + self.ttl_seconds
+        self._set_memory(key, items, expires_at)
+
+        if self.persistent_enabled:
+            await supabase_service.save_cached_generation({
+                "cache_key": key,
+                "kind": kind,
+                "items": items,
+                "expires_at": datetime.fromtimestamp(expires_at, timezone.utc).isoformat()
+            })
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["memory_hits"] + self.stats["persistent_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["persistent_hits"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0
+        }
+
+    def _get_memory(self, key: str) -> Optional[List[Dict]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        items, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.stats["expirations"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return items
+
+    def _set_memory(self, key: str, items: List[Dict], expires_at: float):
+        self._entries[key] = (items, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _parse_timestamp(self, value) -> Optional[float]:
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return None
+
+generation_cache = GenerationCache()
\ No newline at end of file
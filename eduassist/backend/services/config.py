@@ -0,0 +1,10 @@
+from dotenv import load_dotenv
+
+_loaded = False
+
+def load_env():
+    """Load .env into the environment once per process; later calls are no-ops"""
+    global _loaded
+    if not _loaded:
+        load_dotenv()
+        _loaded = True
\ No newline at end of file
@@ -0,0 +1,85 @@
+import time
+import asyncio
+import inspect
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+class ServiceContainer:
+    """Registry of shared clients that are created on first use.
+
+    Importing the app only registers factories. Each client is built the first
+    time it is requested, or ahead of time by `warm` from the FastAPI lifespan,
+    and `close` releases whatever was actually created.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._warmers: Dict[str, Callable] = {}
+        self._closers: Dict[str, Callable] = {}
+        self._instances: Dict[str, Any] = {}
+        self._init_ms: Dict[str, float] = {}
+        # Factories may run on a worker thread during warm-up
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any],
+                 warm: Optional[Callable] = None, close: Optional[Callable] = None):
+        self._factories[name] = factory
+        if warm is not None:
+            self._warmers[name] = warm
+        if close is not None:
+            self._closers[name] = close
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self._init_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+            return self._instances[name]
+
+    def created(self) -> Dict[str, Any]:
+        return dict(self._instances)
+
+    async def warm(self, names: Iterable[str]):
+        """Create the named clients off the event loop and run their warm-up hooks"""
+        for name in names:
+            if name not in self._factories:
+                print(f"Unknown service to pre-warm: {name}")
+                continue
+            try:
+                instance = await asyncio.to_thread(self.get, name)
+                warmer = self._warmers.get(name)
+                if warmer is not None:
+                    await _maybe_await(warmer(instance))
+            except Exception as e:
+                # A provider being unreachable at boot should not stop the app from starting
+                print(f"Error pre-warming {name}: {e}")
+
+    async def close(self):
+        for name in reversed(list(self._instances)):
+            closer = self._closers.get(name)
+            try:
+                if closer is not None:
+                    await _maybe_await(closer(self._instances[name]))
+            except Exception as e:
+                print(f"Error closing {name}: {e}")
+        self._instances.clear()
+
+    def get_status(self) -> Dict:
+        return {
+            name: {"created": name in self._instances, "init_ms": self._init_ms.get(name)}
+            for name in self._factories
+        }
+
+async def _maybe_await(result):
+    if inspect.isawaitable(result):
+        await result
+
+container = ServiceContainer()
\ No newline at end of file
@@ -0,0 +1,32 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Tuple
+
+class GenerationBackend(ABC):
+    """A source of quiz questions and flashcards.
+
+    `stream` yields (position, item) pairs for up to `count` slots of `kind`
+    ("quiz" or "flashcard"), in any order. Slots it cannot fill are simply
+    not yielded; AIService fills them with fallbacks.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def stream(self, kind: str, topic: str, count: int) -> AsyncIterator[Tuple[int, Dict]]:
+        ...
+
+    def get_stats(self) -> Dict:
+        return {}
+
+_backends: Dict[str, GenerationBackend] = {}
+
+def register_backend(backend: GenerationBackend):
+    _backends[backend.name] = backend
+
+def get_backend(name: str) -> GenerationBackend:
+    if name not in _backends:
+        raise ValueError(f"Unknown generation backend: {name}")
+    return _backends[name]
+
+def list_backends() -> Dict[str, Dict]:
+    return {name: backend.get_stats() for name, backend in _backends.items()}
\ No newline at end of file
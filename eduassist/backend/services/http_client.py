@@ -0,0 +1,268 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from typing import TYPE_CHECKING, Dict, Optional, Protocol
+from services.config import load_env
+from services.container import container
+from services.metrics import record_dependency_call
+
+if TYPE_CHECKING:
+    import httpx
+
+load_env()
+
+# Responses worth retrying: rate limiting and transient upstream failures
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider while its circuit breaker is open"""
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` failures; after `reset_timeout` seconds one trial
+    request is let through (half open) and the rest are rejected until it succeeds.
+
+    A trial that never reports back, e.g. because its caller was cancelled, is
+    given up on after another `reset_timeout` and a new one is allowed.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started = 0.0
+        self.trips = 0
+
+    def allow_request(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self._trial_due():
+            # Let one trial request through to probe the provider
+            self.state = "half_open"
+            self.trial_started = time.monotonic()
+            return True
+        return False
+
+    def is_open(self) -> bool:
+        return self.state != "closed" and not self._trial_due()
+
+    def _trial_due(self) -> bool:
+        now = time.monotonic()
+        if self.state == "open":
+            return now - self.opened_at >= self.reset_timeout
+        return self.state == "half_open" and now - self.trial_started >= self.reset_timeout
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+class ResilientClient:
+    """Pooled keep-alive HTTP client for one provider, with timeouts, retries and a circuit breaker.
+
+    Settings are read from `<PREFIX>_*` environment variables, e.g. AI_READ_TIMEOUT.
+    """
+
+    def __init__(self, name: str, env_prefix: str, headers: Optional[Dict] = None):
+        self.name = name
+        # requests silently skipped unset header values; httpx rejects them
+        self.headers = {name: value for name, value in (headers or {}).items() if value is not None}
+        self.connect_timeout = float(os.getenv(f"{env_prefix}_CONNECT_TIMEOUT", 5))
+        self.read_timeout = float(os.getenv(f"{env_prefix}_READ_TIMEOUT", 30))
+        self.max_connections = int(os.getenv(f"{env_prefix}_MAX_CONNECTIONS", 20))
+        self.max_keepalive = int(os.getenv(f"{env_prefix}_MAX_KEEPALIVE", 10))
+        self.max_retries = int(os.getenv(f"{env_prefix}_MAX_RETRIES", 2))
+        self.backoff_base = float(os.getenv(f"{env_prefix}_BACKOFF_BASE", 0.25))
+        self.backoff_max = float(os.getenv(f"{env_prefix}_BACKOFF_MAX", 5))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv(f"{env_prefix}_BREAKER_THRESHOLD", 5)),
+            reset_timeout=float(os.getenv(f"{env_prefix}_BREAKER_RESET", 30))
+        )
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._latencies = deque(maxlen=1024)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "short_circuited": 0}
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            # httpx and its SSL context are only loaded once a provider is actually called
+            import httpx
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive
+                )
+            )
+        return self._client
+
+    def is_open(self) -> bool:
+        """True while the breaker is rejecting calls to this provider"""
+        return self.breaker.is_open()
+
+    async def request(self, method: str, url: str, idempotent: bool = True,
+                      operation: Optional[str] = None, **kwargs) -> "httpx.Response":
+        """Send a request, retrying transient failures with jittered exponential backoff.
+
+        Non-idempotent requests are only retried when the connection could not be established.
+        `operation` names the call in dependency metrics and defaults to the HTTP method.
+        """
+        if not self.breaker.allow_request():
+            self.stats["short_circuited"] += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        import httpx
+        attempt = 0
+        while True:
+            self.stats["requests"] += 1
+            start = time.perf_counter()
+            try:
+                response = await self._get_client().request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                error, response, retryable = e, None, True
+            except httpx.TransportError as e:
+                error, response, retryable = e, None, idempotent
+            else:
+                error = None
+                retryable = idempotent and response.status_code in RETRYABLE_STATUS_CODES
+            finally:
+                elapsed = time.perf_counter() - start
+                self._latencies.append(elapsed * 1000)
+
+            failed = error is not None or response.status_code in RETRYABLE_STATUS_CODES
+            record_dependency_call(self.name, operation or method, elapsed, success=not failed)
+            if not failed:
+                self.breaker.record_success()
+                return response
+
+            if not retryable or attempt >= self.max_retries:
+                self.stats["failures"] += 1
+                self.breaker.record_failure()
+                if error is not None:
+                    raise error
+                return response
+
+            attempt += 1
+            self.stats["retries"] += 1
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    async def get(self, url: str, **kwargs) -> "httpx.Response":
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, idempotent: bool = True, **kwargs) -> "httpx.Response":
+        return await self.request("POST", url, idempotent, **kwargs)
+
+    def _backoff(self, attempt: int, response: Optional["httpx.Response"]) -> float:
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            return min(self.backoff_max, float(response.headers["Retry-After"]))
+        # Full jitter keeps retries from many requests from lining up
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get_stats(self) -> Dict:
+        samples = sorted(self._latencies)
+        latency = {}
+        if samples:
+            latency = {
+                "p50_ms": round(samples[len(samples) // 2], 2),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+                "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 2),
+                "max_ms": round(samples[-1], 2)
+            }
+        return {
+            **self.stats,
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+            "latency": latency
+        }
+
+    async def warm(self, url: str):
+        """Open a pooled connection to the provider ahead of the first real request"""
+        try:
+            await self._get_client().head(url)
+        except Exception as e:
+            print(f"Error warming {self.name} connection: {e}")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class ProviderClient(Protocol):
+    """What services use of a provider's client, whether a ResilientClient or the LazyClient in front of one"""
+
+    async def request(self, method: str, url: str, idempotent: bool = True,
+                      operation: Optional[str] = None, **kwargs) -> "httpx.Response": ...
+
+    async def get(self, url: str, **kwargs) -> "httpx.Response": ...
+
+    async def post(self, url: str, idempotent: bool = True, **kwargs) -> "httpx.Response": ...
+
+    def is_open(self) -> bool: ...
+
+    def get_stats(self) -> Dict: ...
+
+class LazyClient:
+    """Stands in for a provider's shared ResilientClient until it is first used.
+
+    Calls resolve the client through the service container, so constructing
+    a service does not create its HTTP client.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+
+    @property
+    def client(self) -> ResilientClient:
+        return container.get(self._name)
+
+    async def request(self, method: str, url: str, idempotent: bool = True,
+                      operation: Optional[str] = None, **kwargs) -> "httpx.Response":
+        return await self.client.request(method, url, idempotent, operation, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> "httpx.Response":
+        return await self.client.get(url, **kwargs)
+
+    async def post(self, url: str, idempotent: bool = True, **kwargs) -> "httpx.Response":
+        return await self.client.post(url, idempotent, **kwargs)
+
+    def is_open(self) -> bool:
+        return self.client.is_open()
+
+    def get_stats(self) -> Dict:
+        return self.client.get_stats()
+
+    def __getattr__(self, attr: str):
+        # Anything beyond the ProviderClient interface, e.g. settings read by tests
+        return getattr(self.client, attr)
+
+_clients: Dict[str, LazyClient] = {}
+
+def get_client(name: str, env_prefix: str, headers: Optional[Dict] = None, warm_url: Optional[str] = None) -> ProviderClient:
+    """Return the shared client for a provider, registering it with the service container on first use.
+
+    The client itself is only created when the returned proxy is first used.
+    """
+    if name not in container:
+        container.register(
+            name, lambda: ResilientClient(name, env_prefix, headers),
+            warm=(lambda client: client.warm(warm_url)) if warm_url else None,
+            close=lambda client: client.close()
+        )
+    if name not in _clients:
+        _clients[name] = LazyClient(name)
+    return _clients[name]
+
+def get_outbound_stats() -> Dict:
+    # Only clients that have actually been created; reading stats should not build one
+    created = container.created()
+    return {name: created[name].get_stats() for name in _clients if name in created}
\ No newline at end of file
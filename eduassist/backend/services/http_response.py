@@ -0,0 +1,159 @@
+import os
+import gzip
+import hashlib
+import orjson
+from typing import Dict
+from fastapi import Request
+from fastapi.responses import Response
+from services.config import load_env
+
+try:
+    import brotli
+except ImportError:  # Compression falls back to gzip only
+    brotli = None
+
+load_env()
+
+# Streaming responses are sent frame by frame and must not be buffered for compression
+UNCOMPRESSED_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "text/", "application/javascript")
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value.
+
+    Codings without a q parameter get 1.0; malformed q-values count as 0.
+    """
+    weights = {}
+    for part in header.split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = min(1.0, max(0.0, float(value.strip())))
+                except ValueError:
+                    q = 0.0
+        weights[token] = q
+    return weights
+
+def _add_vary(headers, field: bytes):
+    """Headers with `field` merged into Vary, keeping any fields already listed there"""
+    fields = []
+    for name, value in headers:
+        if name.lower() == b"vary":
+            fields += [part.strip() for part in value.split(b",") if part.strip()]
+    if b"*" in fields or field.lower() in (part.lower() for part in fields):
+        return headers
+    vary = b", ".join(fields + [field])
+    return [(name, value) for name, value in headers if name.lower() != b"vary"] + [(b"vary", vary)]
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete response bodies with brotli or gzip.
+
+    Only single-message bodies of at least `minimum_size` bytes are compressed;
+    streamed responses pass through untouched so frames still arrive immediately.
+    Every response of a compressible type carries `Vary: Accept-Encoding`, so
+    shared caches never hand a compressed body to a client that cannot read it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.minimum_size = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+        self.gzip_level = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+        self.brotli_quality = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = self._choose_encoding(scope)
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Hold the headers until we know whether the body is compressed
+                start_message = message
+                return
+            if start_message is None:
+                return await send(message)
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            if message.get("more_body") or not self._is_compressible(start):
+                await send(start)
+                return await send(message)
+
+            # The representation depends on Accept-Encoding even when this client gets it uncompressed
+            headers = _add_vary(start["headers"], b"Accept-Encoding")
+            if encoding is None or len(body) < self.minimum_size:
+                await send({**start, "headers": headers})
+                return await send(message)
+
+            compressed = self._compress(body, encoding)
+            headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode())
+            ]
+            await send({**start, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _choose_encoding(self, scope):
+        values = [
+            value.decode("latin-1") for name, value in scope.get("headers", [])
+            if name == b"accept-encoding"
+        ]
+        weights = parse_accept_encoding(",".join(values))
+        supported = ("br", "gzip") if brotli is not None else ("gzip",)
+        best, best_q = None, 0.0
+        # Ties go to the earlier, better-compressing encoding
+        for encoding in supported:
+            q = weights.get(encoding, weights.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def _is_compressible(self, start) -> bool:
+        if start["status"] < 200 or start["status"] in (204, 304):
+            return False
+        headers = {name.lower(): value for name, value in start["headers"]}
+        if b"content-encoding" in headers:
+            return False
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        if content_type.startswith(UNCOMPRESSED_MEDIA_TYPES):
+            return False
+        return content_type.startswith(COMPRESSIBLE_MEDIA_TYPES)
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+def make_etag(body: bytes) -> str:
+    return 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # Weak comparison: W/"x" and "x" name the same representation
+    return "*" in candidates or etag.removeprefix("W/") in (candidate.removeprefix("W/") for candidate in candidates)
+
+def conditional_json(request: Request, content, body: bytes = None, etag: str = None,
+                     cache_control: str = "private, no-cache") -> Response:
+    """JSON response with an ETag, or an empty 304 when the client already has this version"""
+    if body is None:
+        body = orjson.dumps(content)
+    etag = etag or make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
\ No newline at end of file
@@ -0,0 +1,189 @@
+import os
+import time
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+# Default latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key: Tuple, extra: Optional[Dict[str, str]] = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in items)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(items, escaped)) + "}"
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, value: float = 1, **labels):
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+        return lines
+
+class Gauge:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        self._values[_label_key(labels)] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        lines += [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # label key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in self._values.items():
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._metrics.setdefault(name, Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition of every registered metric"""
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram("http_request_duration_seconds", "HTTP request latency by route")
+http_requests = metrics.counter("http_requests_total", "HTTP responses by route and status code")
+dependency_duration = metrics.histogram("dependency_call_duration_seconds", "Latency of calls to external dependencies")
+dependency_errors = metrics.counter("dependency_call_errors_total", "Failed calls to external dependencies")
+generation_items = metrics.counter("generation_items_total", "Generated quiz questions and flashcards by source")
+generation_deadline_exceeded = metrics.counter(
+    "generation_deadline_exceeded_total", "Generation requests cut short by their time budget"
+)
+generation_fallback_ratio = metrics.gauge("generation_fallback_ratio", "Share of generated items served from canned fallbacks")
+event_loop_lag = metrics.histogram(
+    "event_loop_lag_seconds", "Delay between scheduled and actual event loop wakeups",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+event_loop_lag_last = metrics.gauge("event_loop_lag_last_seconds", "Most recent event loop lag sample")
+
+def record_dependency_call(dependency: str, operation: str, elapsed_seconds: float, success: bool = True):
+    dependency_duration.observe(elapsed_seconds, dependency=dependency, operation=operation)
+    if not success:
+        dependency_errors.inc(dependency=dependency, operation=operation)
+
+_generation_totals: Dict[str, List[int]] = {}
+
+def record_generation_item(kind: str, source: str):
+    # source is "model", "question_bank" or "fallback"
+    generation_items.inc(kind=kind, source=source)
+    totals = _generation_totals.setdefault(kind, [0, 0])
+    totals[0] += 1
+    totals[1] += int(source == "fallback")
+    generation_fallback_ratio.set(round(totals[1] / totals[0], 4), kind=kind)
+
+def record_generation_deadline(kind: str):
+    generation_deadline_exceeded.inc(kind=kind)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and status per route template.
+
+    Timing runs until the response body is complete, so streaming endpoints
+    are measured end to end.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners can't blow up cardinality
+            path = route.path if route is not None else "unmatched"
+            method = scope.get("method", "")
+            http_request_duration.observe(time.perf_counter() - start, method=method, route=path)
+            http_requests.inc(method=method, route=path, status=str(status["code"]))
+
+class EventLoopLagMonitor:
+    """Samples how late the event loop wakes a sleeping task"""
+
+    def __init__(self):
+        self.interval = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", 0.5))
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            event_loop_lag.observe(lag)
+            event_loop_lag_last.set(lag)
+
+loop_lag_monitor = EventLoopLagMonitor()
\ No newline at end of file
@@ -0,0 +1,22 @@
+import base64
+import json
+from typing import Dict, Tuple
+from fastapi import HTTPException
+
+def encode_cursor(row: Dict, sort_column: str) -> str:
+    """Opaque keyset cursor for a (sort_column, id) ordering, pointing just past `row`"""
+    payload = json.dumps([row[sort_column], row["id"]])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """The (sort value, id) pair inside a cursor; 400 if it was not issued by encode_cursor"""
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        sort_value, row_id = str(sort_value), str(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    # Cursor values are embedded in a quoted filter expression
+    if any(char in value for value in (sort_value, row_id) for char in '"\\'):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_value, row_id
\ No newline at end of file
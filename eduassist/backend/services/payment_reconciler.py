@@ -0,0 +1,117 @@
+import os
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from services.config import load_env
+from services.payment_service import payment_service
+from services.supabase_service import supabase_service
+
+load_env()
+
+# Payments that a confirmed InstaSend state may still settle
+OPEN_STATES = ("pending", "expired")
+
+class PaymentReconciler:
+    """Applies InstaSend payment outcomes and periodically reconciles pending payments.
+
+    Outcomes from webhooks, the status route and the background sweep all go
+    through `apply_status`, which only acts on an open (pending or expired)
+    -> final transition, so repeated callbacks for the same payment are no-ops.
+    Pending payments older than `max_pending_age` are marked expired and no
+    longer swept, but a webhook or status check can still settle them.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("PAYMENT_RECONCILE_ENABLED", "true").lower() == "true"
+        self.interval = float(os.getenv("PAYMENT_RECONCILE_INTERVAL", 60))
+        self.batch_size = int(os.getenv("PAYMENT_RECONCILE_BATCH_SIZE", 100))
+        self.concurrency = int(os.getenv("PAYMENT_RECONCILE_CONCURRENCY", 5))
+        self.max_pending_age = timedelta(hours=float(os.getenv("PAYMENT_PENDING_MAX_AGE_HOURS", 24)))
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"checked": 0, "completed": 0, "failed": 0, "duplicates": 0, "errors": 0, "expired": 0, "upgrade_errors": 0}
+
+    async def start(self):
+        if not self.enabled or self._task:
+            return
+        self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def apply_status(self, transaction_id: str, state: str) -> Dict:
+        """Record a final payment state once, upgrading the user when it completes.
+
+        Raises SupabaseReadError if the payment could not be read.
+        """
+        if state == "pending":
+            return {"status": "pending", "changed": False}
+
+        payment = await supabase_service.get_payment(transaction_id)
+        if payment is None or payment["status"] not in OPEN_STATES:
+            # Already processed, or not one of our payments
+            self.stats["duplicates"] += 1
+            return {"status": payment["status"] if payment else "unknown", "changed": False}
+
+        if state == "completed":
+            # Upgrade first: it is idempotent, and the payment stays open for the next sweep if it fails
+            if await supabase_service.update_user_premium(payment["user_id"], True) is None:
+                self.stats["upgrade_errors"] += 1
+                return {"status": payment["status"], "changed": False}
+
+        if await supabase_service.transition_payment_status(transaction_id, payment["status"], state) is None:
+            # Settled concurrently by another callback
+            self.stats["duplicates"] += 1
+            return {"status": state, "changed": False}
+        self.stats[state] += 1
+        return {"status": state, "changed": True}
+
+    async def check_and_apply(self, transaction_id: str) -> Optional[Dict]:
+        """Fetch the payment's state from InstaSend and apply it; None if InstaSend could not be reached.
+
+        Raises SupabaseReadError if the payment could not be read.
+        """
+        status_result = await payment_service.check_payment_status(transaction_id)
+        self.stats["checked"] += 1
+        if not status_result["success"]:
+            self.stats["errors"] += 1
+            return None
+
+        state = payment_service.normalize_state(status_result["data"])
+        outcome = await self.apply_status(transaction_id, state)
+        return {**outcome, "data": status_result["data"]}
+
+    async def reconcile_pending(self) -> int:
+        """Expire stale pending payments, then check the rest once; returns how many were checked"""
+        cutoff = (datetime.now() - self.max_pending_age).isoformat()
+        expired = await supabase_service.expire_pending_payments(cutoff)
+        self.stats["expired"] += len(expired or [])
+
+        pending = await supabase_service.get_pending_payments(limit=self.batch_size)
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def check(payment: Dict):
+            async with semaphore:
+                try:
+                    await self.check_and_apply(payment["instasend_transaction_id"])
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    print(f"Error reconciling payment {payment['instasend_transaction_id']}: {e}")
+
+        await asyncio.gather(*(check(payment) for payment in pending if payment.get("instasend_transaction_id")))
+        return len(pending)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "enabled": self.enabled, "running": self._task is not None, "interval": self.interval}
+
+    async def _reconcile_loop(self):
+        while True:
+            try:
+                await self.reconcile_pending()
+            except Exception as e:
+                print(f"Error reconciling payments: {e}")
+            await asyncio.sleep(self.interval)
+
+payment_reconciler = PaymentReconciler()
\ No newline at end of file
@@ -1,19 +1,21 @@
 import os
-import requests
 from typing import Dict, Optional
-from dotenv import load_dotenv
+from services.config import load_env
+from services.http_client import get_client
 
-load_dotenv()
+load_env()
 
 class InstaSendService:
     def __init__(self):
         self.api_key = os.getenv("INSTASEND_API_KEY")
         self.api_token = os.getenv("INSTASEND_API_TOKEN")
-        self.base_url = "https://sandbox.intasend.com/api/v1"  # Use sandbox for testing
+        self.base_url = os.getenv("INSTASEND_BASE_URL", "https://sandbox.intasend.com/api/v1")  # Use sandbox for testing
+        self.webhook_challenge = os.getenv("INSTASEND_WEBHOOK_CHALLENGE")
         self.headers = {
             "Content-Type": "application/json",
             "X-IntaSend-Public-API-Key": self.api_key,
         }
+        self.http = get_client("instasend", "INSTASEND", self.headers, warm_url=self.base_url)
     
     async def initiate_mpesa_payment(self, amount: float, phone_number: str, email: str) -> Dict:
         """Initiate M-Pesa payment via InstaSend"""
@@ -28,10 +30,12 @@ class InstaSendService:
                 "method": "M-PESA"
             }
             
-            response = requests.post(
+            # An STK push is not idempotent, so it is only retried if the connection never opened
+            response = await self.http.post(
                 f"{self.base_url}/payment/mpesa-stk-push/",
                 json=payload,
-                headers=self.headers
+                idempotent=False,
+                operation="stk_push"
             )
             
             if response.status_code == 200:
@@ -57,9 +61,9 @@ class InstaSendService:
     async def check_payment_status(self, transaction_id: str) -> Dict:
         """Check payment status"""
         try:
-            response = requests.get(
+            response = await self.http.get(
                 f"{self.base_url}/payment/status/{transaction_id}/",
-                headers=self.headers
+                operation="payment_status"
             )
             
             if response.status_code == 200:
@@ -79,4 +83,15 @@ class InstaSendService:
                 "error": str(e)
             }
 
+    def normalize_state(self, payment_data: Dict) -> str:
+        """Map an InstaSend status payload or webhook to completed, failed or pending"""
+        invoice = payment_data.get("invoice") or {}
+        state = str(invoice.get("state") or payment_data.get("state") or payment_data.get("status") or "").upper()
+        
+        if state in ("COMPLETE", "COMPLETED"):
+            return "completed"
+        if state in ("FAILED", "CANCELLED", "CANCELED"):
+            return "failed"
+        return "pending"
+
 payment_service = InstaSendService()
\ No newline at end of file
@@ -0,0 +1,168 @@
+import os
+import asyncio
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+from services.config import load_env
+from services.ai_service import ai_service
+from services.cache_service import normalize_topic
+
+load_env()
+
+class PregenerationPool:
+    """Keeps a ready pool of generated items for the most requested topics.
+
+    Routes record each topic they are asked for; a scheduler picks the hottest
+    topics and background workers keep their pools topped up to `depth` items.
+    A topic only counts as hot once its decayed request count reaches
+    `min_requests`, so one-off topics never spend model quota. The pool is
+    off unless POOL_ENABLED is set.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("POOL_ENABLED", "false").lower() == "true"
+        self.depth = int(os.getenv("POOL_DEPTH", 20))
+        self.workers = int(os.getenv("POOL_WORKERS", 2))
+        self.hot_topics = int(os.getenv("POOL_HOT_TOPICS", 10))
+        self.min_requests = float(os.getenv("POOL_MIN_REQUESTS", 5))
+        self.refill_interval = float(os.getenv("POOL_REFILL_INTERVAL", 30))
+        # Request counts are halved every interval so old trends fade out
+        self.decay_interval = float(os.getenv("POOL_DECAY_INTERVAL", 600))
+        self.batch_size = int(os.getenv("POOL_BATCH_SIZE", 5))
+        self._frequency: Counter = Counter()
+        self._topic_names: Dict[Tuple[str, str], str] = {}
+        self._pools: Dict[Tuple[str, str], deque] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: set = set()
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {"hits": 0, "misses": 0, "refills": 0, "refill_errors": 0}
+
+    async def start(self):
+        if not self.enabled or self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks.append(asyncio.create_task(self._schedule_loop()))
+        self._tasks.append(asyncio.create_task(self._decay_loop()))
+        for _ in range(max(1, self.workers)):
+            self._tasks.append(asyncio.create_task(self._worker_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._queued.clear()
+
+    def record_request(self, kind: str, topic: str):
+        """Count a generation request for a topic"""
+        key = (kind, normalize_topic(topic))
+        self._frequency[key] += 1
+        self._topic_names.setdefault(key, topic.strip())
+
+    def take(self, kind: str, topic: str, count: int) -> Optional[List[Dict]]:
+        """Pop `count` ready items for the topic, or return None if the pool is short"""
+        if not self.enabled:
+            return None
+
+        key = (kind, normalize_topic(topic))
+        pool = self._pools.get(key)
+        if pool is None or len(pool) < count:
+            self.stats["misses"] += 1
+            return None
+
+        items = [pool.popleft() for _ in range(count)]
+        self.stats["hits"] += 1
+        self._enqueue_refill(key)
+        return items
+
+    def get_status(self) -> Dict:
+        hottest = set(self._hottest())
+        pools = [
+            {
+                "kind": kind,
+                "topic": self._topic_names.get((kind, topic), topic),
+                "ready": len(self._pools.get((kind, topic), ())),
+                "depth": self.depth,
+                "requests": round(self._frequency[(kind, topic)], 2),
+                "hot": (kind, topic) in hottest
+            }
+            for kind, topic in set(self._pools) | hottest
+        ]
+        pools.sort(key=lambda pool: pool["requests"], reverse=True)
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "running": bool(self._tasks),
+            "workers": self.workers,
+            "pending_refills": self._queue.qsize() if self._queue else 0,
+            "pools": pools
+        }
+
+    def _hottest(self) -> List[Tuple[str, str]]:
+        return [
+            key for key, requests in self._frequency.most_common(self.hot_topics)
+            if requests >= self.min_requests
+        ]
+
+    def _enqueue_refill(self, key: Tuple[str, str]):
+        if self._queue is None or key in self._queued:
+            return
+        if len(self._pools.get(key, ())) >= self.depth:
+            return
+        self._queued.add(key)
+        self._queue.put_nowait(key)
+
+    async def _schedule_loop(self):
+        while True:
+            hottest = self._hottest()
+            for key in hottest:
+                self._enqueue_refill(key)
+
+            # Drop pools for topics that are no longer trending
+            for key in list(self._pools):
+                # A pool being refilled is still referenced by its worker
+                if key not in hottest and key not in self._queued:
+                    del self._pools[key]
+
+            await asyncio.sleep(self.refill_interval)
+
+    async def _decay_loop(self):
+        while True:
+            await asyncio.sleep(self.decay_interval)
+            for key in list(self._frequency):
+                self._frequency[key] /= 2
+                if self._frequency[key] < 0.5:
+                    del self._frequency[key]
+                    self._topic_names.pop(key, None)
+
+    async def _worker_loop(self):
+        while True:
+            key = await self._queue.get()
+            try:
+                await self._refill(key)
+            except Exception as e:
+                self.stats["refill_errors"] += 1
+                print(f"Error refilling pool for {key[1]}: {e}")
+            finally:
+                self._queued.discard(key)
+                self._queue.task_done()
+
+    async def _refill(self, key: Tuple[str, str]):
+        kind, _ = key
+        topic = self._topic_names.get(key, key[1])
+        pool = self._pools.setdefault(key, deque())
+
+        while len(pool) < self.depth:
+            count = min(self.batch_size, self.depth - len(pool))
+            if kind == "quiz":
+                items = await ai_service.generate_quiz(topic, count)
+            else:
+                items = await ai_service.generate_flashcards(topic, count)
+            generated = [item for item in items if not item.get("degraded")]
+            pool.extend(generated)
+            self.stats["refills"] += 1
+            if len(generated) < len(items):
+                # Stand-in items are only served on demand; retry on the next scheduling round
+                break
+
+pregeneration_pool = PregenerationPool()
\ No newline at end of file
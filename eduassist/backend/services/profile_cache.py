@@ -0,0 +1,49 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from services.config import load_env
+
+load_env()
+
+class ProfileCache:
+    """Bounded TTL cache of user profile rows keyed by user id"""
+
+    def __init__(self):
+        self.max_entries = int(os.getenv("PROFILE_CACHE_SIZE", 10000))
+        self.ttl_seconds = float(os.getenv("PROFILE_CACHE_TTL", 300))
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del self._entries[user_id]
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.stats["hits"] += 1
+        return dict(entry[0])
+
+    def set(self, user_id: str, profile: Dict):
+        self._entries[user_id] = (dict(profile), time.time() + self.ttl_seconds)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, user_id: str):
+        if self._entries.pop(user_id, None) is not None:
+            self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0
+        }
\ No newline at end of file
@@ -0,0 +1,120 @@
+import os
+import uuid
+import asyncio
+import random
+from typing import Dict, List, Optional
+from services.config import load_env
+from services.supabase_service import supabase_service
+
+load_env()
+
+class ProgressWriter:
+    """Records progress events, optionally buffering them for bulk inserts.
+
+    In write-behind mode events are queued in memory and flushed when the buffer
+    reaches `flush_size` or every `flush_interval` seconds. Events stay visible
+    through `pending_for` until their batch is stored, so dashboards can merge
+    them for read-your-writes consistency. Each buffered event gets a client_id
+    idempotency key, so retrying a batch that may already have been written
+    does not store it twice.
+    """
+
+    def __init__(self):
+        self.write_behind = os.getenv("PROGRESS_WRITE_BEHIND", "false").lower() == "true"
+        self.flush_size = int(os.getenv("PROGRESS_FLUSH_SIZE", 50))
+        self.flush_interval = float(os.getenv("PROGRESS_FLUSH_INTERVAL", 2))
+        self.max_retries = int(os.getenv("PROGRESS_FLUSH_RETRIES", 5))
+        self.max_buffer = int(os.getenv("PROGRESS_MAX_BUFFER", 10000))
+        self._buffer: List[Dict] = []
+        self._in_flight: List[Dict] = []
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"queued": 0, "flushed": 0, "batches": 0, "retries": 0, "dropped": 0}
+
+    async def start(self):
+        if not self.write_behind or self._task:
+            return
+        self._flush_requested = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the background flusher and write out everything still buffered"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def record(self, progress_data: Dict):
+        """Save a progress event, directly or through the write-behind buffer"""
+        if not self.write_behind or self._task is None:
+            return await supabase_service.save_progress(progress_data)
+
+        # Under sustained database failure, write through rather than grow without bound
+        if len(self._buffer) + len(self._in_flight) >= self.max_buffer:
+            return await supabase_service.save_progress(progress_data)
+
+        self._buffer.append({**progress_data, "client_id": progress_data.get("client_id") or str(uuid.uuid4())})
+        self.stats["queued"] += 1
+        if len(self._buffer) >= self.flush_size:
+            self._flush_requested.set()
+        return {**progress_data, "pending": True}
+
+    def pending_for(self, user_id: str) -> List[Dict]:
+        """Progress events for a user that are not yet stored, newest first"""
+        pending = [row for row in self._in_flight + self._buffer if row["user_id"] == user_id]
+        return sorted(pending, key=lambda row: row["completed_at"], reverse=True)
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._buffer[:self.flush_size]
+                self._in_flight = batch
+                del self._buffer[:len(batch)]
+                try:
+                    await self._write_batch(batch)
+                except asyncio.CancelledError:
+                    # Put the batch back so the final flush on shutdown still writes it
+                    self._buffer[:0] = batch
+                    raise
+                finally:
+                    self._in_flight = []
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "write_behind": self.write_behind,
+            "buffered": len(self._buffer),
+            "in_flight": len(self._in_flight)
+        }
+
+    async def _write_batch(self, batch: List[Dict]):
+        for attempt in range(self.max_retries + 1):
+            saved = await supabase_service.save_progress_bulk(batch)
+            if saved is not None:
+                self.stats["flushed"] += len(batch)
+                self.stats["batches"] += 1
+                return
+
+            if attempt < self.max_retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(min(30, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5))
+
+        self.stats["dropped"] += len(batch)
+        print(f"Dropping {len(batch)} progress events after {self.max_retries} retries")
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing progress events: {e}")
+
+progress_writer = ProgressWriter()
\ No newline at end of file
@@ -0,0 +1,149 @@
+import os
+import re
+import json
+import math
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Tuple
+from services.config import load_env
+from services.container import container
+from services.generation_backend import GenerationBackend, register_backend
+
+load_env()
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / "data" / "question_bank.json"
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it",
+    "of", "on", "or", "the", "this", "to", "what", "which", "who", "with", "about", "into"
+}
+
+# Fields shipped to clients for each kind; tags and topic only feed the index
+ITEM_FIELDS = {
+    "quiz": ("question", "options", "correct_answer", "explanation"),
+    "flashcard": ("front", "back", "difficulty")
+}
+TEXT_FIELDS = {"quiz": ("question", "explanation"), "flashcard": ("front", "back")}
+CORPUS_KEYS = {"quiz": "questions", "flashcard": "flashcards"}
+
+# Matches on an item's topic or tags count for more than matches in its text
+TOPIC_WEIGHT = 3.0
+TEXT_WEIGHT = 1.0
+# Items scoring below this share of the best match are too loosely related to serve
+MIN_RELATIVE_SCORE = 0.4
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        # Crude plural folding so "cells" finds "cell"
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+class QuestionBank:
+    """In-memory question and flashcard corpus with an inverted index over topic keywords"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._items: Dict[str, List[Dict]] = {}
+        self._postings: Dict[str, Dict[str, Dict[int, float]]] = {}
+        self._idf: Dict[str, Dict[str, float]] = {}
+        self.stats = {"searches": 0, "items_served": 0, "load_ms": 0.0}
+        self._load()
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            with open(self.path, encoding="utf-8") as corpus_file:
+                corpus = json.load(corpus_file)
+        except FileNotFoundError:
+            print(f"Question bank not found at {self.path}")
+            corpus = {}
+
+        for kind, key in CORPUS_KEYS.items():
+            items = corpus.get(key, [])
+            postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+            for item_id, item in enumerate(items):
+                for weight, texts in (
+                    (TOPIC_WEIGHT, [item.get("topic", "")] + list(item.get("tags", []))),
+                    (TEXT_WEIGHT, [item.get(field, "") for field in TEXT_FIELDS[kind]])
+                ):
+                    for token in tokenize(" ".join(texts)):
+                        postings[token][item_id] = max(postings[token].get(item_id, 0.0), weight)
+
+            self._items[kind] = items
+            self._postings[kind] = dict(postings)
+            # Rare keywords say more about an item than ones shared by half the corpus
+            self._idf[kind] = {
+                token: math.log(1 + len(items) / len(matches)) for token, matches in postings.items()
+            }
+        self.stats["load_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    def search(self, kind: str, topic: str, limit: int) -> List[Dict]:
+        """Best matching items for a topic, de-duplicated by their text, most relevant first"""
+        self.stats["searches"] += 1
+        postings = self._postings.get(kind, {})
+        idf = self._idf.get(kind, {})
+
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(topic)):
+            for item_id, weight in postings.get(token, {}).items():
+                scores[item_id] += weight * idf[token]
+
+        seen = set()
+        results = []
+        cutoff = max(scores.values(), default=0.0) * MIN_RELATIVE_SCORE
+        for item_id in sorted(scores, key=lambda item_id: (-scores[item_id], item_id)):
+            if scores[item_id] < cutoff:
+                break
+            item = self._items[kind][item_id]
+            fingerprint = self._fingerprint(kind, item)
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            results.append({field: item[field] for field in ITEM_FIELDS[kind] if field in item})
+            if len(results) >= limit:
+                break
+
+        self.stats["items_served"] += len(results)
+        return results
+
+    def _fingerprint(self, kind: str, item: Dict) -> str:
+        text = item.get("question" if kind == "quiz" else "front", "")
+        return " ".join(tokenize(text))
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "path": str(self.path),
+            "questions": len(self._items.get("quiz", [])),
+            "flashcards": len(self._items.get("flashcard", [])),
+            "keywords": {kind: len(postings) for kind, postings in self._postings.items()}
+        }
+
+def get_question_bank() -> QuestionBank:
+    return container.get("question_bank")
+
+class QuestionBankBackend(GenerationBackend):
+    """Serves generation requests entirely from the local question bank"""
+
+    name = "question_bank"
+
+    async def stream(self, kind: str, topic: str, count: int) -> AsyncIterator[Tuple[int, Dict]]:
+        for i, item in enumerate(get_question_bank().search(kind, topic, count)):
+            yield i, item
+
+    def get_stats(self) -> Dict:
+        if "question_bank" not in container.created():
+            return {"loaded": False}
+        return {"loaded": True, **get_question_bank().get_stats()}
+
+container.register(
+    "question_bank",
+    lambda: QuestionBank(Path(os.getenv("QUESTION_BANK_PATH", DEFAULT_PATH)))
+)
+register_backend(QuestionBankBackend())
\ No newline at end of file
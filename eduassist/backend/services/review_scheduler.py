@@ -0,0 +1,274 @@
+import os
+import time
+import heapq
+import random
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from services.config import load_env
+from services.singleflight import SingleFlight, SingleFlightTimeout
+from services.supabase_service import supabase_service
+
+load_env()
+
+DAY_SECONDS = 24 * 3600
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+# Columns kept in memory for each scheduled card
+SCHEDULE_COLUMNS = [
+    "card_id", "user_id", "set_id", "card_index", "topic", "front", "back",
+    "ease", "interval_days", "repetitions", "due_at", "last_reviewed_at"
+]
+
+def sm2(card: Dict, quality: int, now: float) -> Dict:
+    """Next schedule for a card after a review graded 0 (forgot) to 5 (perfect recall), SM-2 style"""
+    ease = card.get("ease") or DEFAULT_EASE
+    repetitions = card.get("repetitions") or 0
+    interval = card.get("interval_days") or 0
+
+    if quality < 3:
+        # Lapsed: relearn from the start, but keep the ease penalty below
+        repetitions, interval = 0, 1
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval = 1
+        elif repetitions == 2:
+            interval = 6
+        else:
+            interval = max(1, round(interval * ease))
+
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return {
+        **card,
+        "ease": round(ease, 3),
+        "interval_days": interval,
+        "repetitions": repetitions,
+        "due_at": _to_iso(now + interval * DAY_SECONDS),
+        "last_reviewed_at": _to_iso(now)
+    }
+
+def _to_iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+def _to_timestamp(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+class DueQueue:
+    """One user's scheduled cards with a min-heap of (due time, card id).
+
+    Rescheduling pushes a new heap entry instead of updating in place; stale
+    entries are recognised by their due time and dropped when they surface.
+    """
+
+    def __init__(self, cards: List[Dict]):
+        self.cards: Dict[str, Dict] = {}
+        self._due: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self.loaded_at = time.monotonic()
+        for card in cards:
+            self.put(card)
+
+    def put(self, card: Dict):
+        due = _to_timestamp(card["due_at"])
+        self.cards[card["card_id"]] = card
+        if self._due.get(card["card_id"]) == due:
+            # The live heap entry already has this due time
+            return
+        self._due[card["card_id"]] = due
+        heapq.heappush(self._heap, (due, card["card_id"]))
+        if len(self._heap) > 2 * len(self.cards) + 64:
+            # Too many stale entries from rescheduling: rebuild from the live due times
+            self._heap = [(due, card_id) for card_id, due in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def due(self, now: float, limit: int) -> List[Dict]:
+        """Up to `limit` cards due by `now`, soonest first, in O(limit log n)"""
+        taken, popped, seen = [], [], set()
+        while self._heap and len(taken) < limit and self._heap[0][0] <= now:
+            due, card_id = heapq.heappop(self._heap)
+            if self._due.get(card_id) != due:
+                # Superseded by a later reschedule
+                continue
+            popped.append((due, card_id))
+            if card_id not in seen:
+                seen.add(card_id)
+                taken.append(card_id)
+        # Peeking must not consume the queue
+        for entry in popped:
+            heapq.heappush(self._heap, entry)
+        return [self.cards[card_id] for card_id in taken]
+
+class ReviewScheduler:
+    """Spaced-repetition scheduling for flashcards, one DueQueue per recently active user.
+
+    Schedules live in the flashcard_reviews table; a user's queue is loaded
+    from it on first use and dropped whenever this process writes the user's
+    schedules, so the next read reloads it. Queues older than `queue_ttl`
+    seconds are reloaded too, which bounds how long another worker's writes
+    stay invisible here. Schedule writes for new sets that fail are retried
+    in the background.
+    """
+
+    def __init__(self):
+        self.max_users = int(os.getenv("REVIEW_QUEUE_MAX_USERS", 5000))
+        self.max_batch = int(os.getenv("REVIEW_MAX_BATCH", 500))
+        self.max_retries = int(os.getenv("REVIEW_SCHEDULE_RETRIES", 5))
+        self.queue_ttl = float(os.getenv("REVIEW_QUEUE_TTL", 60))
+        self._retries = set()
+        self._queues: "OrderedDict[str, DueQueue]" = OrderedDict()
+        # Users with a load in flight, and whether they were written to meanwhile
+        self._loading: Dict[str, bool] = {}
+        self._loads = SingleFlight(max_wait=float(os.getenv("REVIEW_LOAD_MAX_WAIT", 10)))
+        self.stats = {
+            "queue_loads": 0, "invalidations": 0, "expired": 0, "cards_scheduled": 0, "reviews": 0, "evictions": 0,
+            "schedule_failures": 0, "schedule_retries": 0, "schedules_dropped": 0
+        }
+
+    async def add_set(self, user_id: str, set_id: str, topic: str, flashcards: List[Dict]) -> bool:
+        """Schedule every card of a newly saved set for immediate review.
+
+        Returns False if the write failed; it is then retried in the background.
+        """
+        now = _to_iso(time.time())
+        rows = [
+            {
+                "card_id": f"{set_id}:{index}",
+                "user_id": user_id,
+                "set_id": set_id,
+                "card_index": index,
+                "topic": topic,
+                "front": card.get("front"),
+                "back": card.get("back"),
+                "ease": DEFAULT_EASE,
+                "interval_days": 0,
+                "repetitions": 0,
+                "due_at": now,
+                "last_reviewed_at": None
+            }
+            for index, card in enumerate(flashcards)
+        ]
+        saved = await supabase_service.save_card_schedules(rows)
+        if saved is None:
+            self.stats["schedule_failures"] += 1
+            print(f"Could not schedule {len(rows)} cards of flashcard set {set_id}, retrying in the background")
+            task = asyncio.create_task(self._retry_schedules(user_id, set_id, rows))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+            return False
+
+        self._scheduled(user_id, rows)
+        return True
+
+    def _scheduled(self, user_id: str, rows: List[Dict]):
+        self._invalidate(user_id)
+        self.stats["cards_scheduled"] += len(rows)
+
+    def _invalidate(self, user_id: str):
+        """Forget a user's queue after writing their schedules, including one still being loaded"""
+        if self._queues.pop(user_id, None) is not None:
+            self.stats["invalidations"] += 1
+        if user_id in self._loading:
+            self._loading[user_id] = True
+
+    async def _retry_schedules(self, user_id: str, set_id: str, rows: List[Dict]):
+        for attempt in range(self.max_retries):
+            await asyncio.sleep(min(30, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5))
+            self.stats["schedule_retries"] += 1
+            saved = await supabase_service.save_card_schedules(rows)
+            if saved is not None:
+                self._scheduled(user_id, rows)
+                return
+
+        self.stats["schedules_dropped"] += 1
+        print(f"Dropping review schedules for flashcard set {set_id} after {self.max_retries} retries")
+
+    async def get_due(self, user_id: str, limit: int) -> Optional[Dict]:
+        """The next cards due for review; None if the user's schedules could not be loaded"""
+        queue = await self._queue(user_id)
+        if queue is None:
+            return None
+        # One extra card tells the client whether more are waiting
+        cards = queue.due(time.time(), limit + 1)
+        return {"cards": cards[:limit], "has_more": len(cards) > limit}
+
+    async def record_reviews(self, user_id: str, results: List[Dict]) -> Optional[List[Dict]]:
+        """Apply a batch of review grades and persist the new schedules in one write.
+
+        Returns a per-card outcome list, or None if nothing could be loaded or saved.
+        """
+        queue = await self._queue(user_id)
+        if queue is None:
+            return None
+
+        now = time.time()
+        outcomes, updated = [], {}
+        for result in results:
+            card = updated.get(result["card_id"]) or queue.cards.get(result["card_id"])
+            if card is None:
+                outcomes.append({"card_id": result["card_id"], "status": "not_found"})
+                continue
+            # Grading the same card twice in a batch applies both reviews in order
+            updated[card["card_id"]] = sm2(card, result["quality"], now)
+            outcomes.append({"card_id": card["card_id"], "status": "ok"})
+
+        if updated:
+            saved = await supabase_service.save_card_schedules(list(updated.values()))
+            # Either way the stored schedules are now the only reliable copy
+            self._invalidate(user_id)
+            if saved is None:
+                return None
+            self.stats["reviews"] += sum(1 for outcome in outcomes if outcome["status"] == "ok")
+
+        for outcome in outcomes:
+            card = updated.get(outcome["card_id"])
+            if card is not None:
+                outcome.update({
+                    "due_at": card["due_at"],
+                    "interval_days": card["interval_days"],
+                    "ease": card["ease"],
+                    "repetitions": card["repetitions"]
+                })
+        return outcomes
+
+    async def _queue(self, user_id: str) -> Optional[DueQueue]:
+        queue = self._queues.get(user_id)
+        if queue is not None:
+            if time.monotonic() - queue.loaded_at < self.queue_ttl:
+                self._queues.move_to_end(user_id)
+                return queue
+            # Old enough that another worker may have written this user's schedules since
+            self.stats["expired"] += 1
+            del self._queues[user_id]
+        # Concurrent first requests for a user share one load
+        try:
+            return await self._loads.do(user_id, lambda: self._load(user_id))
+        except SingleFlightTimeout:
+            return None
+
+    async def _load(self, user_id: str) -> Optional[DueQueue]:
+        self._loading[user_id] = False
+        try:
+            rows = await supabase_service.get_card_schedules(user_id, columns=SCHEDULE_COLUMNS)
+        finally:
+            written = self._loading.pop(user_id)
+        if rows is None:
+            return None
+
+        queue = DueQueue(rows)
+        self.stats["queue_loads"] += 1
+        if written:
+            # The rows may predate a write made while they were being read; serve them once, uncached
+            return queue
+        self._queues[user_id] = queue
+        while len(self._queues) > self.max_users:
+            self._queues.popitem(last=False)
+            self.stats["evictions"] += 1
+        return queue
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "users_loaded": len(self._queues), "max_users": self.max_users}
+
+review_scheduler = ReviewScheduler()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from services.config import load_env
+
+load_env()
+
+class SingleFlightTimeout(Exception):
+    """A follower gave up waiting on the shared call for its key"""
+
+class SingleFlight:
+    """Lets concurrent identical calls share one in-flight execution.
+
+    The first caller for a key starts the work as a separate task; callers that
+    arrive while it runs wait on the same task for up to `max_wait` seconds (or
+    their own `timeout`) and then raise SingleFlightTimeout. They never start
+    the work again themselves, so a slow dependency cannot turn one coalesced
+    call into many. The shared task is only cancelled once every caller
+    waiting on it has gone away.
+    """
+
+    def __init__(self, max_wait: float):
+        self.max_wait = max_wait
+        self._calls: Dict[str, Dict] = {}
+        self.stats = {"leaders": 0, "coalesced": 0, "wait_timeouts": 0, "cancelled": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = {"task": asyncio.create_task(fn()), "waiters": 0}
+            self._calls[key] = call
+            call["task"].add_done_callback(lambda _: self._forget(key, call))
+            self.stats["leaders"] += 1
+            timeout = None
+        else:
+            self.stats["coalesced"] += 1
+            timeout = self.max_wait if timeout is None else min(timeout, self.max_wait)
+
+        call["waiters"] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(call["task"]), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.stats["wait_timeouts"] += 1
+            raise SingleFlightTimeout(f"Timed out after {timeout}s waiting on the shared call for {key}")
+        finally:
+            call["waiters"] -= 1
+            if call["waiters"] == 0 and not call["task"].done():
+                call["task"].cancel()
+                self._forget(key, call)
+                self.stats["cancelled"] += 1
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "in_flight": len(self._calls), "max_wait": self.max_wait}
+
+    def _forget(self, key: str, call: Dict):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+generation_singleflight = SingleFlight(max_wait=float(os.getenv("SINGLEFLIGHT_MAX_WAIT", 30)))
\ No newline at end of file
@@ -0,0 +1,46 @@
+from typing import Dict, Iterable
+
+def empty_stats(user_id: str) -> Dict:
+    """A fresh per-user stats record"""
+    return {
+        "user_id": user_id,
+        "total_quizzes": 0,
+        "total_flashcard_sessions": 0,
+        "quiz_score_sum": 0,
+        "quiz_score_count": 0,
+        "topics": []
+    }
+
+def apply_progress(stats: Dict, progress: Dict) -> Dict:
+    """Fold a single progress row into a stats record"""
+    if progress.get("activity_type") == "quiz":
+        stats["total_quizzes"] += 1
+        # Matches the dashboard's historical average, which skips empty scores
+        if progress.get("score"):
+            stats["quiz_score_sum"] += progress["score"]
+            stats["quiz_score_count"] += 1
+    elif progress.get("activity_type") == "flashcard":
+        stats["total_flashcard_sessions"] += 1
+
+    topic = progress.get("topic")
+    if topic is not None and topic not in stats["topics"]:
+        stats["topics"].append(topic)
+    return stats
+
+def build_stats(user_id: str, progress_rows: Iterable[Dict]) -> Dict:
+    """Recompute a stats record from a user's full progress history"""
+    stats = empty_stats(user_id)
+    for progress in progress_rows:
+        apply_progress(stats, progress)
+    return stats
+
+def summarize_stats(stats: Dict) -> Dict:
+    """Dashboard figures derived from a stats record"""
+    average_quiz_score = stats["quiz_score_sum"] / stats["quiz_score_count"] if stats["quiz_score_count"] else 0
+    return {
+        "total_quizzes": stats["total_quizzes"],
+        "total_flashcard_sessions": stats["total_flashcard_sessions"],
+        "average_quiz_score": round(average_quiz_score, 1),
+        "topics_studied": len(stats["topics"]),
+        "topics_list": list(stats["topics"])
+    }
\ No newline at end of file
@@ -0,0 +1,15 @@
+import json
+from typing import Dict
+
+# Supported streaming formats and their media types
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream"
+}
+
+def encode_frame(frame: Dict, stream_format: str) -> str:
+    """Encode a frame as an NDJSON line or a Server-Sent Event"""
+    data = json.dumps(frame, default=str)
+    if stream_format == "sse":
+        return f"event: {frame.get('type', 'message')}\ndata: {data}\n\n"
+    return f"{data}\n"
\ No newline at end of file
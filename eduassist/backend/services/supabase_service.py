@@ -1,84 +1,575 @@
 import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
+import time
+import uuid
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from services.stats_service import apply_progress, build_stats
+from services.profile_cache import ProfileCache
+from services.answer_key_cache import AnswerKeyCache, extract_answer_key
+from services.metrics import record_dependency_call
+from services.config import load_env
+from services.container import container
 
-load_dotenv()
+load_env()
 
 url: str = os.getenv("SUPABASE_URL")
 key: str = os.getenv("SUPABASE_ANON_KEY")
 
-supabase_client: Client = create_client(url, key)
+# Most values sent in one `in` filter, which travels in the request URL
+IN_FILTER_CHUNK = 50
+
+# Set metadata served without loading any cards
+FLASHCARD_SET_COLUMNS = ["id", "user_id", "topic", "card_count", "created_at"]
+
+class SupabaseReadError(Exception):
+    """A lookup failed, as opposed to finding nothing"""
+
+def _create_supabase_client():
+    # The supabase package pulls in its auth, storage and realtime clients, so it is imported on first use
+    from supabase import create_client
+    return create_client(url, key)
+
+def get_supabase_client():
+    return container.get("supabase")
 
 class SupabaseService:
     def __init__(self):
-        self.client = supabase_client
+        # The supabase client is synchronous, so queries run on a dedicated bounded pool
+        self.pool_size = int(os.getenv("SUPABASE_POOL_SIZE", 10))
+        self.timeout = float(os.getenv("SUPABASE_TIMEOUT", 10))
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="supabase")
+        self._metrics: Dict[str, Dict] = {}
+        self.profile_cache = ProfileCache()
+        self.answer_keys = AnswerKeyCache()
+        # Striped locks serialize read-modify-write updates of each user's stats record within this process
+        self._stats_locks = [asyncio.Lock() for _ in range(64)]
+        # Users whose last stats update was skipped; their next update recomputes from history
+        self._stale_stats = set()
+    
+    async def _execute(self, operation: str, query):
+        """Run a built query on the executor with a timeout, recording its latency"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self._executor, query.execute), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise TimeoutError(f"{operation} timed out after {self.timeout}s")
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self._record(operation, (time.perf_counter() - start) * 1000, status)
+    
+    def _record(self, operation: str, elapsed_ms: float, status: str):
+        record_dependency_call("supabase", operation, elapsed_ms / 1000, success=status == "ok")
+        metric = self._metrics.setdefault(operation, {
+            "count": 0, "errors": 0, "timeouts": 0, "total_ms": 0.0, "max_ms": 0.0, "samples": deque(maxlen=512)
+        })
+        metric["count"] += 1
+        metric["total_ms"] += elapsed_ms
+        metric["max_ms"] = max(metric["max_ms"], elapsed_ms)
+        metric["samples"].append(elapsed_ms)
+        if status == "error":
+            metric["errors"] += 1
+        elif status == "timeout":
+            metric["timeouts"] += 1
+    
+    def get_metrics(self) -> Dict:
+        """Per-method call counts and latency percentiles in milliseconds"""
+        metrics = {}
+        for operation, metric in self._metrics.items():
+            samples = sorted(metric["samples"])
+            metrics[operation] = {
+                "count": metric["count"],
+                "errors": metric["errors"],
+                "timeouts": metric["timeouts"],
+                "avg_ms": round(metric["total_ms"] / metric["count"], 2),
+                "p50_ms": round(samples[len(samples) // 2], 2),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+                "max_ms": round(metric["max_ms"], 2)
+            }
+        return {"pool_size": self.pool_size, "timeout_s": self.timeout, "operations": metrics}
+    
+    @property
+    def client(self):
+        return get_supabase_client()
+    
+    def close(self):
+        self._executor.shutdown(wait=False)
+    
+    async def warm(self):
+        """Open the REST connection with a one-row query so the first request doesn't pay for it"""
+        try:
+            await self._execute("warm", self.client.table("users").select("id").limit(1))
+        except Exception as e:
+            print(f"Error warming database connection: {e}")
     
     async def create_user_profile(self, user_id: str, email: str):
         try:
-            result = self.client.table("users").insert({
+            result = await self._execute("create_user_profile", self.client.table("users").insert({
                 "id": user_id,
                 "email": email,
                 "is_premium": False
-            }).execute()
-            return result.data[0] if result.data else None
+            }))
+            profile = result.data[0] if result.data else None
         except Exception as e:
             print(f"Error creating user profile: {e}")
+            self.profile_cache.invalidate(user_id)
             return None
+        
+        if profile:
+            self.profile_cache.set(user_id, profile)
+        return profile
     
     async def get_user_profile(self, user_id: str):
+        profile = self.profile_cache.get(user_id)
+        if profile is not None:
+            return profile
+        
         try:
-            result = self.client.table("users").select("*").eq("id", user_id).execute()
-            return result.data[0] if result.data else None
+            result = await self._execute("get_user_profile", self.client.table("users").select("*").eq("id", user_id))
+            profile = result.data[0] if result.data else None
         except Exception as e:
             print(f"Error getting user profile: {e}")
             return None
+        
+        if profile:
+            self.profile_cache.set(user_id, profile)
+        return profile
+    
+    async def list_user_ids(self):
+        try:
+            result = await self._execute("list_user_ids", self.client.table("users").select("id"))
+            return [row["id"] for row in result.data]
+        except Exception as e:
+            print(f"Error listing users: {e}")
+            return []
     
     async def save_quiz(self, quiz_data: dict):
         try:
-            result = self.client.table("quizzes").insert(quiz_data).execute()
-            return result.data[0] if result.data else None
+            result = await self._execute("save_quiz", self.client.table("quizzes").insert(quiz_data))
+            quiz = result.data[0] if result.data else None
         except Exception as e:
             print(f"Error saving quiz: {e}")
             return None
+        
+        # Index the answer key now so submissions don't need to read the quiz back
+        if quiz:
+            self.answer_keys.set(quiz["id"], extract_answer_key({**quiz_data, **quiz}))
+        return quiz
+    
+    async def get_quiz_answer_key(self, quiz_id: str):
+        """Answer key for a saved quiz, from the in-memory index or the quizzes table.
+
+        Returns None if there is no such quiz; raises SupabaseReadError if the lookup failed.
+        """
+        answer_key = self.answer_keys.get(quiz_id)
+        if answer_key is not None:
+            return answer_key
+        
+        try:
+            result = await self._execute(
+                "get_quiz_answer_key",
+                self.client.table("quizzes").select("id,user_id,topic,questions").eq("id", quiz_id)
+            )
+        except Exception as e:
+            print(f"Error getting quiz answer key: {e}")
+            raise SupabaseReadError(str(e))
+        
+        if not result.data:
+            return None
+        answer_key = extract_answer_key(result.data[0])
+        self.answer_keys.set(quiz_id, answer_key)
+        return answer_key
+    
+    async def get_quiz_answer_keys(self, quiz_ids: List[str]):
+        """Answer keys for many quizzes, reading every cache miss in one query; None if that read failed"""
+        answer_keys = {}
+        missing = []
+        for quiz_id in dict.fromkeys(quiz_ids):
+            answer_key = self.answer_keys.get(quiz_id)
+            if answer_key is None:
+                missing.append(quiz_id)
+            else:
+                answer_keys[quiz_id] = answer_key
+        if not missing:
+            return answer_keys
+        
+        quizzes = []
+        try:
+            # Chunked so the id list stays well inside URL length limits
+            for start in range(0, len(missing), IN_FILTER_CHUNK):
+                result = await self._execute(
+                    "get_quiz_answer_keys",
+                    self.client.table("quizzes").select("id,user_id,topic,questions").in_("id", missing[start:start + IN_FILTER_CHUNK])
+                )
+                quizzes.extend(result.data or [])
+        except Exception as e:
+            print(f"Error getting quiz answer keys: {e}")
+            return None
+        
+        for quiz in quizzes:
+            answer_key = extract_answer_key(quiz)
+            self.answer_keys.set(quiz["id"], answer_key)
+            answer_keys[quiz["id"]] = answer_key
+        return answer_keys
     
     async def save_flashcard_set(self, flashcard_data: dict):
+        """Store a set as one row per card plus a metadata row; returns the metadata row"""
+        flashcards = flashcard_data.get("flashcards") or []
+        set_row = {key: value for key, value in flashcard_data.items() if key != "flashcards"}
+        set_row = {**set_row, "id": set_row.get("id") or str(uuid.uuid4()), "card_count": len(flashcards)}
+        card_rows = [
+            {
+                "set_id": set_row["id"],
+                "card_index": index,
+                "front": card.get("front"),
+                "back": card.get("back"),
+                "difficulty": card.get("difficulty"),
+                # Stand-in cards from a degraded generation stay marked when served back
+                "degraded": bool(card.get("degraded"))
+            }
+            for index, card in enumerate(flashcards)
+        ]
+        try:
+            # Cards go first: a set row is only visible once all of its cards are stored
+            if card_rows:
+                await self._execute("save_flashcard_cards", self.client.table("flashcard_cards").insert(card_rows))
+        except Exception as e:
+            print(f"Error saving flashcard cards: {e}")
+            return None
+        
         try:
-            result = self.client.table("flashcard_sets").insert(flashcard_data).execute()
+            result = await self._execute("save_flashcard_set", self.client.table("flashcard_sets").insert(set_row))
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Error saving flashcard set: {e}")
+            # Don't leave cards behind for a set that was never created
+            try:
+                await self._execute(
+                    "delete_flashcard_cards", self.client.table("flashcard_cards").delete().eq("set_id", set_row["id"])
+                )
+            except Exception as cleanup_error:
+                print(f"Error removing cards of unsaved flashcard set {set_row['id']}: {cleanup_error}")
+            return None
+    
+    async def get_flashcard_set(self, set_id: str):
+        """A set's metadata row, without its cards; None if there is no such set.
+
+        Raises SupabaseReadError if the lookup itself failed.
+        """
+        try:
+            result = await self._execute(
+                "get_flashcard_set",
+                self.client.table("flashcard_sets").select(",".join(FLASHCARD_SET_COLUMNS)).eq("id", set_id)
+            )
+        except Exception as e:
+            print(f"Error getting flashcard set: {e}")
+            raise SupabaseReadError(str(e))
+        return result.data[0] if result.data else None
+    
+    async def get_flashcard_cards(self, flashcard_set: dict, offset: int, limit: int):
+        """Cards `offset` to `offset + limit` of a set, in order; None if they could not be read"""
+        try:
+            if flashcard_set.get("card_count") is None:
+                # Sets saved before card rows existed keep their cards in the flashcards column
+                result = await self._execute(
+                    "get_flashcard_cards_legacy",
+                    self.client.table("flashcard_sets").select("flashcards").eq("id", flashcard_set["id"])
+                )
+                flashcards = (result.data[0].get("flashcards") if result.data else None) or []
+                return flashcards[offset:offset + limit]
+            
+            result = await self._execute(
+                "get_flashcard_cards",
+                self.client.table("flashcard_cards").select("front,back,difficulty,degraded")
+                .eq("set_id", flashcard_set["id"]).gte("card_index", offset).lt("card_index", offset + limit)
+                .order("card_index")
+            )
+            # Same shape as freshly generated cards: the flag is only present on stand-ins
+            return [
+                {**card, "degraded": True} if card.pop("degraded", False) else card
+                for card in result.data
+            ]
+        except Exception as e:
+            print(f"Error getting flashcards: {e}")
+            return None
+    
+    async def list_flashcard_sets(self, user_id: str, after: Optional[Tuple[str, str]] = None, limit: int = 20):
+        """A user's set metadata rows newest first; `after` is a (created_at, id) keyset cursor"""
+        try:
+            query = self.client.table("flashcard_sets").select(",".join(FLASHCARD_SET_COLUMNS)).eq("user_id", user_id)
+            if after:
+                created_at, set_id = after
+                query.params = query.params.add(
+                    "or", f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{set_id}"))'
+                )
+            query.params = query.params.set("order", "created_at.desc,id.desc")
+            result = await self._execute("list_flashcard_sets", query.limit(limit))
+            return result.data
+        except Exception as e:
+            print(f"Error listing flashcard sets: {e}")
+            return None
+    
+    async def save_card_schedules(self, schedule_rows: list):
+        """Insert or update many flashcard review schedules in one request; returns None if the write failed"""
+        try:
+            result = await self._execute(
+                "save_card_schedules",
+                self.client.table("flashcard_reviews").upsert(schedule_rows, on_conflict="card_id")
+            )
+            return result.data or []
+        except Exception as e:
+            print(f"Error saving card schedules: {e}")
+            return None
+    
+    async def get_card_schedules(self, user_id: str, columns: Optional[List[str]] = None):
+        """All of a user's flashcard review schedules; None if they could not be read"""
+        try:
+            result = await self._execute(
+                "get_card_schedules",
+                self.client.table("flashcard_reviews").select(",".join(columns) if columns else "*").eq("user_id", user_id)
+            )
+            return result.data
+        except Exception as e:
+            print(f"Error getting card schedules: {e}")
             return None
     
     async def save_progress(self, progress_data: dict):
         try:
-            result = self.client.table("progress").insert(progress_data).execute()
-            return result.data[0] if result.data else None
+            result = await self._execute("save_progress", self.client.table("progress").insert(progress_data))
+            saved = result.data[0] if result.data else None
         except Exception as e:
             print(f"Error saving progress: {e}")
             return None
+        
+        if saved:
+            await self._update_user_stats(progress_data["user_id"], [saved])
+        return saved
     
-    async def get_user_progress(self, user_id: str):
+    async def save_progress_bulk(self, progress_rows: list):
+        """Insert many progress rows in one request; returns None if the insert failed.
+
+        Rows carry a client_id idempotency key, unique per user, so a batch
+        written again after an ambiguous failure skips the rows that already
+        landed. Only newly inserted rows are returned and counted in stats.
+        """
+        try:
+            result = await self._execute(
+                "save_progress_bulk",
+                self.client.table("progress").upsert(progress_rows, on_conflict="user_id,client_id", ignore_duplicates=True)
+            )
+            saved_rows = result.data or []
+        except Exception as e:
+            print(f"Error saving progress batch: {e}")
+            return None
+        
+        rows_by_user: Dict[str, list] = {}
+        for row in saved_rows:
+            rows_by_user.setdefault(row["user_id"], []).append(row)
+        for user_id, rows in rows_by_user.items():
+            await self._update_user_stats(user_id, rows)
+        return saved_rows
+    
+    async def get_user_progress(self, user_id: str, columns: Optional[List[str]] = None, topic: Optional[str] = None,
+                                activity_type: Optional[str] = None, since: Optional[str] = None,
+                                until: Optional[str] = None, after: Optional[Tuple[str, str]] = None,
+                                limit: Optional[int] = None):
+        """Progress rows newest first; `after` is a (completed_at, id) keyset cursor.
+
+        Read failures raise, so callers can tell an outage from an empty history.
+        """
+        query = self.client.table("progress").select(",".join(columns) if columns else "*").eq("user_id", user_id)
+        if topic:
+            query = query.eq("topic", topic)
+        if activity_type:
+            query = query.eq("activity_type", activity_type)
+        if since:
+            query = query.gte("completed_at", since)
+        if until:
+            query = query.lt("completed_at", until)
+        if after:
+            completed_at, row_id = after
+            # (completed_at, id) < cursor; set as raw params since this postgrest client has no or_()
+            query.params = query.params.add(
+                "or", f'(completed_at.lt."{completed_at}",and(completed_at.eq."{completed_at}",id.lt."{row_id}"))'
+            )
+        # id breaks ties between rows with the same completed_at
+        query.params = query.params.set("order", "completed_at.desc,id.desc")
+        if limit:
+            query = query.limit(limit)
+        
+        result = await self._execute("get_user_progress", query)
+        return result.data
+    
+    async def get_recent_progress(self, user_id: str, limit: int = 10):
         try:
-            result = self.client.table("progress").select("*").eq("user_id", user_id).order("completed_at", desc=True).execute()
+            result = await self._execute("get_recent_progress", self.client.table("progress").select("*").eq("user_id", user_id).order("completed_at", desc=True).limit(limit))
             return result.data
         except Exception as e:
-            print(f"Error getting user progress: {e}")
+            print(f"Error getting recent progress: {e}")
             return []
     
+    async def get_user_stats(self, user_id: str):
+        try:
+            return await self._query_user_stats(user_id)
+        except Exception as e:
+            print(f"Error getting user stats: {e}")
+            return None
+    
+    async def _query_user_stats(self, user_id: str):
+        """The user's stats record, or None if they have none; read failures raise"""
+        result = await self._execute("get_user_stats", self.client.table("user_stats").select("*").eq("user_id", user_id))
+        return result.data[0] if result.data else None
+    
+    async def save_user_stats(self, stats: dict):
+        try:
+            result = await self._execute("save_user_stats", self.client.table("user_stats").upsert(stats, on_conflict="user_id"))
+            return result.data[0] if result.data else None
+        except Exception as e:
+            print(f"Error saving user stats: {e}")
+            return None
+    
+    async def rebuild_user_stats(self, user_id: str):
+        """Recompute a user's stats record from their full progress history.
+
+        Returns the recomputed stats even if saving them fails (the next update
+        retries the rebuild); None only if the history could not be read.
+        """
+        async with self._stats_lock(user_id):
+            try:
+                progress_rows = await self.get_user_progress(user_id)
+            except Exception as e:
+                # Never overwrite a real record with stats built from a failed read
+                print(f"Error rebuilding user stats: {e}")
+                return None
+            stats = build_stats(user_id, progress_rows)
+            saved = await self.save_user_stats(stats)
+            if saved is None:
+                self._stale_stats.add(user_id)
+                return stats
+            self._stale_stats.discard(user_id)
+            return saved
+    
+    async def _update_user_stats(self, user_id: str, progress_rows: list):
+        """Fold newly stored progress rows into the user's stats record.
+
+        This is a read-modify-write guarded by an in-process lock, so it
+        assumes one API worker process; with several, concurrent updates for
+        the same user can be lost until `rebuild_stats.py` recomputes them.
+        """
+        async with self._stats_lock(user_id):
+            try:
+                stats = None if user_id in self._stale_stats else await self._query_user_stats(user_id)
+                if stats is None:
+                    # First activity, a user from before stats existed, or a missed update: start from history
+                    stats = build_stats(user_id, await self.get_user_progress(user_id))
+                else:
+                    for progress in progress_rows:
+                        apply_progress(stats, progress)
+            except Exception as e:
+                # Skip the write rather than save stats built from a failed read, and rebuild next time
+                print(f"Error reading stats for {user_id}, rebuilding on the next update: {e}")
+                self._stale_stats.add(user_id)
+                return
+            
+            if await self.save_user_stats(stats) is None:
+                self._stale_stats.add(user_id)
+            else:
+                self._stale_stats.discard(user_id)
+    
+    def has_stale_stats(self, user_id: str) -> bool:
+        """True if the user's stored stats record missed an update and will be rebuilt"""
+        return user_id in self._stale_stats
+    
+    def _stats_lock(self, user_id: str) -> asyncio.Lock:
+        return self._stats_locks[hash(user_id) % len(self._stats_locks)]
+    
     async def save_payment(self, payment_data: dict):
         try:
-            result = self.client.table("payments").insert(payment_data).execute()
+            result = await self._execute("save_payment", self.client.table("payments").insert(payment_data))
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Error saving payment: {e}")
             return None
     
-    async def update_user_premium(self, user_id: str, is_premium: bool):
+    async def get_payment(self, transaction_id: str):
+        """A payment by its InstaSend transaction id; None if there is no such payment.
+
+        Raises SupabaseReadError if the lookup itself failed.
+        """
+        try:
+            result = await self._execute("get_payment", self.client.table("payments").select("*").eq("instasend_transaction_id", transaction_id))
+        except Exception as e:
+            print(f"Error getting payment: {e}")
+            raise SupabaseReadError(str(e))
+        return result.data[0] if result.data else None
+    
+    async def get_pending_payments(self, limit: int = 100):
+        try:
+            result = await self._execute("get_pending_payments", self.client.table("payments").select("*").eq("status", "pending").order("created_at").limit(limit))
+            return result.data
+        except Exception as e:
+            print(f"Error getting pending payments: {e}")
+            return []
+    
+    async def expire_pending_payments(self, created_before: str):
+        """Mark pending payments created before the cutoff as expired; returns the expired rows"""
+        try:
+            result = await self._execute(
+                "expire_pending_payments",
+                self.client.table("payments").update({"status": "expired"}).eq("status", "pending").lt("created_at", created_before)
+            )
+            return result.data
+        except Exception as e:
+            print(f"Error expiring pending payments: {e}")
+            return None
+    
+    async def transition_payment_status(self, transaction_id: str, from_status: str, to_status: str):
+        """Conditionally move a payment between states; returns the row only if this call changed it"""
         try:
-            result = self.client.table("users").update({"is_premium": is_premium}).eq("id", user_id).execute()
+            result = await self._execute("transition_payment_status", self.client.table("payments").update({"status": to_status}).eq("instasend_transaction_id", transaction_id).eq("status", from_status))
             return result.data[0] if result.data else None
+        except Exception as e:
+            print(f"Error updating payment status: {e}")
+            return None
+    
+    async def update_user_premium(self, user_id: str, is_premium: bool):
+        try:
+            result = await self._execute("update_user_premium", self.client.table("users").update({"is_premium": is_premium}).eq("id", user_id))
+            profile = result.data[0] if result.data else None
         except Exception as e:
             print(f"Error updating user premium status: {e}")
+            # The update may still have landed, so don't keep serving the old status
+            self.profile_cache.invalidate(user_id)
+            return None
+        
+        if profile:
+            self.profile_cache.set(user_id, profile)
+        else:
+            self.profile_cache.invalidate(user_id)
+        return profile
+
+    async def get_cached_generation(self, cache_key: str):
+        try:
+            result = await self._execute("get_cached_generation", self.client.table("generation_cache").select("*").eq("cache_key", cache_key))
+            return result.data[0] if result.data else None
+        except Exception as e:
+            print(f"Error getting cached generation: {e}")
             return None
+    
+    async def save_cached_generation(self, cache_data: dict):
+        try:
+            result = await self._execute("save_cached_generation", self.client.table("generation_cache").upsert(cache_data, on_conflict="cache_key"))
+            return result.data[0] if result.data else None
+        except Exception as e:
+            print(f"Error saving cached generation: {e}")
+            return None
+
+supabase_service = SupabaseService()
 
-supabase_service = SupabaseService()
\ No newline at end of file
+container.register("supabase", _create_supabase_client, warm=lambda client: supabase_service.warm())
\ No newline at end of file
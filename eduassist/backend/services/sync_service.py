@@ -0,0 +1,141 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from models.database import QuizSyncItem, FlashcardSyncItem
+from services.answer_key_cache import score_answers
+from services.config import load_env
+from services.supabase_service import supabase_service
+
+load_env()
+
+class ProgressSync:
+    """Replays quiz and flashcard results recorded offline, a batch at a time.
+
+    Every result carries an idempotency id generated on the device. It is
+    stored on the progress row, so a batch resent after a lost response is
+    reported as duplicates instead of being counted twice.
+    """
+
+    def __init__(self):
+        self.max_batch = int(os.getenv("SYNC_MAX_BATCH", 200))
+        self.max_age = timedelta(days=float(os.getenv("SYNC_MAX_AGE_DAYS", 30)))
+        self.max_clock_skew = timedelta(seconds=float(os.getenv("SYNC_MAX_CLOCK_SKEW", 300)))
+        self.stats = {"batches": 0, "saved": 0, "duplicate": 0, "invalid": 0, "failed_batches": 0}
+
+    async def sync_quizzes(self, user_id: str, results: List[Any]) -> Optional[List[Dict]]:
+        """Score and store offline quiz submissions; None if the batch could not be stored"""
+        items, outcomes = self._parse(results, QuizSyncItem)
+        answer_keys = await supabase_service.get_quiz_answer_keys([item.quiz_id for _, item in items])
+        if answer_keys is None:
+            return self._failed()
+
+        rows = []
+        for index, item in items:
+            answer_key = answer_keys.get(item.quiz_id)
+            if answer_key is None or answer_key["user_id"] != user_id:
+                outcomes[index] = _invalid(item.client_id, "Quiz not found")
+                continue
+
+            total_questions = len(answer_key["answers"])
+            correct_answers = score_answers(answer_key, item.answers)
+            score = int((correct_answers / total_questions) * 100) if total_questions > 0 else 0
+            outcomes[index] = {
+                "client_id": item.client_id,
+                "score": score,
+                "correct_answers": correct_answers,
+                "total_questions": total_questions
+            }
+            rows.append((index, {
+                "user_id": user_id,
+                "topic": answer_key["topic"] or "Unknown",
+                "activity_type": "quiz",
+                "score": score,
+                "completed_at": _local_time(item.completed_at).isoformat(),
+                "client_id": item.client_id
+            }))
+        return await self._save(user_id, rows, outcomes)
+
+    async def sync_flashcards(self, user_id: str, results: List[Any]) -> Optional[List[Dict]]:
+        """Store offline flashcard sessions; None if the batch could not be stored"""
+        items, outcomes = self._parse(results, FlashcardSyncItem)
+        rows = []
+        for index, item in items:
+            outcomes[index] = {"client_id": item.client_id, "cards_reviewed": item.cards_reviewed}
+            rows.append((index, {
+                "user_id": user_id,
+                "topic": item.topic,
+                "activity_type": "flashcard",
+                "score": item.cards_reviewed,
+                "completed_at": _local_time(item.completed_at).isoformat(),
+                "client_id": item.client_id
+            }))
+        return await self._save(user_id, rows, outcomes)
+
+    def _parse(self, results: List[Any], model: Type[BaseModel]) -> Tuple[List[Tuple[int, BaseModel]], List[Optional[Dict]]]:
+        """Validate every result in one pass.
+
+        Returns the valid items with their positions, and an outcome list in
+        which rejected results are already filled in.
+        """
+        now = datetime.now()
+        items, outcomes, seen = [], [None] * len(results), set()
+        for index, result in enumerate(results):
+            try:
+                item = model.model_validate(result)
+            except ValidationError as e:
+                client_id = result.get("client_id") if isinstance(result, dict) else None
+                error = e.errors()[0]
+                field = ".".join(map(str, error["loc"]))
+                outcomes[index] = _invalid(client_id, f"{field}: {error['msg']}" if field else error["msg"])
+                continue
+
+            completed_at = _local_time(item.completed_at)
+            if completed_at > now + self.max_clock_skew:
+                outcomes[index] = _invalid(item.client_id, "completed_at is in the future")
+            elif completed_at < now - self.max_age:
+                outcomes[index] = _invalid(item.client_id, "completed_at is too old to sync")
+            elif item.client_id in seen:
+                outcomes[index] = {"client_id": item.client_id, "status": "duplicate"}
+            else:
+                seen.add(item.client_id)
+                items.append((index, item))
+        return items, outcomes
+
+    async def _save(self, user_id: str, rows: List[Tuple[int, Dict]], outcomes: List[Dict]) -> Optional[List[Dict]]:
+        """Store the rows in one request and finish their outcomes.
+
+        The unique (user_id, client_id) index makes the write idempotent across
+        workers and retries; rows it skips as already stored are duplicates.
+        """
+        if rows:
+            saved = await supabase_service.save_progress_bulk([row for _, row in rows])
+            if saved is None:
+                return self._failed()
+
+            saved_ids = {row["client_id"] for row in saved}
+            for index, row in rows:
+                outcomes[index]["status"] = "saved" if row["client_id"] in saved_ids else "duplicate"
+
+        self.stats["batches"] += 1
+        for outcome in outcomes:
+            self.stats[outcome["status"]] += 1
+        return outcomes
+
+    def _failed(self) -> None:
+        self.stats["failed_batches"] += 1
+        return None
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "max_batch": self.max_batch}
+
+def _invalid(client_id: Optional[str], error: str) -> Dict:
+    return {"client_id": client_id, "status": "invalid", "error": error}
+
+def _local_time(timestamp: datetime) -> datetime:
+    # Progress rows store naive local times, like datetime.now() in the live endpoints
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+progress_sync = ProgressSync()
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""Shared test fixtures.
+
+`api` runs the app in-process with the authenticated user overridden; those
+tests monkeypatch the service methods they depend on. `stack` starts the
+fakes in `fakes/` and the API itself as subprocesses on free ports once per
+session, as in benchmarks/loadtest.py. Tests that drive services in-process
+talk to the same fake servers, so the environment is set here, before any
+service module is imported.
+
+Run from eduassist/backend:
+
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+import uuid
+import socket
+import asyncio
+import subprocess
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+import httpx
+import pytest
+from jose import jwt
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.loadtest import JWT_SECRET, ANON_KEY
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+PORTS = {name: _free_port() for name in ("api", "supabase", "huggingface", "instasend")}
+URLS = {name: f"http://127.0.0.1:{port}" for name, port in PORTS.items()}
+
+os.environ.update({
+    "SUPABASE_URL": URLS["supabase"],
+    "SUPABASE_ANON_KEY": ANON_KEY,
+    "SUPABASE_JWT_SECRET": JWT_SECRET,
+    "HF_MODEL_URL": f"{URLS['huggingface']}/models/google/flan-t5-base",
+    "INSTASEND_BASE_URL": URLS["instasend"],
+    "PAYMENT_RECONCILE_ENABLED": "false",
+    "POOL_ENABLED": "false"
+})
+
+from fastapi.testclient import TestClient
+from main import app
+from dependencies import get_current_user
+from services.container import container
+
+class FakeDatabase:
+    """Direct access to the fake Supabase tables, bypassing the API"""
+
+    def __init__(self, http: httpx.Client, url: str):
+        self.http = http
+        self.url = url
+
+    def seed(self, table: str, rows: List[Dict]):
+        self.http.post(f"{self.url}/_control/seed/{table}", json=rows).raise_for_status()
+
+    def rows(self, table: str, **filters) -> List[Dict]:
+        params = {column: f"eq.{value}" for column, value in filters.items()}
+        response = self.http.get(f"{self.url}/rest/v1/{table}", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def update(self, table: str, values: Dict, **filters):
+        params = {column: f"eq.{value}" for column, value in filters.items()}
+        self.http.patch(f"{self.url}/rest/v1/{table}", params=params, json=values).raise_for_status()
+
+def _wait_ready(http: httpx.Client, urls: List[str], timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    for url in urls:
+        while True:
+            try:
+                if http.get(url).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server at {url} did not start")
+            time.sleep(0.1)
+
+@pytest.fixture
+def current_user():
+    return SimpleNamespace(id=str(uuid.uuid4()), email="student@example.com")
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Replace an async method with one that returns `value`, or raises it if it is an exception"""
+    def replace(target, name: str, value=None):
+        async def method(*args, **kwargs):
+            if isinstance(value, Exception):
+                raise value
+            return value
+        monkeypatch.setattr(target, name, method)
+    return replace
+
+@pytest.fixture
+def api(current_user):
+    """The app in-process, authenticated as `current_user`; pair with monkeypatched services"""
+    app.dependency_overrides[get_current_user] = lambda: current_user
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+@pytest.fixture(scope="session")
+def http():
+    with httpx.Client(timeout=60) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def stack(http):
+    processes = []
+    for name in ("supabase", "huggingface", "instasend"):
+        command = [sys.executable, "-m", f"fakes.{name}", "--port", str(PORTS[name])]
+        processes.append(subprocess.Popen(command, cwd=BACKEND_DIR))
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORTS["api"]), "--log-level", "warning"]
+    processes.append(subprocess.Popen(command, cwd=BACKEND_DIR, env=os.environ.copy()))
+
+    try:
+        _wait_ready(http, [f"{URLS['api']}/health"] + [
+            f"{URLS[name]}/_control/state" for name in ("supabase", "huggingface", "instasend")
+        ])
+        yield SimpleNamespace(**URLS)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+@pytest.fixture
+def db(stack, http):
+    return FakeDatabase(http, stack.supabase)
+
+@pytest.fixture
+def make_user(db):
+    """Seed a user and return its id and auth headers"""
+    def make(premium: bool = False):
+        user_id = str(uuid.uuid4())
+        now = int(time.time())
+        token = jwt.encode(
+            {"sub": user_id, "email": f"{user_id}@example.com", "aud": "authenticated", "role": "authenticated",
+             "iat": now, "exp": now + 3600},
+            JWT_SECRET, algorithm="HS256"
+        )
+        db.seed("users", [{"id": user_id, "email": f"{user_id}@example.com", "is_premium": premium}])
+        return SimpleNamespace(id=user_id, headers={"Authorization": f"Bearer {token}"})
+    return make
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+@pytest.fixture
+def faults(stack, http):
+    """Set latency or failures on a fake provider for the rest of the test"""
+    changed = set()
+
+    def configure(provider: str, **settings):
+        changed.add(provider)
+        http.put(f"{getattr(stack, provider)}/_control/faults", json=settings).raise_for_status()
+
+    yield configure
+    for provider in changed:
+        http.put(f"{getattr(stack, provider)}/_control/faults",
+                 json={"latency_ms": 0, "jitter_ms": 0, "error_rate": 0})
+
+@pytest.fixture
+def run(stack):
+    """Run a coroutine in-process against the fakes, closing the shared clients afterwards.
+
+    Clients bind to the event loop they were first used on, so each run gets fresh ones.
+    """
+    async def run_and_close(coro):
+        try:
+            return await coro
+        finally:
+            await container.close()
+
+    return lambda coro: asyncio.run(run_and_close(coro))
\ No newline at end of file
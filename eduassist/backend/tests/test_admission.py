@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from services.admission_service import AdmissionController, AdmissionRejected, AdmissionTooLarge, admission_controller
+from services.supabase_service import supabase_service
+
+def controller(max_items: int = 10, burst: float = 100) -> AdmissionController:
+    controller = AdmissionController()
+    controller.enabled = True
+    controller.max_items = max_items
+    controller.queue_timeout = 0.2
+    controller.tiers = {"free": (1, burst), "premium": (5, burst)}
+    return controller
+
+def test_requests_larger_than_the_budget_are_rejected():
+    admission = controller(max_items=10)
+
+    async def admit():
+        with pytest.raises(AdmissionTooLarge):
+            await admission.admit("user", 11)
+        async with await admission.admit("user", 10):
+            assert admission.in_flight == 10
+
+    asyncio.run(admit())
+    assert admission.in_flight == 0
+    assert admission.stats["too_large"] == 1
+    assert admission.stats["admitted"] == 1
+
+def test_rate_limited_users_are_told_when_to_retry():
+    admission = controller(burst=5)
+
+    async def admit():
+        (await admission.admit("user", 5)).release()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.admit("user", 3)
+        return rejected.value
+
+    rejected = asyncio.run(admit())
+    assert rejected.retry_after == 3
+    # Another user's bucket is untouched
+    asyncio.run(admission.admit("other", 5))
+
+def test_premium_waiters_are_admitted_first():
+    admission = controller(max_items=5)
+    order = []
+
+    async def wait(user_id: str, is_premium: bool):
+        async with await admission.admit(user_id, 5, is_premium):
+            order.append(user_id)
+
+    async def admit():
+        ticket = await admission.admit("first", 5)
+        waiters = [asyncio.create_task(wait("free", False)), asyncio.create_task(wait("premium", True))]
+        await asyncio.sleep(0.01)
+        ticket.release()
+        await asyncio.gather(*waiters)
+
+    asyncio.run(admit())
+    assert order == ["premium", "free"]
+
+def test_waiting_past_the_queue_timeout_sheds_the_request():
+    admission = controller(max_items=5)
+
+    async def admit():
+        ticket = await admission.admit("first", 5)
+        with pytest.raises(AdmissionRejected):
+            await admission.admit("second", 1)
+        ticket.release()
+
+    asyncio.run(admit())
+    assert admission.stats["shed_timeout"] == 1
+    assert admission.get_stats()["queue_depth"] == 0
+
+def test_generation_sizes_are_validated(api, stub):
+    stub(supabase_service, "get_user_profile", {"is_premium": True})
+    assert api.post("/quiz/generate", json={"topic": "Cells", "num_questions": 0}).status_code == 422
+    assert api.post("/quiz/generate", json={"topic": "Cells", "num_questions": 51}).status_code == 422
+    assert api.post("/flashcard/generate", json={"topic": "Cells", "num_cards": -1}).status_code == 422
+
+def test_oversized_generation_is_rejected_with_413(api, stub, monkeypatch):
+    stub(supabase_service, "get_user_profile", {"is_premium": True})
+    monkeypatch.setattr(admission_controller, "enabled", True)
+    monkeypatch.setattr(admission_controller, "max_items", 20)
+
+    response = api.post("/flashcard/generate", json={"topic": "Cells", "num_cards": 30})
+    assert response.status_code == 413
+    assert response.json()["detail"] == "At most 20 items can be generated per request"
\ No newline at end of file
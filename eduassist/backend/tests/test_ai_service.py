@@ -0,0 +1,81 @@
+import json
+import asyncio
+import httpx
+from services.ai_service import AIService
+from services.http_client import ResilientClient
+
+def model(handler) -> AIService:
+    """An AIService whose provider client answers with `handler` instead of the network"""
+    service = AIService()
+    service.http = ResilientClient("huggingface", "AI")
+    # Each failed call falls back at once instead of being retried
+    service.http.max_retries = 0
+    # Failed slots get the canned fallback unless a test turns the question bank top-up back on
+    service.bank_topup = False
+    service.http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service
+
+def test_items_are_generated_concurrently_up_to_the_limit():
+    running, peak = 0, 0
+
+    async def query_model(prompt, parameters):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "Question: ..."
+
+    service = AIService()
+    service.max_concurrency = 3
+    service._query_model = query_model
+    questions = asyncio.run(service.generate_quiz("Cells", 7))
+    assert len(questions) == 7
+    assert peak == 3
+    assert [question["question"].split(":")[0] for question in questions] == [f"Question {i}" for i in range(1, 8)]
+
+def test_failed_model_calls_fall_back_per_item():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) % 2:
+            return httpx.Response(503)
+        return httpx.Response(200, json=[{"generated_text": "Front: x Back: y"}])
+
+    service = model(handler)
+    cards = asyncio.run(service.generate_flashcards("Cells", 4))
+    asyncio.run(service.http.close())
+    assert len(calls) == 4
+    fallbacks = [card for card in cards if card["front"] == "What should you know about Cells?"]
+    assert len(fallbacks) == 2
+
+def test_transport_errors_do_not_fail_the_request():
+    def handler(request):
+        raise httpx.ConnectError("refused")
+
+    service = model(handler)
+    questions = asyncio.run(service.generate_quiz("Cells", 2))
+    assert [question["question"] for question in questions] == ["What is the most important aspect of Cells?"] * 2
+
+def test_prompts_are_split_by_count_and_size():
+    service = AIService()
+    service.batch_size, service.batch_max_chars = 3, 10
+    assert service._split_batches(["ab"] * 7) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert service._split_batches(["abcdef"] * 3) == [[0], [1], [2]]
+
+def test_batched_mode_maps_outputs_back_to_positions():
+    batches = []
+
+    def handler(request):
+        prompts = json.loads(request.content)["inputs"]
+        batches.append(len(prompts))
+        # A short and partly malformed batch: only the first output is usable
+        return httpx.Response(200, json=[[{"generated_text": "Front: x Back: y"}], "garbage"])
+
+    service = model(handler)
+    service.batch_mode, service.batch_size = True, 3
+    cards = asyncio.run(service.generate_flashcards("Cells", 5))
+    assert sorted(batches) == [2, 3]
+    fallback = "What should you know about Cells?"
+    assert [card["front"] == fallback for card in cards] == [False, True, True, False, True]
\ No newline at end of file
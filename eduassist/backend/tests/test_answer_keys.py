@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from services.answer_key_cache import AnswerKeyCache, extract_answer_key, score_answers
+from services.supabase_service import SupabaseService, SupabaseReadError, supabase_service
+from services.progress_writer import progress_writer
+
+QUIZ = {"user_id": "user-1", "topic": "Cells", "questions": [
+    {"question": "Q1", "options": ["A", "B"], "correct_answer": "A"},
+    {"question": "Q2", "options": ["A", "B"], "correct_answer": "B"},
+    {"question": "Q3", "options": ["A", "B"], "correct_answer": "A"}
+]}
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+@pytest.fixture
+def db(monkeypatch):
+    """A SupabaseService backed by one quizzes row, counting the queries it sends"""
+    service = SupabaseService()
+    service.calls = []
+
+    async def execute(operation, query):
+        service.calls.append(operation)
+        return Result([{**QUIZ, "id": "quiz-1"}])
+
+    monkeypatch.setattr(service, "_execute", execute)
+    yield service
+    service.close()
+
+def test_missing_and_extra_answers_count_as_wrong():
+    answer_key = extract_answer_key(QUIZ)
+    assert answer_key == {"user_id": "user-1", "topic": "Cells", "answers": ("A", "B", "A")}
+    assert score_answers(answer_key, ["A", "B", "A"]) == 3
+    assert score_answers(answer_key, ["A", "A"]) == 1
+    assert score_answers(answer_key, ["A", "B", "A", "A"]) == 3
+
+def test_the_least_recently_used_keys_are_evicted():
+    cache = AnswerKeyCache()
+    cache.max_entries = 2
+    cache.set("a", {"answers": ()})
+    cache.set("b", {"answers": ()})
+    cache.get("a")
+    cache.set("c", {"answers": ()})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+def test_saved_quizzes_are_scored_without_reading_them_back(db):
+    async def save_and_look_up():
+        await db.save_quiz(QUIZ)
+        return await db.get_quiz_answer_key("quiz-1")
+
+    assert asyncio.run(save_and_look_up())["answers"] == ("A", "B", "A")
+    assert db.calls == ["save_quiz"]
+
+def test_a_missed_key_is_read_once(db):
+    async def look_up_twice():
+        return await db.get_quiz_answer_key("quiz-1"), await db.get_quiz_answer_key("quiz-1")
+
+    first, second = asyncio.run(look_up_twice())
+    assert first == second
+    assert db.calls == ["get_quiz_answer_key"]
+
+def test_submissions_are_scored_against_the_owners_key(api, current_user, stub):
+    stub(progress_writer, "record", {"id": "progress-1"})
+    stub(supabase_service, "get_quiz_answer_key", {**extract_answer_key(QUIZ), "user_id": current_user.id})
+    response = api.post("/quiz/submit/quiz-1", json={"answers": ["A", "A", "A"]})
+    assert response.json()["correct_answers"] == 2
+    assert response.json()["score"] == 66
+
+    # Someone else's quiz is indistinguishable from a missing one
+    stub(supabase_service, "get_quiz_answer_key", extract_answer_key(QUIZ))
+    assert api.post("/quiz/submit/quiz-1", json={"answers": []}).status_code == 404
+
+def test_answer_key_read_failures_are_server_errors(api, stub):
+    stub(supabase_service, "get_quiz_answer_key", SupabaseReadError("get_quiz_answer_key timed out"))
+    assert api.post("/quiz/submit/quiz-1", json={"answers": []}).status_code == 500
\ No newline at end of file
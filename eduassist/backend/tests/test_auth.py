@@ -0,0 +1,64 @@
+import time
+import asyncio
+from jose import jwt
+from models.database import AuthUser
+from services.auth_service import TokenVerifier
+from benchmarks.loadtest import JWT_SECRET
+
+USER = AuthUser(id="user-1", email="user@example.com", role="authenticated", user_metadata={})
+
+def token(secret: str = JWT_SECRET, **claims) -> str:
+    return jwt.encode({"sub": "user-1", "aud": "authenticated", "email": "user@example.com", **claims}, secret, algorithm="HS256")
+
+def remote_verifier(monkeypatch, user=USER):
+    """A verifier with no local key, so every token is checked with the patched remote call"""
+    verifier = TokenVerifier()
+    verifier.jwt_secret = None
+    verifier.remote_fallback = True
+    calls = []
+
+    async def verify_remotely(token):
+        calls.append(token)
+        return user
+
+    monkeypatch.setattr(verifier, "_verify_remotely", verify_remotely)
+    return verifier, calls
+
+def test_valid_tokens_are_verified_locally_and_cached():
+    verifier = TokenVerifier()
+    access_token = token(exp=int(time.time()) + 600)
+    assert asyncio.run(verifier.verify(access_token)).id == "user-1"
+    assert asyncio.run(verifier.verify(access_token)).id == "user-1"
+    assert verifier.stats["local_verifications"] == 1
+    assert verifier.stats["cache_hits"] == 1
+
+def test_invalid_tokens_are_rejected():
+    verifier = TokenVerifier()
+    assert asyncio.run(verifier.verify(token(secret="wrong", exp=int(time.time()) + 600))) is None
+    assert asyncio.run(verifier.verify(token(exp=int(time.time()) - 10))) is None
+    assert asyncio.run(verifier.verify("not-a-token")) is None
+    assert verifier.stats["failures"] == 3
+
+def test_remote_verifications_are_cached_no_longer_than_the_token_lives(monkeypatch):
+    verifier, _ = remote_verifier(monkeypatch)
+    verifier.remote_cache_ttl = 600
+    expires = time.time() + 30
+    access_token = token(secret="remote-only", exp=expires)
+
+    assert asyncio.run(verifier.verify(access_token)) == USER
+    (_, cached_until), = verifier._cache.values()
+    assert cached_until == expires
+
+    verifier.remote_cache_ttl = 5
+    other_token = token(secret="remote-only", exp=expires, email="other@example.com")
+    before = time.time()
+    asyncio.run(verifier.verify(other_token))
+    assert before + 5 <= verifier._cache[list(verifier._cache)[-1]][1] < expires
+
+def test_remote_verifications_without_a_live_exp_are_not_cached(monkeypatch):
+    verifier, calls = remote_verifier(monkeypatch)
+    for access_token in [token(secret="remote-only"), token(secret="remote-only", exp=int(time.time()) - 10), "opaque"]:
+        assert asyncio.run(verifier.verify(access_token)) == USER
+        assert asyncio.run(verifier.verify(access_token)) == USER
+    assert len(calls) == 6
+    assert verifier._cache == {}
\ No newline at end of file
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from services.stats_service import apply_progress, build_stats, empty_stats, summarize_stats
+from services.supabase_service import SupabaseService, supabase_service
+
+USER_ID = "user-1"
+
+HISTORY = [
+    {"topic": "Algebra", "activity_type": "quiz", "score": 80, "completed_at": "2030-01-03T00:00:00"},
+    {"topic": "Algebra", "activity_type": "quiz", "score": 0, "completed_at": "2030-01-02T00:00:00"},
+    {"topic": "Cells", "activity_type": "flashcard", "score": 12, "completed_at": "2030-01-01T00:00:00"}
+]
+
+@pytest.fixture
+def db(monkeypatch):
+    """A SupabaseService whose saved stats records are kept in `db.saved`"""
+    service = SupabaseService()
+    service.saved = []
+
+    async def save_user_stats(stats):
+        service.saved.append(dict(stats))
+        return stats
+
+    monkeypatch.setattr(service, "save_user_stats", save_user_stats)
+    yield service
+    service.close()
+
+def test_incremental_stats_match_a_full_rebuild():
+    stats = empty_stats(USER_ID)
+    for progress in HISTORY:
+        apply_progress(stats, progress)
+    assert stats == build_stats(USER_ID, HISTORY)
+
+    summary = summarize_stats(stats)
+    assert summary["total_quizzes"] == 2
+    assert summary["total_flashcard_sessions"] == 1
+    # Empty scores are left out of the average
+    assert summary["average_quiz_score"] == 80
+    assert summary["topics_list"] == ["Algebra", "Cells"]
+
+def test_new_progress_is_folded_into_the_stored_record(db, stub):
+    stub(db, "_query_user_stats", build_stats(USER_ID, HISTORY[1:]))
+    stub(db, "get_user_progress", AssertionError("the history should not be read"))
+    asyncio.run(db._update_user_stats(USER_ID, HISTORY[:1]))
+    assert db.saved == [build_stats(USER_ID, HISTORY[1:] + HISTORY[:1])]
+
+def test_a_failed_read_skips_the_write_and_rebuilds_next_time(db, stub):
+    stub(db, "_query_user_stats", TimeoutError("get_user_stats timed out"))
+    asyncio.run(db._update_user_stats(USER_ID, HISTORY[:1]))
+    assert db.saved == [] and db.has_stale_stats(USER_ID)
+
+    # The stored record is not trusted again until it has been rebuilt from history
+    stub(db, "_query_user_stats", empty_stats(USER_ID))
+    stub(db, "get_user_progress", HISTORY)
+    asyncio.run(db._update_user_stats(USER_ID, HISTORY[:1]))
+    assert db.saved == [build_stats(USER_ID, HISTORY)]
+    assert not db.has_stale_stats(USER_ID)
+
+def test_rebuilt_stats_are_returned_even_if_saving_them_fails(db, stub):
+    stub(db, "get_user_progress", HISTORY)
+    stub(db, "save_user_stats", None)
+    assert asyncio.run(db.rebuild_user_stats(USER_ID)) == build_stats(USER_ID, HISTORY)
+    assert db.has_stale_stats(USER_ID)
+
+def test_rebuild_gives_up_if_the_history_cannot_be_read(db, stub):
+    stub(db, "get_user_progress", TimeoutError("get_user_progress timed out"))
+    assert asyncio.run(db.rebuild_user_stats(USER_ID)) is None
+    assert db.saved == []
+
+def test_dashboard_serves_stored_stats(api, current_user, stub):
+    stub(supabase_service, "get_user_stats", build_stats(current_user.id, HISTORY))
+    stub(supabase_service, "get_recent_progress", HISTORY)
+
+    dashboard = api.get("/progress/dashboard").json()["dashboard"]
+    assert dashboard["total_quizzes"] == 2
+    assert dashboard["topics_studied"] == 2
+    assert len(dashboard["recent_activity"]) == 3
+
+def test_dashboard_uses_rebuilt_stats_even_if_saving_them_fails(api, current_user, stub):
+    stub(supabase_service, "get_user_stats", None)
+    stub(supabase_service, "get_user_progress", HISTORY)
+    stub(supabase_service, "save_user_stats", None)
+    stub(supabase_service, "get_recent_progress", HISTORY)
+
+    response = api.get("/progress/dashboard")
+    assert response.status_code == 200
+    assert response.json()["dashboard"]["total_quizzes"] == 2
+    assert supabase_service.has_stale_stats(current_user.id)
+
+def test_dashboard_fails_rather_than_showing_empty_stats(api, stub):
+    stub(supabase_service, "get_user_stats", None)
+    stub(supabase_service, "get_user_progress", TimeoutError("get_user_progress timed out"))
+    stub(supabase_service, "get_recent_progress", [])
+
+    assert api.get("/progress/dashboard").status_code == 500
\ No newline at end of file
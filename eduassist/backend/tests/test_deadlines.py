@@ -0,0 +1,70 @@
+import time
+import uuid
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from services.ai_service import ai_service
+from services.generation_backend import GenerationBackend, register_backend
+
+class SlowBackend(GenerationBackend):
+    name = "slow"
+
+    async def stream(self, kind, topic, count):
+        for i in range(count):
+            await asyncio.sleep(0.2)
+            yield i, {"question": f"slow {i}"}
+
+register_backend(SlowBackend())
+
+def generate(http, stack, user, topic: str, budget=None) -> tuple:
+    payload = {"topic": topic, "num_questions": 3}
+    if budget is not None:
+        payload["time_budget"] = budget
+    start = time.perf_counter()
+    response = http.post(f"{stack.api}/quiz/generate", headers=user.headers, json=payload)
+    assert response.status_code == 200
+    degraded = [bool(question.get("degraded")) for question in response.json()["quiz"]["questions"]]
+    return time.perf_counter() - start, degraded
+
+def test_requested_budget_only_tightens_the_tier_budget():
+    assert ai_service.deadline_for(False, 1) - time.monotonic() <= 1
+    free = ai_service.time_budgets["free"]
+    assert ai_service.deadline_for(False, free + 100) - time.monotonic() <= free
+
+def test_slots_left_at_the_deadline_are_filled_locally(monkeypatch):
+    monkeypatch.setattr(ai_service, "backend_name", "slow")
+    start = time.perf_counter()
+    items = asyncio.run(ai_service.generate_quiz("Cells", 4, time.monotonic() + 0.5))
+    assert time.perf_counter() - start < 1
+    assert [bool(item.get("degraded")) for item in items] == [False, False, True, True]
+
+def test_degraded_results_are_not_cached(http, stack, user, faults):
+    topic = f"Deadline {uuid.uuid4().hex[:8]}"
+    faults("huggingface", latency_ms=1500)
+
+    elapsed, degraded = generate(http, stack, user, topic, budget=0.3)
+    assert elapsed < 1.5
+    assert all(degraded)
+
+    faults("huggingface", latency_ms=0)
+    _, degraded = generate(http, stack, user, topic)
+    assert not any(degraded)
+
+def test_followers_fall_back_on_their_own_budget(http, stack, make_user, faults):
+    topic = f"Coalesced {uuid.uuid4().hex[:8]}"
+    leader, follower = make_user(), make_user()
+    faults("huggingface", latency_ms=1500)
+    coalesced = http.get(f"{stack.api}/cache/stats").json()["singleflight"]["coalesced"]
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leading = pool.submit(generate, http, stack, leader, topic)
+        time.sleep(0.2)
+        following = pool.submit(generate, http, stack, follower, topic, 0.5)
+        leader_elapsed, leader_degraded = leading.result()
+        follower_elapsed, follower_degraded = following.result()
+
+    # The follower is served stand-ins when its budget runs out, without cutting the leader short
+    assert http.get(f"{stack.api}/cache/stats").json()["singleflight"]["coalesced"] == coalesced + 1
+    assert follower_elapsed < 1.5
+    assert all(follower_degraded)
+    assert leader_elapsed >= 1.5
+    assert not any(leader_degraded)
\ No newline at end of file
@@ -0,0 +1,98 @@
+import uuid
+from services.supabase_service import supabase_service
+
+def generate_set(http, stack, user, topic: str, num_cards: int = 25, budget=None) -> dict:
+    payload = {"topic": topic, "num_cards": num_cards}
+    if budget is not None:
+        payload["time_budget"] = budget
+    response = http.post(f"{stack.api}/flashcard/generate", headers=user.headers, json=payload)
+    assert response.status_code == 200
+    return response.json()["flashcard_set"]
+
+def get_set(http, stack, user, set_id: str, **params):
+    return http.get(f"{stack.api}/flashcard/sets/{set_id}", headers=user.headers, params=params)
+
+def test_set_list_pages_with_a_cursor(http, stack, db, make_user):
+    user = make_user(premium=True)
+    for topic in ("Cells", "Genetics", "Ecology"):
+        generate_set(http, stack, user, topic)
+    db.seed("flashcard_sets", [{"id": f"legacy-{user.id}", "user_id": user.id, "topic": "Old",
+                                "flashcards": [{"front": "f", "back": "b"}], "created_at": "2020-01-01T00:00:00"}])
+
+    first = http.get(f"{stack.api}/flashcard/sets", headers=user.headers, params={"limit": 2}).json()
+    assert [(s["topic"], s["card_count"]) for s in first["flashcard_sets"]] == [("Ecology", 25), ("Genetics", 25)]
+    assert first["has_more"] is True
+    assert "flashcards" not in first["flashcard_sets"][0]
+
+    rest = http.get(f"{stack.api}/flashcard/sets", headers=user.headers,
+                    params={"limit": 5, "cursor": first["next_cursor"]}).json()
+    assert [s["topic"] for s in rest["flashcard_sets"]] == ["Cells", "Old"]
+    assert rest["has_more"] is False
+
+    assert http.get(f"{stack.api}/flashcard/sets", headers=user.headers, params={"cursor": "zz"}).status_code == 400
+
+def test_set_cards_are_served_in_slices(http, stack, make_user):
+    user = make_user(premium=True)
+    flashcard_set = generate_set(http, stack, user, "Cells")
+
+    response = get_set(http, stack, user, flashcard_set["id"], offset=20, limit=10)
+    body = response.json()
+    assert body["flashcard_set"]["card_count"] == 25
+    assert [card["front"] for card in body["flashcards"]] == [card["front"] for card in flashcard_set["flashcards"][20:]]
+    assert body["has_more"] is False
+
+    body = get_set(http, stack, user, flashcard_set["id"], offset=0, limit=10).json()
+    assert len(body["flashcards"]) == 10
+    assert body["next_offset"] == 10
+
+    # Each slice has its own ETag
+    revalidate = {**user.headers, "If-None-Match": response.headers["etag"]}
+    url = f"{stack.api}/flashcard/sets/{flashcard_set['id']}"
+    assert http.get(url, headers=revalidate, params={"offset": 20, "limit": 10}).status_code == 304
+    assert http.get(url, headers=revalidate, params={"offset": 0, "limit": 10}).status_code == 200
+
+def test_legacy_sets_are_sliced_from_their_inline_cards(http, stack, db, user):
+    db.seed("flashcard_sets", [{"id": f"inline-{user.id}", "user_id": user.id, "topic": "Old",
+                                "flashcards": [{"front": f"f{i}", "back": "b"} for i in range(7)],
+                                "created_at": "2020-01-01T00:00:00"}])
+    body = get_set(http, stack, user, f"inline-{user.id}", offset=5).json()
+    assert body["flashcards"] == [{"front": "f5", "back": "b"}, {"front": "f6", "back": "b"}]
+    assert body["has_more"] is False
+
+def test_other_users_sets_are_not_found(http, stack, make_user):
+    owner, other = make_user(), make_user()
+    flashcard_set = generate_set(http, stack, owner, "Cells", num_cards=3)
+    assert get_set(http, stack, other, flashcard_set["id"]).status_code == 404
+    assert get_set(http, stack, owner, "missing").status_code == 404
+
+def test_lookup_failures_are_server_errors(http, stack, user, faults):
+    flashcard_set = generate_set(http, stack, user, "Cells", num_cards=3)
+    faults("supabase", error_rate=1.0)
+    assert get_set(http, stack, user, flashcard_set["id"]).status_code == 500
+
+def test_degraded_cards_stay_marked(http, stack, user, faults):
+    faults("huggingface", latency_ms=1500)
+    # A topic of its own, so the set is not served from the generation cache
+    flashcard_set = generate_set(http, stack, user, f"Cells {uuid.uuid4().hex[:8]}", num_cards=3, budget=0.2)
+    assert all(card.get("degraded") for card in flashcard_set["flashcards"])
+
+    stored = get_set(http, stack, user, flashcard_set["id"]).json()["flashcards"]
+    assert len(stored) == 3
+    assert all(card.get("degraded") is True for card in stored)
+
+def test_cards_of_an_unsaved_set_are_removed(db, user, run, monkeypatch):
+    execute = supabase_service._execute
+
+    async def set_insert_fails(operation, query):
+        if operation == "save_flashcard_set":
+            raise TimeoutError("save_flashcard_set timed out")
+        return await execute(operation, query)
+
+    monkeypatch.setattr(supabase_service, "_execute", set_insert_fails)
+    saved = run(supabase_service.save_flashcard_set({
+        "id": f"unsaved-{user.id}", "user_id": user.id, "topic": "Cells",
+        "flashcards": [{"front": "f", "back": "b"}] * 2
+    }))
+    assert saved is None
+    assert db.rows("flashcard_cards", set_id=f"unsaved-{user.id}") == []
+    assert db.rows("flashcard_sets", id=f"unsaved-{user.id}") == []
\ No newline at end of file
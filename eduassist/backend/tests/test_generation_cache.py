@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from services.cache_service import GenerationCache
+from services.supabase_service import supabase_service
+
+ITEMS = [{"question": "What is a cell?"}]
+
+@pytest.fixture
+def table(monkeypatch):
+    """The generation_cache table as a dict keyed by cache_key"""
+    rows = {}
+
+    async def get_cached_generation(cache_key):
+        return rows.get(cache_key)
+
+    async def save_cached_generation(row):
+        rows[row["cache_key"]] = row
+        return row
+
+    monkeypatch.setattr(supabase_service, "get_cached_generation", get_cached_generation)
+    monkeypatch.setattr(supabase_service, "save_cached_generation", save_cached_generation)
+    return rows
+
+def generator(calls: list):
+    async def generate(topic, count):
+        calls.append((topic, count))
+        return ITEMS * count
+    return generate
+
+def test_keys_ignore_topic_case_and_spacing():
+    cache = GenerationCache()
+    assert cache.make_key("quiz", "  Cell   Biology ", 5) == cache.make_key("quiz", "cell biology", 5)
+    assert cache.make_key("quiz", "cell biology", 5) != cache.make_key("quiz", "cell biology", 6)
+    assert cache.make_key("quiz", "cell biology", 5) != cache.make_key("flashcard", "cell biology", 5)
+    assert cache.make_key("quiz", "x", 5, {"temperature": 0.8}) != cache.make_key("quiz", "x", 5, {"temperature": 0.7})
+
+def test_generated_sets_are_reused(table):
+    cache, calls = GenerationCache(), []
+    for topic in ["Cells", "cells"]:
+        assert asyncio.run(cache.get_or_generate("quiz", topic, 2, generator(calls))) == ITEMS * 2
+    assert calls == [("Cells", 2)]
+    assert cache.stats["misses"] == 1 and cache.stats["memory_hits"] == 1
+    assert len(table) == 1
+
+def test_persistent_tier_fills_memory_on_another_instance(table):
+    asyncio.run(GenerationCache().get_or_generate("quiz", "Cells", 1, generator([])))
+
+    cache, calls = GenerationCache(), []
+    asyncio.run(cache.get_or_generate("quiz", "Cells", 1, generator(calls)))
+    asyncio.run(cache.get_or_generate("quiz", "Cells", 1, generator(calls)))
+    assert calls == []
+    assert cache.stats["persistent_hits"] == 1 and cache.stats["memory_hits"] == 1
+
+def test_fresh_requests_skip_the_lookup_but_refresh_the_cache(table):
+    cache, calls = GenerationCache(), []
+    asyncio.run(cache.get_or_generate("quiz", "Cells", 1, generator(calls)))
+    asyncio.run(cache.get_or_generate("quiz", "Cells", 1, generator(calls), fresh=True))
+    assert len(calls) == 2
+    assert cache.stats["bypasses"] == 1
+
+def test_expired_and_evicted_entries_are_regenerated(table, monkeypatch):
+    cache, calls = GenerationCache(), []
+    cache.persistent_enabled = False
+    cache.max_entries = 2
+    for topic in ["A", "B", "C"]:
+        asyncio.run(cache.get_or_generate("quiz", topic, 1, generator(calls)))
+    assert cache.stats["evictions"] == 1
+
+    cache.ttl_seconds = 0
+    asyncio.run(cache.get_or_generate("quiz", "D", 1, generator(calls)))
+    asyncio.run(cache.get_or_generate("quiz", "D", 1, generator(calls)))
+    assert cache.stats["expirations"] == 1
+    assert len(calls) == 5
+
+def test_expired_persistent_rows_are_misses(table):
+    cache = GenerationCache()
+    key = cache.make_key("quiz", "Cells", 1)
+    table[key] = {"cache_key": key, "items": ITEMS, "expires_at": "2000-01-01T00:00:00+00:00"}
+    calls = []
+    asyncio.run(cache.get_or_generate("quiz", "Cells", 1, generator(calls)))
+    assert calls == [("Cells", 1)]
+    assert cache.stats["persistent_hits"] == 0
+    # The regenerated set replaces the stale row
+    assert not table[key]["expires_at"].startswith("2000")
+def test_persistent_rows_with_stand_in_items_are_misses(table):
+    cache = GenerationCache()
+    key = cache.make_key("quiz", "Cells", 1)
+    table[key] = {"cache_key": key, "items": [{**ITEMS[0], "degraded": True}], "expires_at": "2999-01-01T00:00:00+00:00"}
+    calls = []
+    assert asyncio.run(cache.get_or_generate("quiz", "Cells", 1, generator(calls))) == ITEMS
+    assert calls == [("Cells", 1)]
+    assert cache.stats["degraded_skips"] == 1
\ No newline at end of file
@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from services.pagination import encode_cursor, decode_cursor
+from services.supabase_service import SupabaseService, supabase_service
+
+ROWS = [
+    {"id": f"row-{index}", "topic": "Algebra", "activity_type": "quiz", "score": 50,
+     "completed_at": f"2030-01-{10 - index:02d}T00:00:00"}
+    for index in range(5)
+]
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+@pytest.fixture
+def db(monkeypatch):
+    """A SupabaseService that records the params of each progress query instead of sending it"""
+    service = SupabaseService()
+    service.queries = []
+
+    async def execute(operation, query):
+        service.queries.append(query.params)
+        return Result([])
+
+    monkeypatch.setattr(service, "_execute", execute)
+    yield service
+    service.close()
+
+def test_history_is_ordered_by_completed_at_then_id(db):
+    asyncio.run(db.get_user_progress("user-1", limit=3))
+    params = db.queries[0]
+    assert params["user_id"] == "eq.user-1"
+    assert params["order"] == "completed_at.desc,id.desc"
+    assert params["limit"] == "3"
+    assert params["select"] == "*"
+
+def test_cursor_and_filters_are_pushed_into_the_query(db):
+    asyncio.run(db.get_user_progress(
+        "user-1", columns=["score", "completed_at", "id"], topic="Algebra", activity_type="quiz",
+        since="2030-01-01T00:00:00+00:00", until="2030-02-01T00:00:00",
+        after=("2030-01-10T00:00:00", "row-1")
+    ))
+    params = db.queries[0]
+    assert params["select"] == "score,completed_at,id"
+    assert params["topic"] == "eq.Algebra" and params["activity_type"] == "eq.quiz"
+    assert params.get_list("completed_at") == ["gte.2030-01-01T00:00:00+00:00", "lt.2030-02-01T00:00:00"]
+    # Rows strictly before the cursor's (completed_at, id)
+    assert params["or"] == '(completed_at.lt."2030-01-10T00:00:00",and(completed_at.eq."2030-01-10T00:00:00",id.lt."row-1"))'
+
+def test_read_failures_raise_instead_of_looking_like_an_empty_history(db, monkeypatch):
+    async def execute(operation, query):
+        raise TimeoutError(f"{operation} timed out")
+
+    monkeypatch.setattr(db, "_execute", execute)
+    with pytest.raises(TimeoutError):
+        asyncio.run(db.get_user_progress("user-1", limit=3))
+
+@pytest.fixture
+def queries(monkeypatch):
+    """Serve ROWS from get_user_progress, recording each call's keyword arguments"""
+    calls = []
+
+    async def get_user_progress(user_id, **kwargs):
+        calls.append(kwargs)
+        return ROWS[:kwargs["limit"]]
+
+    monkeypatch.setattr(supabase_service, "get_user_progress", get_user_progress)
+    return calls
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(ROWS[2], "completed_at")
+    assert decode_cursor(cursor) == (ROWS[2]["completed_at"], "row-2")
+    with pytest.raises(HTTPException):
+        decode_cursor("not-a-cursor")
+
+def test_history_pages_with_a_cursor(api, queries):
+    body = api.get("/progress/history", params={"limit": 2}).json()
+    assert [row["id"] for row in body["history"]] == ["row-0", "row-1"]
+    assert body["has_more"] is True
+    # One extra row is fetched to know whether another page exists
+    assert queries[0]["limit"] == 3
+
+    api.get("/progress/history", params={"limit": 2, "cursor": body["next_cursor"]})
+    assert queries[1]["after"] == (ROWS[1]["completed_at"], "row-1")
+
+def test_history_filters_are_passed_as_timestamps(api, queries):
+    response = api.get("/progress/history", params={
+        "since": "2030-01-01T00:00:00Z", "until": "2030-02-01T12:00:00", "fields": "score"
+    })
+    assert response.status_code == 200
+    assert queries[0]["since"] == "2030-01-01T00:00:00+00:00"
+    assert queries[0]["until"] == "2030-02-01T12:00:00"
+    assert set(queries[0]["columns"]) == {"score", "completed_at", "id"}
+
+def test_invalid_history_parameters_are_rejected(api, queries):
+    assert api.get("/progress/history", params={"since": "yesterday"}).status_code == 422
+    assert api.get("/progress/history", params={"until": "2030-13-01"}).status_code == 422
+    assert api.get("/progress/history", params={"fields": "password"}).status_code == 400
+    assert api.get("/progress/history", params={"cursor": "zz"}).status_code == 400
+    assert queries == []
+
+def test_history_read_failures_are_server_errors(api, stub):
+    stub(supabase_service, "get_user_progress", TimeoutError("get_user_progress timed out"))
+    assert api.get("/progress/history").status_code == 500
\ No newline at end of file
@@ -0,0 +1,127 @@
+import time
+import asyncio
+import httpx
+from services.container import container
+from services.http_client import CircuitBreaker, CircuitOpenError, ResilientClient, get_client
+
+def tripped(reset_timeout: float = 0.05) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+def test_breaker_opens_after_repeated_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.is_open()
+    assert not breaker.allow_request()
+    assert breaker.trips == 1
+
+def test_half_open_breaker_allows_a_single_trial():
+    breaker = tripped()
+    time.sleep(0.06)
+    assert not breaker.is_open()
+    assert breaker.allow_request()
+    # Everyone else fails fast while the trial is out
+    assert breaker.is_open()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow_request() and breaker.allow_request()
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = tripped()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+    assert breaker.trips == 2
+
+def test_abandoned_trial_is_replaced_after_the_reset_timeout():
+    breaker = tripped()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    time.sleep(0.06)
+    # The first trial never reported back
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+def test_concurrent_requests_send_one_trial_to_a_recovering_provider():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200)
+
+    async def probe():
+        client = ResilientClient("test", "TEST_PROVIDER")
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client.breaker = tripped()
+        await asyncio.sleep(0.06)
+        results = await asyncio.gather(
+            *(client.request("GET", "http://provider/items") for _ in range(5)), return_exceptions=True
+        )
+        await client._client.aclose()
+        return client, results
+
+    client, results = asyncio.run(probe())
+    assert calls == ["/items"]
+    assert sum(isinstance(result, httpx.Response) for result in results) == 1
+    assert sum(isinstance(result, CircuitOpenError) for result in results) == 4
+    assert client.stats["short_circuited"] == 4
+    assert client.breaker.state == "closed"
+
+def provider(handler) -> ResilientClient:
+    client = ResilientClient("test", "TEST_PROVIDER")
+    client.backoff_base = 0
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+def test_transient_failures_are_retried():
+    statuses = [503, 502, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0))
+
+    async def send():
+        client = provider(handler)
+        response = await client.get("http://provider/items")
+        await client.close()
+        return client, response
+
+    client, response = asyncio.run(send())
+    assert response.status_code == 200
+    assert client.stats["retries"] == 2 and client.stats["failures"] == 0
+    assert client.breaker.state == "closed"
+
+def test_non_idempotent_requests_are_not_resent_after_a_response():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(503)
+
+    async def send():
+        client = provider(handler)
+        response = await client.post("http://provider/charges", idempotent=False)
+        await client.close()
+        return client, response
+
+    client, response = asyncio.run(send())
+    assert response.status_code == 503
+    assert calls == ["POST"]
+    assert client.stats["failures"] == 1 and client.breaker.failures == 1
+
+def test_provider_clients_are_created_on_first_use():
+    client = get_client("lazy-test", "LAZY_TEST")
+    assert get_client("lazy-test", "LAZY_TEST") is client
+    assert "lazy-test" not in container.created()
+
+    assert client.is_open() is False
+    assert isinstance(container.created()["lazy-test"], ResilientClient)
+    assert client.get_stats()["requests"] == 0
\ No newline at end of file
@@ -0,0 +1,63 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from services.http_response import CompressionMiddleware, conditional_json, parse_accept_encoding
+
+LARGE = {"items": ["photosynthesis"] * 200}
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware)
+
+@app.get("/large")
+async def large():
+    return LARGE
+
+@app.get("/small")
+async def small():
+    return JSONResponse({"ok": True}, headers={"Vary": "Origin"})
+
+@app.get("/stream")
+async def stream():
+    return StreamingResponse(iter([b'{"a": 1}\n'] * 200), media_type="application/x-ndjson")
+
+@app.get("/conditional")
+async def conditional(request: Request):
+    return conditional_json(request, LARGE)
+
+client = TestClient(app)
+
+def test_accept_encoding_q_values():
+    assert parse_accept_encoding("gzip;q=0.5, br, identity;q=0, x;q=bad") == {
+        "gzip": 0.5, "br": 1.0, "identity": 0.0, "x": 0.0
+    }
+    assert parse_accept_encoding("") == {}
+
+def test_large_bodies_are_compressed_for_clients_that_accept_it():
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == LARGE
+
+def test_uncompressed_responses_still_vary_on_accept_encoding():
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    # Too small to compress, with the route's own Vary kept
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Origin, Accept-Encoding"
+
+def test_streams_pass_through_untouched():
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+    assert len(response.content.splitlines()) == 200
+
+def test_conditional_json_answers_304_for_a_matching_etag():
+    response = client.get("/conditional", headers={"Accept-Encoding": "identity"})
+    etag = response.headers["etag"]
+    assert client.get("/conditional", headers={"If-None-Match": etag}).status_code == 304
+    # Weak and strong forms of the same tag match
+    assert client.get("/conditional", headers={"If-None-Match": etag.removeprefix("W/")}).status_code == 304
+    assert client.get("/conditional", headers={"If-None-Match": '"other"'}).status_code == 200
\ No newline at end of file
@@ -0,0 +1,38 @@
+from services.metrics import MetricsRegistry, record_generation_item, metrics
+from services.supabase_service import supabase_service
+
+def test_histograms_render_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        latency.observe(value, route="/quiz/generate")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{route="/quiz/generate",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/quiz/generate",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/quiz/generate",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/quiz/generate"} 3' in lines
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("errors_total", "Errors").inc(operation='say "hi"\n')
+    assert 'errors_total{operation="say \\"hi\\"\\n"} 1' in registry.render()
+
+def test_fallback_ratio_is_tracked_per_kind():
+    for source in ("model", "model", "question_bank", "fallback"):
+        record_generation_item("metrics-test", source)
+    text = metrics.render()
+    assert 'generation_items_total{kind="metrics-test",source="question_bank"} 1' in text
+    assert 'generation_items_total{kind="metrics-test",source="fallback"} 1' in text
+    assert 'generation_fallback_ratio{kind="metrics-test"} 0.25' in text
+
+def test_routes_are_labelled_by_template(api, stub):
+    stub(supabase_service, "get_payment", None)
+    api.get("/payment/status/TX-METRICS-1")
+    api.get("/no/such/route")
+
+    text = api.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/payment/status/{transaction_id}",status="404"}' in text
+    assert 'route="/no/such/route"' not in text
+    assert 'route="unmatched"' in text
\ No newline at end of file
@@ -0,0 +1,161 @@
+import asyncio
+import pytest
+from services.payment_reconciler import PaymentReconciler
+from services.payment_service import payment_service
+from services.supabase_service import supabase_service, SupabaseReadError
+
+PAYMENT = {"amount": 500, "phone_number": "254700000000", "email": "user@example.com"}
+
+def initiate(http, stack, user) -> str:
+    response = http.post(f"{stack.api}/payment/initiate", headers=user.headers, json=PAYMENT)
+    assert response.status_code == 200
+    return response.json()["payment_data"]["id"]
+
+def settle(http, stack, transaction_id: str, state: str = "COMPLETE"):
+    http.post(f"{stack.instasend}/_control/invoices/{transaction_id}/settle", params={"state": state}).raise_for_status()
+
+class Payments:
+    """The payments and users tables, and the states InstaSend reports, for the reconciler's queries"""
+
+    def __init__(self):
+        self.rows = {}
+        self.premium = set()
+        self.instasend = {}
+        self.upgrade_fails = False
+
+    def add(self, transaction_id: str, status: str = "pending", created_at: str = "2999-01-01T00:00:00"):
+        self.rows[transaction_id] = {"user_id": "user-1", "status": status, "created_at": created_at,
+                                     "instasend_transaction_id": transaction_id}
+
+    async def get_payment(self, transaction_id):
+        row = self.rows.get(transaction_id)
+        return dict(row) if row else None
+
+    async def transition_payment_status(self, transaction_id, from_status, to_status):
+        row = self.rows.get(transaction_id)
+        if row is None or row["status"] != from_status:
+            return None
+        row["status"] = to_status
+        return dict(row)
+
+    async def update_user_premium(self, user_id, is_premium):
+        if self.upgrade_fails:
+            return None
+        self.premium.add(user_id)
+        return {"id": user_id, "is_premium": is_premium}
+
+    async def expire_pending_payments(self, created_before):
+        expired = [row for row in self.rows.values() if row["status"] == "pending" and row["created_at"] < created_before]
+        for row in expired:
+            row["status"] = "expired"
+        return expired
+
+    async def get_pending_payments(self, limit=100):
+        return [dict(row) for row in self.rows.values() if row["status"] == "pending"][:limit]
+
+    async def check_payment_status(self, transaction_id):
+        self.instasend.setdefault("checked", []).append(transaction_id)
+        return {"success": True, "data": {"invoice": {"state": self.instasend.get(transaction_id, "PENDING")}}}
+
+@pytest.fixture
+def payments(monkeypatch):
+    fake = Payments()
+    for name in ["get_payment", "transition_payment_status", "update_user_premium",
+                 "expire_pending_payments", "get_pending_payments"]:
+        monkeypatch.setattr(supabase_service, name, getattr(fake, name))
+    monkeypatch.setattr(payment_service, "check_payment_status", fake.check_payment_status)
+    return fake
+
+def test_completed_payment_upgrades_the_payer_once(payments):
+    payments.add("TX1")
+    reconciler = PaymentReconciler()
+
+    async def settle_twice():
+        return await reconciler.apply_status("TX1", "completed"), await reconciler.apply_status("TX1", "completed")
+
+    first, second = asyncio.run(settle_twice())
+    assert first == {"status": "completed", "changed": True}
+    assert second == {"status": "completed", "changed": False}
+    assert payments.premium == {"user-1"}
+    assert reconciler.stats["completed"] == 1 and reconciler.stats["duplicates"] == 1
+
+def test_failed_upgrade_leaves_the_payment_open(payments):
+    payments.add("TX1")
+    payments.upgrade_fails = True
+    reconciler = PaymentReconciler()
+    assert asyncio.run(reconciler.apply_status("TX1", "completed")) == {"status": "pending", "changed": False}
+    assert reconciler.stats["upgrade_errors"] == 1
+    assert payments.rows["TX1"]["status"] == "pending"
+
+    # The next attempt upgrades the user and only then settles the payment
+    payments.upgrade_fails = False
+    assert asyncio.run(reconciler.apply_status("TX1", "completed")) == {"status": "completed", "changed": True}
+    assert payments.premium == {"user-1"}
+
+def test_the_sweep_settles_pending_payments_with_instasend_state(payments):
+    payments.add("TX1")
+    payments.add("TX2")
+    payments.add("TX3", status="completed")
+    payments.instasend.update({"TX1": "COMPLETE", "TX2": "FAILED"})
+    reconciler = PaymentReconciler()
+    assert asyncio.run(reconciler.reconcile_pending()) == 2
+    assert payments.rows["TX1"]["status"] == "completed"
+    assert payments.rows["TX2"]["status"] == "failed"
+    assert sorted(payments.instasend["checked"]) == ["TX1", "TX2"]
+
+def test_stale_pending_payments_expire_but_can_still_settle(payments):
+    payments.add("TX1", created_at="2000-01-01T00:00:00")
+    reconciler = PaymentReconciler()
+    assert asyncio.run(reconciler.reconcile_pending()) == 0
+    assert reconciler.stats["expired"] == 1
+    assert payments.rows["TX1"]["status"] == "expired"
+
+    # A late confirmation from InstaSend still settles it
+    payments.instasend["TX1"] = "COMPLETE"
+    outcome = asyncio.run(reconciler.check_and_apply("TX1"))
+    assert outcome["status"] == "completed" and outcome["changed"] is True
+    assert payments.premium == {"user-1"}
+
+def test_status_is_only_visible_to_the_payer(http, stack, make_user):
+    payer, other = make_user(), make_user()
+    transaction_id = initiate(http, stack, payer)
+
+    assert http.get(f"{stack.api}/payment/status/{transaction_id}", headers=other.headers).status_code == 404
+    assert http.get(f"{stack.api}/payment/status/UNKNOWN", headers=payer.headers).status_code == 404
+
+    response = http.get(f"{stack.api}/payment/status/{transaction_id}", headers=payer.headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+
+def test_webhooks_settle_payments_end_to_end(http, stack, db, user):
+    transaction_id = initiate(http, stack, user)
+    settle(http, stack, transaction_id)
+
+    response = http.get(f"{stack.api}/payment/status/{transaction_id}", headers=user.headers)
+    assert response.json()["status"] == "completed"
+    assert db.rows("users", id=user.id)[0]["is_premium"] is True
+    assert db.rows("payments", instasend_transaction_id=transaction_id)[0]["status"] == "completed"
+
+    # A redelivered webhook for a settled payment does no further work
+    response = http.post(f"{stack.api}/payment/webhook", json={"invoice_id": transaction_id})
+    assert response.json() == {"success": True, "status": "completed", "processed": False}
+
+def test_payment_read_failures_are_server_errors(api, stub):
+    stub(supabase_service, "get_payment", SupabaseReadError("get_payment timed out"))
+    assert api.get("/payment/status/TX1").status_code == 500
+    # InstaSend retries a webhook that was not acknowledged
+    assert api.post("/payment/webhook", json={"invoice_id": "TX1"}).status_code == 500
+
+def test_unknown_payments_are_not_found(api, current_user, stub):
+    stub(supabase_service, "get_payment", None)
+    assert api.get("/payment/status/TX1").status_code == 404
+
+    stub(supabase_service, "get_payment", {"user_id": "someone-else", "status": "completed"})
+    assert api.get("/payment/status/TX1").status_code == 404
+
+    stub(supabase_service, "get_payment", {"user_id": current_user.id, "status": "completed"})
+    assert api.get("/payment/status/TX1").json()["status"] == "completed"
+def test_plans_can_be_revalidated(api):
+    response = api.get("/payment/plans")
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    assert api.get("/payment/plans", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
\ No newline at end of file
@@ -0,0 +1,61 @@
+import asyncio
+from services.ai_service import ai_service
+from services.pregeneration_service import PregenerationPool
+
+def pool(**settings) -> PregenerationPool:
+    pool = PregenerationPool()
+    pool.enabled = True
+    pool.depth, pool.batch_size, pool.min_requests = 6, 4, 3
+    for name, value in settings.items():
+        setattr(pool, name, value)
+    return pool
+
+def test_pool_is_off_by_default():
+    disabled = PregenerationPool()
+    assert disabled.enabled is False
+    assert disabled.take("quiz", "Cells", 1) is None
+    assert asyncio.run(disabled.start()) is None and disabled._tasks == []
+
+def test_only_topics_with_real_demand_are_hot():
+    trending = pool()
+    for _ in range(3):
+        trending.record_request("quiz", " Cells ")
+    trending.record_request("quiz", "Rare topic")
+    assert trending._hottest() == [("quiz", "cells")]
+
+def test_refill_tops_the_pool_up_in_batches(monkeypatch):
+    counts = []
+
+    async def generate_quiz(topic, count):
+        counts.append(count)
+        return [{"question": f"{topic} {len(counts)}.{i}"} for i in range(count)]
+
+    monkeypatch.setattr(ai_service, "generate_quiz", generate_quiz)
+    trending = pool()
+    trending.record_request("quiz", "Cells")
+    asyncio.run(trending._refill(("quiz", "cells")))
+    assert counts == [4, 2]
+
+    assert trending.take("quiz", "CELLS", 7) is None
+    assert len(trending.take("quiz", "cells", 5)) == 5
+    assert trending.stats["hits"] == 1 and trending.stats["misses"] == 1
+
+def test_workers_refill_hot_topics_in_the_background(monkeypatch):
+    async def generate_flashcards(topic, count):
+        return [{"front": topic, "back": "..."}] * count
+
+    monkeypatch.setattr(ai_service, "generate_flashcards", generate_flashcards)
+    trending = pool(refill_interval=0.01, min_requests=1)
+    trending.record_request("flashcard", "Cells")
+
+    async def run():
+        await trending.start()
+        await asyncio.sleep(0.05)
+        status = trending.get_status()
+        await trending.stop()
+        return status
+
+    status = asyncio.run(run())
+    assert status["running"] is True
+    assert status["pools"] == [{"kind": "flashcard", "topic": "Cells", "ready": 6, "depth": 6, "requests": 1, "hot": True}]
+    assert trending._tasks == []
\ No newline at end of file
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from services.profile_cache import ProfileCache
+from services.supabase_service import SupabaseService
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+@pytest.fixture
+def db(monkeypatch):
+    """A SupabaseService backed by one users row, counting the queries it sends"""
+    service = SupabaseService()
+    service.row = {"id": "user-1", "email": "a@example.com", "is_premium": False}
+    service.calls = []
+
+    async def execute(operation, query):
+        service.calls.append(operation)
+        if isinstance(service.row, Exception):
+            raise service.row
+        if operation == "update_user_premium":
+            service.row = {**service.row, "is_premium": True}
+        return Result([dict(service.row)])
+
+    monkeypatch.setattr(service, "_execute", execute)
+    yield service
+    service.close()
+
+def test_entries_expire_and_the_oldest_are_evicted():
+    cache = ProfileCache()
+    cache.max_entries = 2
+    for user_id in ["a", "b", "c"]:
+        cache.set(user_id, {"id": user_id})
+    assert cache.get("a") is None
+    assert cache.get("c") == {"id": "c"}
+    assert cache.stats["evictions"] == 1
+
+    cache.ttl_seconds = 0
+    cache.set("d", {"id": "d"})
+    assert cache.get("d") is None
+
+def test_cached_profiles_are_copies():
+    cache = ProfileCache()
+    profile = {"id": "a", "is_premium": False}
+    cache.set("a", profile)
+    profile["is_premium"] = True
+    cache.get("a")["is_premium"] = True
+    assert cache.get("a")["is_premium"] is False
+
+def test_profiles_are_read_once_per_ttl(db):
+    async def read_twice():
+        return await db.get_user_profile("user-1"), await db.get_user_profile("user-1")
+
+    first, second = asyncio.run(read_twice())
+    assert first == second
+    assert db.calls == ["get_user_profile"]
+    assert db.profile_cache.get_stats()["hit_rate"] == 0.5
+
+def test_premium_updates_write_through(db):
+    async def upgrade():
+        await db.get_user_profile("user-1")
+        await db.update_user_premium("user-1", True)
+        return await db.get_user_profile("user-1")
+
+    assert asyncio.run(upgrade())["is_premium"] is True
+    assert db.calls == ["get_user_profile", "update_user_premium"]
+
+def test_a_failed_update_drops_the_cached_profile(db):
+    async def upgrade():
+        await db.get_user_profile("user-1")
+        db.row = TimeoutError("update_user_premium timed out")
+        await db.update_user_premium("user-1", True)
+
+    asyncio.run(upgrade())
+    assert db.profile_cache.get("user-1") is None
\ No newline at end of file
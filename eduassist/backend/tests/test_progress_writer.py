@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from services.progress_writer import ProgressWriter
+from services.supabase_service import supabase_service
+
+def make_writer() -> ProgressWriter:
+    writer = ProgressWriter()
+    writer.write_behind = True
+    writer.flush_interval = 60
+    return writer
+
+def event(user_id: str, day: int) -> dict:
+    return {"user_id": user_id, "topic": "Cells", "activity_type": "quiz", "score": 80,
+            "completed_at": f"2030-01-{day:02d}T00:00:00"}
+
+@pytest.fixture
+def progress(monkeypatch):
+    """The progress table, upserted on (user_id, client_id) with duplicates ignored"""
+    rows = {}
+
+    async def save_progress_bulk(batch):
+        saved = [row for row in batch if (row["user_id"], row["client_id"]) not in rows]
+        for row in saved:
+            rows[(row["user_id"], row["client_id"])] = row
+        return saved
+
+    monkeypatch.setattr(supabase_service, "save_progress_bulk", save_progress_bulk)
+    return rows
+
+def test_events_are_written_through_by_default(stub):
+    stub(supabase_service, "save_progress", {"id": "progress-1"})
+    writer = ProgressWriter()
+    assert writer.write_behind is False
+    assert asyncio.run(writer.record(event("user-1", 1))) == {"id": "progress-1"}
+    assert writer.stats["queued"] == 0
+
+def test_buffered_events_get_idempotency_keys(progress):
+    writer = make_writer()
+
+    async def record():
+        await writer.start()
+        pending = await writer.record({**event("user-1", 1), "client_id": "kept"})
+        await writer.record(event("user-1", 2))
+        buffered = [row["client_id"] for row in writer.pending_for("user-1")]
+        await writer.stop()
+        return pending, buffered
+
+    pending, buffered = asyncio.run(record())
+    assert pending["pending"] is True
+    # Newest first, and a client_id supplied by the caller is kept
+    assert len(buffered) == 2 and buffered[1] == "kept"
+    assert writer.stats["flushed"] == 2 and writer.pending_for("user-1") == []
+    assert len(progress) == 2
+
+def test_a_full_buffer_is_flushed_without_waiting_for_the_interval(progress):
+    writer = make_writer()
+    writer.flush_size = 2
+
+    async def record():
+        await writer.start()
+        for day in (1, 2):
+            await writer.record(event("user-1", day))
+        await asyncio.sleep(0.01)
+        stored = len(progress)
+        await writer.stop()
+        return stored
+
+    assert asyncio.run(record()) == 2
+    assert writer.stats["batches"] == 1
+
+def test_retrying_a_batch_that_landed_does_not_store_it_twice(progress, monkeypatch):
+    writer = make_writer()
+    save_progress_bulk = supabase_service.save_progress_bulk
+    calls = []
+
+    async def response_lost_once(rows):
+        calls.append(len(rows))
+        saved = await save_progress_bulk(rows)
+        # The first insert lands, but the writer only sees a failure
+        return None if len(calls) == 1 else saved
+
+    monkeypatch.setattr(supabase_service, "save_progress_bulk", response_lost_once)
+
+    async def record():
+        await writer.start()
+        for day in (1, 2, 3):
+            await writer.record(event("user-1", day))
+        await writer.stop()
+
+    asyncio.run(record())
+    assert calls == [3, 3]
+    assert writer.stats["retries"] == 1
+    assert writer.stats["dropped"] == 0
+    assert len(progress) == 3
+
+def test_batches_written_twice_are_stored_once(db, user, run):
+    batch = [{**event(user.id, day), "client_id": f"{user.id}-{day}"} for day in (1, 2)]
+
+    async def write_twice():
+        first = await supabase_service.save_progress_bulk(batch)
+        second = await supabase_service.save_progress_bulk(batch)
+        return first, second
+
+    first, second = run(write_twice())
+    assert len(first) == 2 and second == []
+    assert len(db.rows("progress", user_id=user.id)) == 2
+    assert db.rows("user_stats", user_id=user.id)[0]["total_quizzes"] == 2
\ No newline at end of file
@@ -0,0 +1,68 @@
+import json
+import asyncio
+import httpx
+import pytest
+from services.ai_service import AIService
+from services.generation_backend import get_backend, list_backends
+from services.http_client import ResilientClient
+from services.question_bank import QuestionBank, tokenize
+
+def question(topic: str, text: str, tags=()) -> dict:
+    return {"topic": topic, "tags": list(tags), "question": text, "options": ["A", "B"],
+            "correct_answer": 0, "explanation": ""}
+
+@pytest.fixture
+def bank(tmp_path):
+    corpus = {"questions": [
+        question("Cell biology", "What does the nucleus of a cell hold?", tags=["organelles"]),
+        question("Cell biology", "What does the nucleus of a cell hold?"),
+        question("Cell biology", "Which organelle releases energy?", tags=["organelles"]),
+        question("Chemistry basics", "Which particle in an atom has no charge?"),
+        question("Algebra", "Solve 2x = 4; which cell of the table holds x?")
+    ], "flashcards": []}
+    path = tmp_path / "bank.json"
+    path.write_text(json.dumps(corpus))
+    return QuestionBank(path)
+
+def test_keywords_drop_stopwords_and_plurals():
+    assert tokenize("The structure of Cells and glass") == ["structure", "cell", "glass"]
+
+def test_topic_matches_rank_first_and_duplicates_are_served_once(bank):
+    results = bank.search("quiz", "cells", 5)
+    assert [item["question"] for item in results] == [
+        "What does the nucleus of a cell hold?", "Which organelle releases energy?"
+    ]
+    # Only the fields clients need are served
+    assert set(results[0]) == {"question", "options", "correct_answer", "explanation"}
+
+def test_unrelated_topics_find_nothing(bank):
+    assert bank.search("quiz", "Medieval poetry", 5) == []
+    assert bank.search("flashcard", "cells", 5) == []
+
+def test_a_missing_corpus_loads_empty(tmp_path):
+    assert QuestionBank(tmp_path / "missing.json").search("quiz", "cells", 5) == []
+
+def test_backends_are_registered_by_name():
+    assert set(list_backends()) >= {"model", "question_bank"}
+    with pytest.raises(ValueError):
+        get_backend("no-such-backend")
+
+def test_the_bank_backend_falls_back_for_slots_it_cannot_fill():
+    service = AIService()
+    service.backend_name = "question_bank"
+    questions = asyncio.run(service.generate_quiz("Photosynthesis", 8))
+    canned = [question for question in questions if question["question"] == "What is the most important aspect of Photosynthesis?"]
+    assert len(questions) == 8
+    assert 0 < len(canned) < 8
+
+def test_failed_model_slots_are_topped_up_from_the_bank():
+    def handler(request):
+        raise httpx.ConnectError("refused")
+
+    service = AIService()
+    service.http = ResilientClient("huggingface", "AI")
+    service.http.max_retries = 0
+    service.http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    cards = asyncio.run(service.generate_flashcards("Photosynthesis", 2))
+    assert all(card["front"] != "What should you know about Photosynthesis?" for card in cards)
+    assert len({card["front"] for card in cards}) == 2
\ No newline at end of file
@@ -0,0 +1,171 @@
+import asyncio
+from services.review_scheduler import DueQueue, ReviewScheduler, sm2, DEFAULT_EASE, MIN_EASE, DAY_SECONDS, _to_iso
+from services.supabase_service import supabase_service
+
+NOW = 1_900_000_000.0
+
+def test_sm2_intervals_grow_with_successful_reviews():
+    card = {"ease": DEFAULT_EASE, "interval_days": 0, "repetitions": 0}
+    intervals = []
+    for _ in range(4):
+        card = sm2(card, 5, NOW)
+        intervals.append(card["interval_days"])
+    assert intervals[:2] == [1, 6]
+    assert intervals[2] > 6 and intervals[3] > intervals[2]
+    assert card["ease"] > DEFAULT_EASE
+
+def test_sm2_lapse_restarts_the_card():
+    card = {"ease": DEFAULT_EASE, "interval_days": 15, "repetitions": 3}
+    lapsed = sm2(card, 1, NOW)
+    assert lapsed["repetitions"] == 0
+    assert lapsed["interval_days"] == 1
+    assert MIN_EASE <= lapsed["ease"] < DEFAULT_EASE
+    assert lapsed["due_at"] == _to_iso(NOW + DAY_SECONDS)
+
+def generate_set(http, stack, user, topic: str = "Photosynthesis") -> dict:
+    response = http.post(f"{stack.api}/flashcard/generate", headers=user.headers, json={"topic": topic, "num_cards": 3})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["review_scheduled"] is True
+    return body["flashcard_set"]
+
+def due_ids(http, stack, user, limit: int = 100) -> list:
+    response = http.get(f"{stack.api}/flashcard/due", headers=user.headers, params={"limit": limit})
+    assert response.status_code == 200
+    return [card["card_id"] for card in response.json()["cards"]]
+
+def test_reviewed_cards_leave_the_due_queue(http, stack, user):
+    flashcard_set = generate_set(http, stack, user)
+    first = due_ids(http, stack, user, limit=2)
+    assert first == [f"{flashcard_set['id']}:0", f"{flashcard_set['id']}:1"]
+
+    response = http.post(f"{stack.api}/flashcard/review", headers=user.headers, json={
+        "results": [{"card_id": first[0], "quality": 5}, {"card_id": "missing", "quality": 3}]
+    })
+    body = response.json()
+    assert body["reviewed"] == 1
+    assert [outcome["status"] for outcome in body["results"]] == ["ok", "not_found"]
+    assert body["results"][0]["interval_days"] == 1
+    assert first[0] not in due_ids(http, stack, user)
+
+    response = http.post(f"{stack.api}/flashcard/review", headers=user.headers,
+                         json={"results": [{"card_id": first[1], "quality": 9}]})
+    assert response.status_code == 422
+
+def test_due_queue_lists_each_card_once():
+    queue = DueQueue([])
+    first, later = _to_iso(NOW - 60), _to_iso(NOW - 30)
+    # Rescheduling back to an earlier due time leaves two live-looking heap entries
+    for due_at in [first, later, first, first]:
+        queue.put({"card_id": "card", "due_at": due_at})
+    queue.put({"card_id": "other", "due_at": later})
+    assert [card["card_id"] for card in queue.due(NOW, 10)] == ["card", "other"]
+    # Peeking leaves the queue intact
+    assert [card["card_id"] for card in queue.due(NOW, 1)] == ["card"]
+
+def test_writes_invalidate_the_due_queue(user, run, monkeypatch):
+    scheduler = ReviewScheduler()
+    schedules, reads = {}, []
+
+    async def get_card_schedules(user_id, columns=None):
+        reads.append(user_id)
+        return list(schedules.values())
+
+    async def save_card_schedules(rows):
+        schedules.update((row["card_id"], row) for row in rows)
+        return rows
+
+    monkeypatch.setattr(supabase_service, "get_card_schedules", get_card_schedules)
+    monkeypatch.setattr(supabase_service, "save_card_schedules", save_card_schedules)
+
+    async def review():
+        await scheduler.add_set(user.id, "set", "Cells", [{"front": "f", "back": "b"}] * 2)
+        assert len((await scheduler.get_due(user.id, 10))["cards"]) == 2
+        # Served from memory until this process writes the user's schedules again
+        await scheduler.get_due(user.id, 10)
+        assert len(reads) == 1
+        await scheduler.record_reviews(user.id, [{"card_id": "set:0", "quality": 5}])
+        due = await scheduler.get_due(user.id, 10)
+        return [card["card_id"] for card in due["cards"]]
+
+    assert run(review()) == ["set:1"]
+    assert len(reads) == 2
+    assert scheduler.stats["invalidations"] == 1
+
+def test_due_queue_is_reloaded_after_its_ttl(http, stack, db, user, run):
+    flashcard_set = generate_set(http, stack, user)
+    card_id = f"{flashcard_set['id']}:2"
+    scheduler = ReviewScheduler()
+    assert card_id in [card["card_id"] for card in run(scheduler.get_due(user.id, 10))["cards"]]
+
+    # Written behind this scheduler's back, as another worker would
+    db.update("flashcard_reviews", {"due_at": "2099-01-01T00:00:00+00:00"}, card_id=card_id)
+    scheduler.queue_ttl = 0
+    assert card_id not in [card["card_id"] for card in run(scheduler.get_due(user.id, 10))["cards"]]
+    assert scheduler.stats["expired"] == 1
+
+def test_load_that_raced_a_write_is_not_cached(user, run, monkeypatch):
+    scheduler = ReviewScheduler()
+    started, released = asyncio.Event(), asyncio.Event()
+
+    async def slow_read(user_id, columns=None):
+        started.set()
+        await released.wait()
+        return []
+
+    async def save_card_schedules(rows):
+        return rows
+
+    monkeypatch.setattr(supabase_service, "get_card_schedules", slow_read)
+    monkeypatch.setattr(supabase_service, "save_card_schedules", save_card_schedules)
+
+    async def race():
+        read = asyncio.create_task(scheduler.get_due(user.id, 10))
+        await started.wait()
+        await scheduler.add_set(user.id, "set", "Cells", [{"front": "f", "back": "b"}])
+        released.set()
+        await read
+
+    run(race())
+    assert user.id not in scheduler._queues
+
+def test_failed_schedule_write_is_retried(db, user, run, monkeypatch):
+    scheduler = ReviewScheduler()
+    save_card_schedules = supabase_service.save_card_schedules
+    calls = []
+
+    async def fail_once(rows):
+        calls.append(len(rows))
+        return None if len(calls) == 1 else await save_card_schedules(rows)
+
+    monkeypatch.setattr(supabase_service, "save_card_schedules", fail_once)
+
+    async def schedule():
+        scheduled = await scheduler.add_set(user.id, "retried-set", "Cells", [{"front": "f", "back": "b"}] * 2)
+        await asyncio.gather(*scheduler._retries)
+        return scheduled
+
+    assert run(schedule()) is False
+    assert calls == [2, 2]
+    assert scheduler.stats["schedule_failures"] == 1
+    assert scheduler.stats["schedule_retries"] == 1
+    assert scheduler.stats["cards_scheduled"] == 2
+    assert len(db.rows("flashcard_reviews", set_id="retried-set")) == 2
+
+def test_schedule_write_is_dropped_after_its_retries(user, run, monkeypatch):
+    scheduler = ReviewScheduler()
+    scheduler.max_retries = 1
+
+    async def always_fail(rows):
+        return None
+
+    monkeypatch.setattr(supabase_service, "save_card_schedules", always_fail)
+
+    async def schedule():
+        await scheduler.add_set(user.id, "dropped-set", "Cells", [{"front": "f", "back": "b"}])
+        await asyncio.gather(*scheduler._retries)
+
+    run(schedule())
+    assert scheduler.stats["schedule_retries"] == 1
+    assert scheduler.stats["schedules_dropped"] == 1
+    assert scheduler.stats["cards_scheduled"] == 0
\ No newline at end of file
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from services.singleflight import SingleFlight, SingleFlightTimeout
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight(max_wait=5)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["result"] * 5
+    assert calls == [1]
+    assert flight.stats["leaders"] == 1
+    assert flight.stats["coalesced"] == 4
+    assert flight.get_stats()["in_flight"] == 0
+
+def test_follower_timeout_does_not_run_the_work_again():
+    flight = SingleFlight(max_wait=5)
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.3)
+        return "result"
+
+    async def follower():
+        await asyncio.sleep(0.01)
+        with pytest.raises(SingleFlightTimeout):
+            await flight.do("key", slow, timeout=0.05)
+        return "gave up"
+
+    async def scenario():
+        return await asyncio.gather(flight.do("key", slow), follower())
+
+    # The follower gives up on its own budget while the leader still gets the result
+    assert asyncio.run(scenario()) == ["result", "gave up"]
+    assert calls == [1]
+    assert flight.stats["wait_timeouts"] == 1
+
+def test_follower_wait_is_capped_by_max_wait():
+    flight = SingleFlight(max_wait=0.05)
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.3)
+        return "result"
+
+    async def follower():
+        await asyncio.sleep(0.01)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pytest.raises(SingleFlightTimeout):
+            await flight.do("key", slow, timeout=10)
+        return loop.time() - start
+
+    async def scenario():
+        return await asyncio.gather(flight.do("key", slow), follower())
+
+    result, waited = asyncio.run(scenario())
+    assert result == "result"
+    assert waited < 0.2
+    assert calls == [1]
+
+def test_work_is_cancelled_once_every_caller_is_gone():
+    flight = SingleFlight(max_wait=5)
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def scenario():
+        caller = asyncio.create_task(flight.do("key", slow))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert cancelled == [1]
+    assert flight.stats["cancelled"] == 1
+    assert flight.get_stats()["in_flight"] == 0
\ No newline at end of file
@@ -0,0 +1,146 @@
+import json
+import uuid
+import asyncio
+import pytest
+from services.ai_service import AIService, ai_service
+from services.cache_service import GenerationCache
+from services.singleflight import generation_singleflight
+from services.stream_service import encode_frame
+from services.supabase_service import supabase_service
+
+def question(i: int) -> dict:
+    return {"question": f"Question {i + 1}?", "options": ["A", "B", "C", "D"], "correct_answer": 0}
+
+def slow_stream(calls: list, delay: float = 0.01):
+    """A stand-in for ai_service.stream_quiz that yields items in reverse order"""
+    def stream(topic, count, *args):
+        calls.append(topic)
+
+        async def items():
+            for i in reversed(range(count)):
+                await asyncio.sleep(delay)
+                yield i, question(i)
+        return items()
+    return stream
+
+def memory_cache() -> GenerationCache:
+    cache = GenerationCache()
+    cache.persistent_enabled = False
+    return cache
+
+async def collect(pairs) -> list:
+    return [pair async for pair in pairs]
+
+def test_frames_are_encoded_as_ndjson_or_sse():
+    frame = {"type": "question", "index": 0, "question": {"question": "What is a cell?"}}
+    assert encode_frame(frame, "ndjson") == json.dumps(frame) + "\n"
+    assert encode_frame(frame, "sse") == f"event: question\ndata: {json.dumps(frame)}\n\n"
+    assert encode_frame({"index": 1}, "sse").startswith("event: message\n")
+
+def test_items_are_yielded_as_soon_as_they_are_ready():
+    async def query_model(prompt, parameters):
+        # Later items finish first
+        delay = query_model.delays.pop(0)
+        await asyncio.sleep(delay)
+        return "Question: ..."
+
+    query_model.delays = [0.03, 0.02, 0.01]
+    service = AIService()
+    service.max_concurrency = 3
+    service._query_model = query_model
+    pairs = asyncio.run(collect(service.stream_quiz("Cells", 3)))
+    assert [i for i, _ in pairs] == [2, 1, 0]
+
+def test_streamed_sets_can_be_stored_for_later_lookups():
+    cache = memory_cache()
+
+    async def stream_then_lookup():
+        key, items = await cache.lookup("quiz", "Cells", 1)
+        assert items is None
+        await cache.set(key, "quiz", [{"question": "What is a cell?"}])
+        return await cache.lookup("quiz", " cells ", 1)
+
+    _, items = asyncio.run(stream_then_lookup())
+    assert items == [{"question": "What is a cell?"}]
+    assert cache.stats["misses"] == 1 and cache.stats["memory_hits"] == 1
+
+def test_concurrent_streams_share_one_generation():
+    cache, calls = memory_cache(), []
+
+    async def stream_twice():
+        leader = asyncio.create_task(collect(cache.stream_or_generate("quiz", "Cells", 3, slow_stream(calls))))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(collect(cache.stream_or_generate("quiz", "Cells", 3, slow_stream(calls))))
+        return await leader, await follower
+
+    leader, follower = asyncio.run(stream_twice())
+    assert calls == ["Cells"]
+    # The leader sees items as they are produced; the follower gets the finished set in order
+    assert [i for i, _ in leader] == [2, 1, 0]
+    assert follower == [(i, question(i)) for i in range(3)]
+    assert cache.stats["memory_hits"] == 0
+
+    # Later requests are served from the cache
+    assert asyncio.run(collect(cache.stream_or_generate("quiz", "cells", 3, slow_stream(calls)))) == follower
+    assert calls == ["Cells"]
+
+def test_follower_falls_back_after_its_timeout():
+    cache, calls = memory_cache(), []
+
+    def fallback(topic, count):
+        return [{"question": "fallback", "degraded": True}] * count
+
+    async def stream_twice():
+        leader = asyncio.create_task(collect(cache.stream_or_generate("quiz", "Slow", 2, slow_stream(calls, delay=0.2))))
+        await asyncio.sleep(0)
+        follower = await collect(cache.stream_or_generate("quiz", "Slow", 2, slow_stream(calls), timeout=0.05, fallback=fallback))
+        return await leader, follower
+
+    leader, follower = asyncio.run(stream_twice())
+    assert len(leader) == 2 and calls == ["Slow"]
+    assert [item["question"] for _, item in follower] == ["fallback", "fallback"]
+
+def test_cancelled_follower_does_not_stop_the_shared_generation():
+    cache, calls = memory_cache(), []
+
+    async def stream_twice():
+        leader = asyncio.create_task(collect(cache.stream_or_generate("quiz", "Shared", 2, slow_stream(calls))))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(collect(cache.stream_or_generate("quiz", "Shared", 2, slow_stream(calls))))
+        await asyncio.sleep(0.005)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert len(asyncio.run(stream_twice())) == 2
+    assert generation_singleflight.get_stats()["in_flight"] == 0
+
+@pytest.fixture
+def generation(stub, monkeypatch):
+    """No stored profile, cache row or pre-generated items; generation comes from slow_stream"""
+    calls = []
+    stub(supabase_service, "get_user_profile", None)
+    stub(supabase_service, "get_cached_generation", None)
+    stub(supabase_service, "save_cached_generation", None)
+    stub(supabase_service, "save_quiz", {"id": "quiz-1"})
+    monkeypatch.setattr(ai_service, "stream_quiz", slow_stream(calls, delay=0))
+    return calls
+
+def test_quiz_stream_emits_every_question(api, generation):
+    topic = f"Stream {uuid.uuid4()}"
+    response = api.post("/quiz/generate/stream", json={"topic": topic, "num_questions": 3})
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(frame["index"] for frame in frames if frame["type"] == "question") == [0, 1, 2]
+    assert frames[-1] == {"type": "done", "id": "quiz-1", "topic": topic, "count": 3}
+    assert generation == [topic]
+
+def test_users_without_a_profile_can_generate(api, generation, stub):
+    stub(ai_service, "generate_quiz", [question(0)])
+    response = api.post("/quiz/generate", json={"topic": f"Profile {uuid.uuid4()}", "num_questions": 1})
+    assert response.status_code == 200
+    assert response.json()["quiz"]["questions"] == [question(0)]
+
+    # A missing profile counts as the free tier
+    response = api.post("/quiz/generate", json={"topic": "Cells", "num_questions": 6})
+    assert response.status_code == 403
\ No newline at end of file
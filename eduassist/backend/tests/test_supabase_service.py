@@ -0,0 +1,64 @@
+import time
+import asyncio
+import threading
+import pytest
+from services.supabase_service import SupabaseService
+
+class Query:
+    """A built query whose blocking execute() sleeps for `delay` seconds"""
+
+    def __init__(self, delay: float = 0, error: Exception = None):
+        self.delay, self.error = delay, error
+        self.threads = set()
+
+    def execute(self):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return "result"
+
+def service(**settings) -> SupabaseService:
+    service = SupabaseService()
+    for name, value in settings.items():
+        setattr(service, name, value)
+    return service
+
+def test_queries_run_off_the_event_loop():
+    db, query = service(), Query(delay=0.05)
+
+    async def run():
+        # The blocking calls overlap on the pool instead of running one after another
+        started = time.perf_counter()
+        results = await asyncio.gather(*[db._execute("get_user_profile", query) for _ in range(4)])
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(run())
+    db.close()
+    assert results == ["result"] * 4
+    assert elapsed < 0.15
+    assert all(name.startswith("supabase") for name in query.threads)
+
+def test_slow_queries_time_out():
+    db = service(timeout=0.01)
+    with pytest.raises(TimeoutError):
+        asyncio.run(db._execute("get_quiz_history", Query(delay=0.1)))
+    db.close()
+    assert db.get_metrics()["operations"]["get_quiz_history"]["timeouts"] == 1
+
+def test_metrics_are_recorded_per_method():
+    db = service()
+
+    async def run():
+        await db._execute("save_quiz", Query())
+        await db._execute("save_quiz", Query())
+        with pytest.raises(ValueError):
+            await db._execute("save_quiz", Query(error=ValueError("bad row")))
+
+    asyncio.run(run())
+    db.close()
+    metrics = db.get_metrics()
+    assert metrics["pool_size"] == db.pool_size
+    save_quiz = metrics["operations"]["save_quiz"]
+    assert save_quiz["count"] == 3 and save_quiz["errors"] == 1 and save_quiz["timeouts"] == 0
+    assert save_quiz["p50_ms"] <= save_quiz["p95_ms"] <= save_quiz["max_ms"]
\ No newline at end of file
@@ -0,0 +1,64 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+def seed_quizzes(db, user, count: int) -> list:
+    quizzes = [
+        {"id": str(uuid.uuid4()), "user_id": user.id, "topic": "Algebra", "difficulty": "medium",
+         "questions": [{"question": "1 + 1?", "options": ["1", "2"], "correct_answer": "2"}]}
+        for _ in range(count)
+    ]
+    db.seed("quizzes", quizzes)
+    return [quiz["id"] for quiz in quizzes]
+
+def result(client_id: str, quiz_id: str, hours_ago: float = 1, answers=("2",)) -> dict:
+    completed_at = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
+    return {"client_id": client_id, "quiz_id": quiz_id, "answers": list(answers), "completed_at": completed_at.isoformat()}
+
+def sync(http, stack, user, results: list) -> dict:
+    response = http.post(f"{stack.api}/quiz/sync", headers=user.headers, json={"results": results})
+    assert response.status_code == 200
+    return response.json()
+
+def test_replayed_results_are_stored_once(http, stack, db, user):
+    [quiz_id] = seed_quizzes(db, user, 1)
+    batch = [result("a1", quiz_id, hours_ago=2), result("a2", quiz_id, answers=["1"]), result("a2", quiz_id)]
+
+    body = sync(http, stack, user, batch)
+    assert body["saved"] == 2
+    assert [(item["client_id"], item["status"]) for item in body["results"]] == [
+        ("a1", "saved"), ("a2", "saved"), ("a2", "duplicate")
+    ]
+    assert body["results"][1]["score"] == 0
+
+    # A client retrying after a lost response gets the same scores back without new rows
+    body = sync(http, stack, user, batch[:2])
+    assert body["saved"] == 0
+    assert [item["status"] for item in body["results"]] == ["duplicate", "duplicate"]
+    assert [item["score"] for item in body["results"]] == [100, 0]
+
+    rows = db.rows("progress", user_id=user.id)
+    assert sorted(row["client_id"] for row in rows) == ["a1", "a2"]
+    assert db.rows("user_stats", user_id=user.id)[0]["total_quizzes"] == 2
+
+def test_invalid_items_do_not_fail_the_batch(http, stack, db, user, make_user):
+    [quiz_id] = seed_quizzes(db, user, 1)
+    [foreign_quiz] = seed_quizzes(db, make_user(), 1)
+    future = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+
+    body = sync(http, stack, user, [
+        result("ok", quiz_id),
+        result("missing", str(uuid.uuid4())),
+        result("foreign", foreign_quiz),
+        {**result("future", quiz_id), "completed_at": future},
+        {"quiz_id": quiz_id},
+        "junk"
+    ])
+    assert body["saved"] == 1
+    assert [item["status"] for item in body["results"]] == ["saved"] + ["invalid"] * 5
+    assert len(db.rows("progress", user_id=user.id)) == 1
+
+def test_large_batches_look_up_answer_keys_in_chunks(http, stack, db, user):
+    quiz_ids = seed_quizzes(db, user, 120)
+    body = sync(http, stack, user, [result(f"c{index}", quiz_id) for index, quiz_id in enumerate(quiz_ids)])
+    assert body["saved"] == 120
+    assert all(item["status"] == "saved" for item in body["results"])
\ No newline at end of file